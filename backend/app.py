@@ -1,29 +1,47 @@
 import os
 import re
-import pickle
+import hmac
+import atexit
 import numpy as np
-import pandas as pd
-import subprocess
+import time
 import threading
 import logging
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, redirect, url_for
+from functools import wraps
+from flask import Flask, Response, current_app, g, request, jsonify, render_template, redirect, url_for
 from flask_pymongo import PyMongo
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, verify_jwt_in_request, get_jwt_identity
 from flask_cors import CORS
-from flask_bcrypt import Bcrypt
 from bson.objectid import ObjectId
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from logging.handlers import RotatingFileHandler
 from authlib.integrations.flask_client import OAuth
 from dotenv import load_dotenv
+from coalescer import BatchCoalescer
+from password_pool import PasswordHasher, PoolSaturated
+import metrics
+from metrics import (REQUEST_SECONDS, JWT_DECODE_SECONDS, PREDICT_STAGE_SECONDS, MONGO_SECONDS, MODEL_LOAD_SECONDS,
+                     TRAINING_BUCKETS, Collected, Histogram)
+from history_writer import HistoryWriter, HistoryBacklogged, UserSnapshotCache
+from shared_state import get_backend, limiter_storage_uri, MemoryBackend
+from prediction_cache import PredictionCache
+from model_registry import ModelRegistry
+from dataset_ingest import ingest_csv, DatasetError
+from training_worker import UPLOAD_DIR, enqueue_training_job, ensure_worker, serialize_job
+import stats_store
+from history_export import EXPORT_FORMATS, export_query, stream_history, export_filename
+from history_backfill import PROFILE_FIELDS, profile_snapshot, backfill
+from db_indexes import ensure_indexes
+from pymongo.errors import DuplicateKeyError
+from pagination import (NEXT_CURSOR_HEADER, encode_cursor, decode_cursor, page_limit, after_date_id,
+                        page_response, ndjson_response)
 
 load_dotenv()
 
 app = Flask(__name__, template_folder='../frontend', static_folder='../Images')
 app.secret_key = os.getenv("FLASK_SECRET_KEY")
-CORS(app)
+CORS(app, expose_headers=[NEXT_CURSOR_HEADER])
 
 if not os.path.exists('logs'): os.mkdir('logs')
 
@@ -34,6 +52,30 @@ app.logger.addHandler(file_handler)
 app.logger.setLevel(logging.INFO)
 
 
+#Request Metrics
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.labels(request.method, route, str(response.status_code)).observe(time.perf_counter() - started)
+    return response
+
+# flask_jwt_extended's jwt_required() with the token check timed
+def jwt_required():
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            with JWT_DECODE_SECONDS.time():
+                verify_jwt_in_request()
+            return current_app.ensure_sync(fn)(*args, **kwargs)
+        return decorator
+    return wrapper
+
 @app.after_request
 def set_security_headers(response):
     response.headers["X-Frame-Options"] = "SAMEORIGIN"
@@ -44,11 +86,30 @@ def sanitize_input(text):
     if isinstance(text, str):
         return re.sub(r'<[^>]*>', '', text).strip()
     return text
+
+# bcrypt runs in its own process pool (password_pool.py); created before
+# the limiter, Mongo client and model watcher start threads in this process
+passwords = PasswordHasher(log=app.logger.warning)
+
+@app.errorhandler(PoolSaturated)
+def password_pool_saturated(e):
+    response = jsonify({"message": str(e)})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+@app.errorhandler(HistoryBacklogged)
+def history_backlogged(e):
+    response = jsonify({"message": str(e)})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+DEFAULT_RATE_LIMITS = ["500 per day", "100 per hour"]
 limiter = Limiter(
     get_remote_address,
     app=app,
-    default_limits=["500 per day", "100 per hour"],
-    storage_uri="memory://"
+    default_limits=DEFAULT_RATE_LIMITS,
+    # Counted across all app processes unless SHARED_STATE_URI is memory://
+    storage_uri=limiter_storage_uri()
 )
 
 os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
@@ -59,7 +120,6 @@ app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__fil
 
 mongo = PyMongo(app)
 jwt = JWTManager(app)
-bcrypt = Bcrypt(app)
 oauth = OAuth(app)
 
 google = oauth.register(
@@ -72,92 +132,133 @@ google = oauth.register(
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_DIR = os.path.join(BASE_DIR, '../ml-model')
+MAX_BATCH_SIZE = int(os.getenv("PREDICT_BATCH_MAX", 5000))
+DATASET_CHUNK_ROWS = int(os.getenv("DATASET_CHUNK_ROWS", 50000))
+# Page sizes for the keyset-paginated list endpoints (pagination.py)
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", 100))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", 1000))
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 500))
+EXPORT_BATCH_MAX = int(os.getenv("EXPORT_BATCH_MAX", 10000))
+# Micro-batching of concurrent /api/predict calls (0 disables it)
+COALESCE_WINDOW_MS = float(os.getenv("PREDICT_COALESCE_WINDOW_MS", 0))
+COALESCE_MAX_BATCH = int(os.getenv("PREDICT_COALESCE_MAX_BATCH", 32))
+# Result cache for repeated profiles (size 0 disables it)
+shared_state = get_backend()
+prediction_cache = PredictionCache(
+    max_size=int(os.getenv("PREDICTION_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("PREDICTION_CACHE_TTL", 3600)),
+    backend=None if isinstance(shared_state, MemoryBackend) else shared_state
+)
 
-model = None
-label_encoders = None
-scaler = None
-mlb = None
-feature_names = None
-feature_selector = None
-
-def load_artifacts():
-    global model, label_encoders, scaler, mlb, feature_names, feature_selector
-    try:
-        model = pickle.load(open(os.path.join(MODEL_DIR, 'career_model.pkl'), 'rb'))
-        label_encoders = pickle.load(open(os.path.join(MODEL_DIR, 'label_encoders.pkl'), 'rb'))
-        scaler = pickle.load(open(os.path.join(MODEL_DIR, 'scaler.pkl'), 'rb'))
-        mlb = pickle.load(open(os.path.join(MODEL_DIR, 'skills_mlb.pkl'), 'rb'))
-        feature_names = pickle.load(open(os.path.join(MODEL_DIR, 'feature_names.pkl'), 'rb'))
-        
+# Prediction history is written behind the response, in batches
+# (history_writer.py); the statistics follow each flushed batch
+history_writer = HistoryWriter(lambda: mongo.db, lambda records: record_stats(stats_store.record_history, records),
+                               log=app.logger.error)
+atexit.register(history_writer.close)
+user_snapshots = UserSnapshotCache()
+
+registry = ModelRegistry(MODEL_DIR)
+bundle = None
+_load_lock = threading.Lock()
+
+# Build and warm a complete bundle off to the side, then publish it with a
+# single assignment; requests read `bundle` once and never see a mixed state.
+def load_artifacts(version=None):
+    global bundle
+    with _load_lock:
+        started = time.perf_counter()
         try:
-            feature_selector = pickle.load(open(os.path.join(MODEL_DIR, 'feature_selector.pkl'), 'rb'))
-        except:
-            feature_selector = None
-
-        print("Model loaded successfully.")
-        return True
-    except Exception as e:
-        print(f"Error loading ML: {e}")
-        return False
+            new_bundle = registry.load(version)
+            new_bundle.warm_up()
+            if COALESCE_WINDOW_MS > 0:
+                new_bundle.predictor = BatchCoalescer(new_bundle.predictor, COALESCE_WINDOW_MS, COALESCE_MAX_BATCH)
+
+            old_bundle, bundle = bundle, new_bundle
+            prediction_cache.clear()
+            if old_bundle and isinstance(old_bundle.predictor, BatchCoalescer): old_bundle.predictor.close()
+            MODEL_LOAD_SECONDS.labels("success").observe(time.perf_counter() - started)
+            print(f"Model {new_bundle.version} loaded successfully.")
+            return True
+        except Exception as e:
+            MODEL_LOAD_SECONDS.labels("error").observe(time.perf_counter() - started)
+            print(f"Error loading ML: {e}")
+            return False
 load_artifacts()
 
-#Background Training
-def run_training_script():
+#Model Watcher
+# Training runs in a separate worker process; every app process follows the
+# CURRENT pointer so all of them switch to a new version once it is published.
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", 5))
+
+def watch_model_version():
+    while True:
+        time.sleep(MODEL_WATCH_INTERVAL)
+        try:
+            current = registry.current_version()
+            if current and (bundle is None or bundle.version != current):
+                print(f"Model version changed to {current}. Reloading model...")
+                load_artifacts(current)
+        except Exception as e:
+            print(f"Model watch failed: {e}")
+
+if MODEL_WATCH_INTERVAL > 0:
+    threading.Thread(target=watch_model_version, name="model-watcher", daemon=True).start()
+
+#Database Maintenance
+# Declared indexes first (register relies on the unique email index), then
+# statistics counters for a database that had history before them, then
+# the profile snapshot for older history records; off the import path so
+# the app still starts while MongoDB is unreachable.
+def prepare_database():
+    if os.getenv("ENSURE_INDEXES", "1") != "0":
+        try:
+            ensure_indexes(mongo.db, app.logger.error)
+        except Exception as e:
+            app.logger.error(f"Index creation failed: {e}")
+    if os.getenv("STATS_INITIAL_REBUILD", "1") != "0":
+        try:
+            if stats_store.needs_rebuild(mongo.db):
+                doc = stats_store.rebuild(mongo.db)
+                app.logger.info(f"Statistics counters built from {doc['total']} history records.")
+        except stats_store.RebuildRunning:
+            pass
+        except Exception as e:
+            app.logger.error(f"Statistics rebuild failed: {e}")
+    if os.getenv("HISTORY_BACKFILL", "1") != "0":
+        try:
+            updated = backfill(mongo.db)
+            if updated: app.logger.info(f"History backfill: added profile fields to {updated} records.")
+        except Exception as e:
+            app.logger.error(f"History backfill failed: {e}")
     try:
-        script_path = os.path.join(MODEL_DIR, 'train_model.py')
-        subprocess.run(["python", script_path], check=True)
-        print("Training complete. Reloading model...")
-        load_artifacts()
+        replayed = history_writer.replay_spill()
+        if replayed: app.logger.info(f"History writer: replayed {replayed} spilled records.")
     except Exception as e:
-        print(f"Background Training Failed: {e}")
-
-def get_processed_vector(data):
-    global label_encoders, scaler, mlb, feature_names
+        app.logger.error(f"History spill replay failed: {e}")
 
-    skills_list = data.get("skills", [])
-    if not isinstance(skills_list, list): skills_list = []
-    STOP_WORDS = {"communication", "problem solving", "critical thinking", "teamwork", "leadership"}
-    clean_skills = [s.strip() for s in skills_list if s.strip().lower() not in STOP_WORDS]
-    valid_skills = [skill for skill in clean_skills if skill in mlb.classes_]
+threading.Thread(target=prepare_database, name="db-maintenance", daemon=True).start()
 
-    #Safe Label Encoding
-    def safe_transform(encoder, value):
-        try:
-            return int(encoder.transform([value])[0]) 
-        except ValueError:
-            return int(encoder.transform([encoder.classes_[0]])[0])
-
-    degree_enc = safe_transform(label_encoders["degree"], data.get("degree", "B.Tech"))
-    spec_enc = safe_transform(label_encoders["specialization"], data.get("specialization", "Computer Science"))
-    cert_enc = safe_transform(label_encoders["certifications"], data.get("certifications", "None"))
+def get_processed_vector(data):
+    return bundle.feature_engine.process(data)
 
-    # Normalization (Scaling)
-    try:
-        val_cgpa = float(data.get("cgpa", 0))
-        val_year = int(data.get("graduation_year", 2024))
-    except:
-        val_cgpa, val_year = 0.0, 2024
-    
-    # Scale using the loaded Scaler
-    numeric_df = pd.DataFrame([[val_cgpa, val_year]], columns=["cgpa", "graduation_year"])
-    scaled_vals = scaler.transform(numeric_df)
-    
-    #Internship Handling
-    raw_intern = data.get("internships", 0)
-    intern_val = 1 if str(raw_intern).lower() in ['1', 'true', 'yes'] else 0
-
-    #Construct Final Vector Dictionary
-    processed_record = {
-        "cgpa_scaled": float(scaled_vals[0][0]),
-        "graduation_year_scaled": float(scaled_vals[0][1]),
-        "internship_encoded": intern_val,
-        "degree_encoded": degree_enc,
-        "specialization_encoded": spec_enc,
-        "certifications_encoded": cert_enc,
-        "skills_encoded_count": len(valid_skills) 
-    }
-    
-    return processed_record, valid_skills
+# Top-k roles for every row of a probability matrix, decoded in one call
+def decode_top_predictions(probs, job_role_encoder, k=3):
+    k = min(k, probs.shape[1])
+    if k < probs.shape[1]:
+        top_idx = np.argpartition(probs, -k, axis=1)[:, -k:]
+    else:
+        top_idx = np.tile(np.arange(probs.shape[1]), (probs.shape[0], 1))
+    top_probs = np.take_along_axis(probs, top_idx, axis=1)
+    order = np.argsort(-top_probs, axis=1, kind='stable')
+    top_idx = np.take_along_axis(top_idx, order, axis=1)
+    top_probs = np.take_along_axis(top_probs, order, axis=1)
+
+    job_roles = job_role_encoder.inverse_transform(top_idx.ravel()).reshape(top_idx.shape)
+    return [
+        [{"job_role": role.replace('/', ' '), "confidence": round(float(p) * 100, 1)}
+         for role, p in zip(role_row, prob_row)]
+        for role_row, prob_row in zip(job_roles, top_probs)
+    ]
 
 #Routes
 @app.route('/')
@@ -170,39 +271,54 @@ def dashboard(): return render_template('dashboard.html')
 def admin_dashboard(): return render_template('admin_dashboard.html')
 
 #Config API
+# Pre-serialized per bundle (model_registry.ConfigPayload); revalidated
+# with If-None-Match, so a repeat dashboard load is a 304
 @app.route('/api/config', methods=['GET'])
 def get_config():
-    try:
-        path = os.path.join(MODEL_DIR, 'metadata.pkl')
-        if os.path.exists(path):
-            metadata = pickle.load(open(path, 'rb'))
-            return jsonify(metadata), 200
+    b = bundle
+    if not b or b.config is None:
         return jsonify({"message": "Metadata not found. Train model first."}), 404
-    except Exception as e:
-        return jsonify({"message": str(e)}), 500
+    encoding = b.config.select(request.accept_encodings)
+    etag = b.config.etags[encoding]
+    if any(request.if_none_match.contains(tag) for tag in b.config.etags.values()):
+        response = Response(status=304)
+    else:
+        response = Response(b.config.variants[encoding], mimetype="application/json")
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 #Auth
+def weak_password(password):
+    if not isinstance(password, str):
+        return "Password is required"
+    if len(password) < 8:
+        return "Password must be at least 8 characters long"
+    if not re.search(r"\d", password):
+        return "Password must contain at least one number"
+    if not re.search(r"[A-Z]", password):
+        return "Password must contain at least one uppercase letter"
+    return None
+
 @app.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
     name = sanitize_input(data.get('name', ''))
     email = sanitize_input(data.get('email', ''))
-    password = data.get('password', '')
+    password = data.get('password')
 
-    if len(password) < 8:
-        return jsonify({"message": "Password must be at least 8 characters long"}), 400
-    if not re.search(r"\d", password):
-        return jsonify({"message": "Password must contain at least one number"}), 400
-    if not re.search(r"[A-Z]", password):
-        return jsonify({"message": "Password must contain at least one uppercase letter"}), 400
+    problem = weak_password(password)
+    if problem:
+        return jsonify({"message": problem}), 400
 
     if not re.fullmatch(r"^[^@]+@[^@]+\.[^@]+$", email):
         return jsonify({"message": "Invalid email format"}), 400
 
-    if mongo.db.users.find_one({"email": email}):
-        return jsonify({"message": "Email already exists"}), 400
 
-    hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+    hashed_password = passwords.hash(password)
     try:
         mongo.db.users.insert_one({
             "name": name,
@@ -214,6 +330,8 @@ def register():
         })
         app.logger.info(f"New user registered: {email}")
         return jsonify({"message": "Registration successful"}), 201
+    except DuplicateKeyError:
+        return jsonify({"message": "Email already exists"}), 400
     except Exception as e:
         app.logger.error(f"Registration Error: {e}") 
         return jsonify({"message": "Server Error"}), 500
@@ -223,13 +341,19 @@ def register():
 @limiter.limit("25 per minute")
 def login():
     data = request.get_json()
-    user = mongo.db.users.find_one({"email": data['email']})
+    if not isinstance(data.get('password'), str) or not data['password']:
+        return jsonify({"message": "Email and password are required"}), 400
+    user = mongo.db.users.find_one({"email": data.get('email')})
 
     if user:
         if not user.get('password'):
             return jsonify({"message": "Use Google Login."}), 400
         
-        if bcrypt.check_password_hash(user['password'], data['password']):
+        if passwords.check(user['password'], data['password']):
+            if passwords.needs_rehash(user['password']):
+                # Upgrade to the configured cost, unless the password changed meanwhile
+                passwords.rehash_later(data['password'], lambda new_hash: mongo.db.users.update_one(
+                    {"_id": user['_id'], "password": user['password']}, {"$set": {"password": new_hash}}))
             token = create_access_token(identity=str(user['_id']))
             role = user.get('role', 'student')
             return jsonify({"token": token, "name": user['name'], "role": role}), 200
@@ -303,83 +427,164 @@ def update_profile():
         }
     }
     mongo.db.users.update_one({"_id": ObjectId(user_id)},update_doc)
+    user_snapshots.invalidate(user_id)
     return jsonify({"message": "Profile updated Successfully!& data preprocessed successfully!"}), 200
     
 
+# Top-k roles for one profile, through the result cache. Also used by the
+# ASGI entry point (asgi.py), which runs it in a thread pool.
+STAGE_PROCESS = PREDICT_STAGE_SECONDS.labels("process_features")
+STAGE_CACHE = PREDICT_STAGE_SECONDS.labels("cache_lookup")
+STAGE_BINARIZE = PREDICT_STAGE_SECONDS.labels("binarize_skills")
+STAGE_PREDICT = PREDICT_STAGE_SECONDS.labels("predict_proba")
+STAGE_DECODE = PREDICT_STAGE_SECONDS.labels("decode_top_k")
+
+def score_profile(b, data):
+    with STAGE_PROCESS.time():
+        processed_record, valid_skills = b.feature_engine.process(data)
+    with STAGE_CACHE.time():
+        cache_key = prediction_cache.make_key(b.version, processed_record, valid_skills)
+        results = prediction_cache.get(cache_key)
+
+    if results is None:
+        #Predict
+        with STAGE_BINARIZE.time():
+            input_vec = b.feature_engine.vectorize(processed_record, valid_skills)
+        with STAGE_PREDICT.time():
+            probs = b.predictor.predict_proba(input_vec)
+        with STAGE_DECODE.time():
+            results = decode_top_predictions(probs, b.label_encoders["job_role"])[0]
+
+        if not results:
+            results.append({"job_role": "Uncertain", "confidence": 0})
+        prediction_cache.put(cache_key, results)
+    return results, valid_skills
+
+HISTORY_USER_FIELDS = {"name": 1, **dict.fromkeys(PROFILE_FIELDS, 1)}
+
+def history_user(user_id):
+    user = user_snapshots.get(user_id)
+    if user is None:
+        with MONGO_SECONDS.labels("user_lookup").time():
+            user = mongo.db.users.find_one({"_id": ObjectId(user_id)}, HISTORY_USER_FIELDS) or {}
+        user_snapshots.put(user_id, user)
+    return user
+
+def history_record(user_id, user, results):
+    return {
+        "user_id": ObjectId(user_id),
+        "user_name": user.get("name", "Unknown"),
+        **profile_snapshot(user),
+        "prediction": results[0]["job_role"],
+        "confidence": results[0]["confidence"],
+        "top_predictions": results,
+        "date": datetime.now()
+    }
+
 @app.route('/api/predict', methods=['POST'])
 @jwt_required()
 def predict():
-    global model, label_encoders, scaler, mlb, feature_names, feature_selector
-    if not model:
+    if not bundle:
         if not load_artifacts():
             return jsonify({"message": "Model not loaded. Train first."}), 503
+    b = bundle
     user_id = get_jwt_identity()
     data = request.get_json()
 
     try:
-        processed_record, valid_skills = get_processed_vector(data)
-        skills_matrix = mlb.transform([valid_skills])
-        skills_encoded_df = pd.DataFrame(skills_matrix, columns=mlb.classes_)
-        skills_dict = skills_encoded_df.iloc[0].to_dict()
-        input_record = {
-            "cgpa": processed_record['cgpa_scaled'],
-            "graduation_year": processed_record['graduation_year_scaled'],
-            "internship_experience": processed_record['internship_encoded'],
-            "degree": processed_record['degree_encoded'],
-            "specialization": processed_record['specialization_encoded'],
-            "certifications": processed_record['certifications_encoded'],
-        }
-        input_record.update(skills_dict)
-        input_df = pd.DataFrame([input_record])
-        input_df = input_df.reindex(columns=feature_names, fill_value=0)
+        results, valid_skills = score_profile(b, data)
 
-        #Predict
-        probs = model.predict_proba(input_df)[0]
-        top3_idx = np.argsort(probs)[-3:][::-1]
-        results = []
-        for idx in top3_idx:
-            job_category = label_encoders["job_role"].inverse_transform([idx])[0]
-            clean_job_category = job_category.replace('/', ' ')
-            confidence = round(float(probs[idx]) * 100, 1)
-            results.append({"job_role": clean_job_category, "confidence": confidence})
+        #Save to History (queued; written with the next batch)
+        history_writer.submit(history_record(user_id, history_user(user_id), results))
 
-        if not results:
-            results.append({"job_role": "Uncertain", "confidence": 0})
-        
-        #Save to History
-        user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
-        mongo.db.history.insert_one({
+        return jsonify({"top_predictions": results, "justification": f"Based on your skills: {', '.join(valid_skills)}" }), 200
+
+    except HistoryBacklogged:
+        raise
+    except Exception as e:
+        print(f"Prediction Error: {e}")
+        return jsonify({"message": f"Server Error: {str(e)}"}), 500
+
+@app.route('/api/predict/batch', methods=['POST'])
+@jwt_required()
+def predict_batch():
+    if not bundle:
+        if not load_artifacts():
+            return jsonify({"message": "Model not loaded. Train first."}), 503
+    b = bundle
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    profiles = data.get("profiles")
+
+    if not isinstance(profiles, list) or not profiles:
+        return jsonify({"message": "Provide a non-empty 'profiles' list"}), 400
+    if len(profiles) > MAX_BATCH_SIZE:
+        return jsonify({"message": f"Batch too large. Max {MAX_BATCH_SIZE} profiles per request"}), 413
+    if not all(isinstance(p, dict) for p in profiles):
+        return jsonify({"message": "Each profile must be an object"}), 400
+
+    try:
+        input_matrix, skills_per_row = b.feature_engine.encode_many(profiles)
+        probs = b.batch_predictor.predict_proba(input_matrix)
+        all_results = decode_top_predictions(probs, b.label_encoders["job_role"])
+
+        #Save to History (one write for the whole batch)
+        user = history_user(user_id)
+        user_name = user.get("name", "Unknown")
+        snapshot = profile_snapshot(user)
+        now = datetime.now()
+        mongo.db.history.insert_many([{
             "user_id": ObjectId(user_id),
-            "user_name": user.get("name", "Unknown"),
+            "user_name": user_name,
+            **snapshot,
             "prediction": results[0]["job_role"],
             "confidence": results[0]["confidence"],
             "top_predictions": results,
-            "date": datetime.now()
-        })
+            "batch": True,
+            "date": now
+        } for results in all_results], ordered=False)
+        record_stats(stats_store.record_predictions, [results[0]["job_role"] for results in all_results], user.get("degree"))
 
-        return jsonify({"top_predictions": results, "justification": f"Based on your skills: {', '.join(valid_skills)}" }), 200
+        return jsonify({"results": [
+            {"top_predictions": results, "justification": f"Based on your skills: {', '.join(valid_skills)}"}
+            for results, valid_skills in zip(all_results, skills_per_row)
+        ]}), 200
 
     except Exception as e:
-        print(f"Prediction Error: {e}")
+        print(f"Batch Prediction Error: {e}")
         return jsonify({"message": f"Server Error: {str(e)}"}), 500
 
 #History & Feedback
+HISTORY_FIELDS = {"prediction": 1, "confidence": 1, "top_predictions": 1, "feedback": 1, "date": 1}
+
+def serialize_history(h):
+    return {
+        "_id": str(h["_id"]),
+        "prediction": h.get("prediction", "Unknown"),
+        "confidence": h.get("confidence", 0),
+        "top_predictions": h.get("top_predictions", []),
+        "feedback": h.get("feedback", None),
+        "date": h["date"].strftime("%Y-%m-%d %H:%M")
+    }
+
+# Newest first, paged on (date, _id); ?format=ndjson streams the rest
 @app.route('/api/history', methods=['GET'])
 @jwt_required()
 def history():
     user_id = get_jwt_identity()
-    cursor = mongo.db.history.find({"user_id": ObjectId(user_id)}).sort("date", -1)
-    history_list = []
-    for h in cursor:
-        history_list.append({
-            "_id": str(h["_id"]),
-            "prediction": h.get("prediction", "Unknown"),
-            "confidence": h.get("confidence", 0),
-            "top_predictions": h.get("top_predictions", []),
-            "feedback": h.get("feedback", None),
-            "date": h["date"].strftime("%Y-%m-%d %H:%M")
-        })
-    return jsonify(history_list), 200
+    query = {"user_id": ObjectId(user_id)}
+    try:
+        limit = page_limit(request.args, PAGE_SIZE, PAGE_SIZE_MAX)
+        if request.args.get('cursor'):
+            query.update(after_date_id(*decode_cursor(request.args['cursor'], datetime, ObjectId)))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    cursor = mongo.db.history.find(query, HISTORY_FIELDS).sort([("date", -1), ("_id", -1)])
+    if request.args.get('format') == 'ndjson':
+        if 'limit' in request.args: cursor = cursor.limit(limit)
+        return ndjson_response(cursor.batch_size(STREAM_BATCH_SIZE), serialize_history)
+    return page_response(cursor, limit, serialize_history, lambda h: encode_cursor(h["date"], h["_id"]))
 
 @app.route('/api/feedback', methods=['POST'])
 @jwt_required()
@@ -389,11 +594,13 @@ def submit_feedback():
     rating = int(data.get('rating', 0))
     user_id = get_jwt_identity()
 
-    result = mongo.db.history.update_one(
+    previous = mongo.db.history.find_one_and_update(
         {"_id": ObjectId(pred_id), "user_id": ObjectId(user_id)},
-        {"$set": {"feedback": rating}}
+        {"$set": {"feedback": rating}},
+        projection={"feedback": 1}
     )
-    if result.modified_count == 1:
+    if previous is not None and previous.get("feedback") != rating:
+        record_stats(stats_store.record_feedback, rating, previous.get("feedback"))
         return jsonify({"message": "Feedback saved!"}), 200
     return jsonify({"message": "Error saving feedback"}), 404
 
@@ -403,7 +610,10 @@ def reset_password_manual():
     user = mongo.db.users.find_one({"email": data.get('email'), "name": data.get('name')})
     if not user:
         return jsonify({"message": "User not found."}), 404
-    hashed_new = bcrypt.generate_password_hash(data.get('new_password')).decode('utf-8')
+    problem = weak_password(data.get('new_password'))
+    if problem:
+        return jsonify({"message": problem}), 400
+    hashed_new = passwords.hash(data['new_password'])
     mongo.db.users.update_one({"_id": user['_id']}, {"$set": {"password": hashed_new}})
     return jsonify({"message": "Password reset successful!"}), 200
 
@@ -414,24 +624,30 @@ def change_password():
     user_id = get_jwt_identity()
     user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
 
-    if not bcrypt.check_password_hash(user['password'], data.get('old_password')):
+    problem = weak_password(data.get('new_password'))
+    if problem:
+        return jsonify({"message": problem}), 400
+    old_password = data.get('old_password')
+    if not isinstance(old_password, str) or not old_password or not passwords.check(user['password'], old_password):
         return jsonify({"message": "Invalid old password"}), 401
-    hashed_new = bcrypt.generate_password_hash(data.get('new_password')).decode('utf-8')
+    hashed_new = passwords.hash(data['new_password'])
     mongo.db.users.update_one({"_id": ObjectId(user_id)}, {"$set": {"password": hashed_new}})
     return jsonify({"message": "Password changed successfully!"}), 200
 
 #Stats & Admin
+# Counters live in stats_store; the history write has already happened,
+# so a failed update is logged (and fixed by `stats_store.py rebuild`)
+def record_stats(update, *args):
+    try:
+        with MONGO_SECONDS.labels("stats_update").time():
+            update(mongo.db, *args)
+    except Exception as e:
+        app.logger.warning(f"Statistics update failed: {e}")
+
 @app.route('/api/stats/job_distribution', methods=['GET'])
 @jwt_required()
 def job_distribution():
-    pipeline = [
-        {"$group": {"_id": "$prediction", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 10}
-    ]
-    stats = list(mongo.db.history.aggregate(pipeline))
-    labels = [item['_id'] for item in stats]
-    data = [item['count'] for item in stats]
+    labels, data = stats_store.top_counts(stats_store.read_stats(mongo.db)["roles"], 10)
     return jsonify({"labels": labels, "data": data}), 200
 
 @app.route('/api/stats/comparison', methods=['GET'])
@@ -480,31 +696,35 @@ def compare_stats():
 @app.route('/api/stats/degree_job', methods=['GET'])
 @jwt_required()
 def degree_job_stats():
-    pipeline = [
-        {"$lookup": {"from": "users", "localField": "user_id", "foreignField": "_id", "as": "user_info"}},
-        {"$unwind": "$user_info"},
-        {"$group": {"_id": "$user_info.degree", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    data = list(mongo.db.history.aggregate(pipeline))
-    labels = [d['_id'] if d['_id'] else "Unknown" for d in data]
-    values = [d['count'] for d in data]
+    labels, values = stats_store.top_counts(stats_store.read_stats(mongo.db)["degrees"])
     return jsonify({"labels": labels, "data": values}), 200
 
+def serialize_user(u):
+    return {"name": u.get('name','Unknown'), "email": u.get('email','Unknown'),
+            "date": u['_id'].generation_time.strftime("%Y-%m-%d")}
+
+# Oldest account first, paged on _id; ?format=ndjson streams the rest
 @app.route('/api/admin/users', methods=['GET'])
 @jwt_required()
 def get_all_users():
     user_id = get_jwt_identity()
-    admin = mongo.db.users.find_one({"_id": ObjectId(user_id)})
+    admin = mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"role": 1})
     if admin.get('role') != 'admin': 
         return jsonify({"message": "Access Denied"}), 403
 
-    users_cursor = mongo.db.users.find({"role": {"$ne": "admin"}})
-    user_list = []
-    for u in users_cursor:
-        join_date = u['_id'].generation_time.strftime("%Y-%m-%d") if u.get('_id') else "Unknown"
-        user_list.append({"name": u.get('name','Unknown'), "email": u.get('email','Unknown'), "date": join_date})
-    return jsonify(user_list), 200
+    query = {"role": {"$ne": "admin"}}
+    try:
+        limit = page_limit(request.args, PAGE_SIZE, PAGE_SIZE_MAX)
+        if request.args.get('cursor'):
+            query["_id"] = {"$gt": decode_cursor(request.args['cursor'], ObjectId)[0]}
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    cursor = mongo.db.users.find(query, {"name": 1, "email": 1}).sort("_id", 1)
+    if request.args.get('format') == 'ndjson':
+        if 'limit' in request.args: cursor = cursor.limit(limit)
+        return ndjson_response(cursor.batch_size(STREAM_BATCH_SIZE), serialize_user)
+    return page_response(cursor, limit, serialize_user, lambda u: encode_cursor(u["_id"]))
 
 @app.route('/api/admin/stats', methods=['GET'])
 @jwt_required()
@@ -515,15 +735,11 @@ def admin_stats():
         return jsonify({"message": "Access Denied"}), 403
 
     total_users = mongo.db.users.count_documents({"role": "student"})
-    total_preds = mongo.db.history.count_documents({})
-
-    feedback_agg = list(mongo.db.history.aggregate([
-        {"$match": {"feedback": {"$exists": True}}},
-        {"$group": {"_id": None, "avg_rating": {"$avg": "$feedback"}}}
-    ]))
-    avg_rating = round(feedback_agg[0]['avg_rating'], 1) if feedback_agg else "N/A"
-
     recent_logs = list(mongo.db.history.find().sort("date", -1).limit(10))
+    return jsonify(admin_summary(total_users, stats_store.read_stats(mongo.db), recent_logs)), 200
+
+def admin_summary(total_users, stats, recent_logs):
+    avg_rating = round(stats["average_rating"], 1) if stats["average_rating"] is not None else "N/A"
     logs_data = []
     for log in recent_logs:
         logs_data.append({
@@ -536,12 +752,41 @@ def admin_stats():
             "date": log["date"].strftime("%Y-%m-%d %H:%M")
         })
 
-    return jsonify({
+    return {
         "total_users": total_users,
-        "total_predictions": total_preds,
+        "total_predictions": stats["total"],
         "average_rating": avg_rating,
         "recent_logs": logs_data
-    }), 200
+    }
+
+@app.route('/api/admin/coalescer_stats', methods=['GET'])
+@jwt_required()
+def coalescer_stats():
+    user = mongo.db.users.find_one({"_id": ObjectId(get_jwt_identity())})
+    if user.get('role') != 'admin': 
+        return jsonify({"message": "Access Denied"}), 403
+
+    b = bundle
+    if not b or not isinstance(b.predictor, BatchCoalescer):
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **b.predictor.stats()}), 200
+
+@app.route('/api/admin/cache_stats', methods=['GET'])
+@jwt_required()
+def cache_stats():
+    user = mongo.db.users.find_one({"_id": ObjectId(get_jwt_identity())})
+    if user.get('role') != 'admin': 
+        return jsonify({"message": "Access Denied"}), 403
+    return jsonify({"model_version": bundle.version if bundle else None, **prediction_cache.stats()}), 200
+
+@app.route('/api/admin/history_writer_stats', methods=['GET'])
+@jwt_required()
+def history_writer_stats():
+    user = mongo.db.users.find_one({"_id": ObjectId(get_jwt_identity())})
+    if user.get('role') != 'admin': 
+        return jsonify({"message": "Access Denied"}), 403
+    return jsonify({**history_writer.stats(), "user_cache_hits": user_snapshots.hits,
+                    "user_cache_misses": user_snapshots.misses}), 200
 
 @app.route('/api/admin/flag_prediction', methods=['POST'])
 @jwt_required()
@@ -562,6 +807,65 @@ def flag_prediction():
         return jsonify({"message": "Prediction flagged for review."}), 200
     return jsonify({"message": "Error flagging prediction."}), 400
 
+# Whole history collection (optionally ?from=&to= dates, ?role= predicted
+# roles) as CSV, NDJSON or Parquet, streamed in ?batch_size= chunks
+@app.route('/api/admin/export/history', methods=['GET'])
+@jwt_required()
+def export_history():
+    user = mongo.db.users.find_one({"_id": ObjectId(get_jwt_identity())}, {"role": 1})
+    if user.get('role') != 'admin': return jsonify({"message": "Access Denied"}), 403
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"message": f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        batch_size = max(1, min(int(request.args.get('batch_size', STREAM_BATCH_SIZE)), EXPORT_BATCH_MAX))
+        date_from, date_to = (datetime.fromisoformat(request.args[k]) if request.args.get(k) else None
+                              for k in ('from', 'to'))
+    except ValueError:
+        return jsonify({"message": "batch_size must be an integer and from/to ISO dates"}), 400
+    roles = [r for arg in request.args.getlist('role') for r in arg.split(',') if r.strip()]
+
+    query = export_query(date_from, date_to, [r.strip() for r in roles])
+    app.logger.info(f"History export ({fmt}) by {get_jwt_identity()}: {query}")
+    mimetype, _ = EXPORT_FORMATS[fmt]
+    return Response(stream_history(mongo.db.history, query, fmt, batch_size), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={export_filename(fmt)}"})
+
+@app.route('/api/admin/models', methods=['GET'])
+@jwt_required()
+def list_models():
+    user = mongo.db.users.find_one({"_id": ObjectId(get_jwt_identity())})
+    if user.get('role') != 'admin': return jsonify({"message": "Access Denied"}), 403
+
+    return jsonify({
+        "live": bundle.version if bundle else None,
+        "current": registry.current_version(),
+        "versions": registry.versions()
+    }), 200
+
+@app.route('/api/admin/models/activate', methods=['POST'])
+@jwt_required()
+def activate_model():
+    user = mongo.db.users.find_one({"_id": ObjectId(get_jwt_identity())})
+    if user.get('role') != 'admin': return jsonify({"message": "Access Denied"}), 403
+
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    if not version:
+        # Default: roll back to the version before the live one
+        version = registry.previous_version(bundle.version) if bundle else None
+        if not version:
+            return jsonify({"message": "No previous version to roll back to"}), 400
+    if version not in registry.versions():
+        return jsonify({"message": f"Unknown model version: {version}"}), 404
+
+    if not load_artifacts(version):
+        return jsonify({"message": f"Failed to load model {version}"}), 500
+    registry.set_current(version)
+    app.logger.info(f"Model version {version} activated")
+    return jsonify({"message": f"Model {version} is now live", "version": version}), 200
+
 @app.route('/api/admin/upload_dataset', methods=['POST'])
 @jwt_required()
 def upload_dataset():
@@ -572,23 +876,111 @@ def upload_dataset():
     file = request.files['file']
     if file.filename == '': return jsonify({"message": "No selected file"}), 400
 
+    mode = request.form.get('mode', 'full')
+    if mode not in ('full', 'incremental'): return jsonify({"message": "Mode must be 'full' or 'incremental'"}), 400
+
     if file and file.filename.endswith('.csv'):
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        stem = os.path.join(UPLOAD_DIR, str(ObjectId()))
+        dataset_path, parquet_path = f"{stem}.csv", f"{stem}.parquet"
         try:
-            df = pd.read_csv(file)
-            required_cols = {'degree', 'specialization', 'cgpa', 'graduation_year', 'skills', 'job_role'}
-            if not required_cols.issubset(df.columns):
-                missing = required_cols - set(df.columns)
-                return jsonify({"message": f"Invalid CSV. Missing columns: {missing}"}), 400
-            
-            filename = "career_dataset.csv"
-            file.seek(0)
-            file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-      
-            thread = threading.Thread(target=run_training_script)
-            thread.start()
-            return jsonify({"message": "Dataset uploaded & Training started."}), 200
+            report = ingest_csv(file.stream, dataset_path, parquet_path, DATASET_CHUNK_ROWS)
+        except DatasetError as e:
+            return jsonify({"message": str(e)}), 400
         except Exception as e:
             return jsonify({"message": f"Error processing file: {str(e)}"}), 400
 
+        if report["rows_written"] == 0:
+            for path in (dataset_path, parquet_path):
+                os.remove(path)
+            return jsonify({"message": "Invalid CSV. No valid rows", "ingest": report}), 400
+
+        job_id = enqueue_training_job(mongo.db, dataset_path, file.filename, user.get('email'), mode, ingest=report)
+        ensure_worker(mongo.db, os.path.join('logs', 'training_worker.log'))
+        app.logger.info(f"Training job {job_id} queued by {user.get('email')} ({report['rows_written']} rows, {report['rows_rejected']} rejected)")
+        return jsonify({"message": "Dataset uploaded & Training queued.", "job_id": str(job_id), "ingest": report}), 202
+    return jsonify({"message": "Only .csv files are supported"}), 400
+
+@app.route('/api/admin/training_jobs', methods=['GET'])
+@jwt_required()
+def training_jobs():
+    user = mongo.db.users.find_one({"_id": ObjectId(get_jwt_identity())})
+    if user.get('role') != 'admin': return jsonify({"message": "Access Denied"}), 403
+
+    limit = min(int(request.args.get('limit', 20)), 100)
+    jobs = mongo.db.training_jobs.find().sort("created_at", -1).limit(limit)
+    return jsonify([serialize_job(j) for j in jobs]), 200
+
+@app.route('/api/admin/training_jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def training_job_detail(job_id):
+    user = mongo.db.users.find_one({"_id": ObjectId(get_jwt_identity())})
+    if user.get('role') != 'admin': return jsonify({"message": "Access Denied"}), 403
+
+    job = mongo.db.training_jobs.find_one({"_id": ObjectId(job_id)})
+    if not job: return jsonify({"message": "Job not found"}), 404
+    return jsonify(serialize_job(job, with_log=True)), 200
+
+#Metrics
+# Prometheus text format for this process. The histograms are recorded on
+# the request path; the series below are read from their owners (and the
+# training job durations from MongoDB) only when /metrics is scraped.
+# Scrapes must send `Authorization: Bearer <METRICS_TOKEN>`; without a
+# token the endpoint answers 403 unless METRICS_PUBLIC=1 opens it.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "0") == "1"
+
+Collected("edu2job_cache_lookups_total", "Prediction and user snapshot cache lookups by result.", "counter",
+          lambda: {
+              (("cache", "prediction"), ("result", "hit")): prediction_cache.hits,
+              (("cache", "prediction"), ("result", "miss")): prediction_cache.misses,
+              (("cache", "user"), ("result", "hit")): user_snapshots.hits,
+              (("cache", "user"), ("result", "miss")): user_snapshots.misses,
+          })
+Collected("edu2job_prediction_cache_events_total", "Prediction cache evictions, expirations and backend errors.", "counter",
+          lambda: {(("event", event),): getattr(prediction_cache, event + "s")
+                   for event in ("eviction", "expiration", "error")})
+Collected("edu2job_history_writer_pending", "History records waiting to be written.", "gauge",
+          lambda: {(): history_writer.stats()["pending"]})
+Collected("edu2job_history_writer_records_total", "History records by outcome.", "counter",
+          lambda: {(("outcome", outcome),): history_writer.stats()[outcome]
+                   for outcome in ("written", "spilled", "rejected")})
+Collected("edu2job_password_pool_calls_total", "bcrypt pool calls by outcome.", "counter",
+          lambda: {(("outcome", outcome),): passwords.stats()[outcome] for outcome in ("completed", "rejected")})
+
+# Training jobs run in the worker process, so their durations are picked
+# up from MongoDB when /metrics is scraped: only jobs finished since the
+# previous scrape (or since this process started), oldest first, at most
+# TRAINING_METRICS_BATCH per scrape, each observed once
+TRAINING_JOB_SECONDS = Histogram("edu2job_training_job_seconds", "Duration of finished training jobs.",
+                                 ("mode", "status"), buckets=TRAINING_BUCKETS)
+TRAINING_METRICS_BATCH = 500
+_training_seen = {"finished_at": datetime.now()}
+_training_seen_lock = threading.Lock()
+
+def observe_training_jobs():
+    with _training_seen_lock:
+        jobs = mongo.db.training_jobs.find(
+            {"finished_at": {"$gt": _training_seen["finished_at"]}},
+            {"mode": 1, "status": 1, "started_at": 1, "finished_at": 1}
+        ).sort("finished_at", 1).limit(TRAINING_METRICS_BATCH)
+        for job in jobs:
+            _training_seen["finished_at"] = job["finished_at"]
+            if job.get("started_at") and job.get("status") in ("succeeded", "failed"):
+                TRAINING_JOB_SECONDS.labels(job.get("mode", "full"), job["status"]).observe(
+                    (job["finished_at"] - job["started_at"]).total_seconds())
+
+@app.route('/metrics', methods=['GET'])
+@limiter.exempt
+def metrics_endpoint():
+    if not METRICS_PUBLIC and not (METRICS_TOKEN and hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}")):
+        return jsonify({"message": "Access Denied"}), 403
+    try:
+        observe_training_jobs()
+    except Exception as e:
+        app.logger.error(f"Metrics collection failed for {TRAINING_JOB_SECONDS.name}: {e}")
+    return Response(metrics.REGISTRY.render(app.logger.error), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
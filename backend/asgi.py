@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import wraps
+
+import jwt
+from bson.objectid import ObjectId
+from limits import parse_many
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.applications import Starlette
+from starlette.datastructures import MutableHeaders
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route, Mount
+from werkzeug.datastructures import Accept
+from werkzeug.http import http_date, parse_accept_header, parse_etags
+
+import app as flask_app
+import stats_store
+from history_writer import HistoryBacklogged
+from metrics import REQUEST_SECONDS, JWT_DECODE_SECONDS, MONGO_SECONDS
+from pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor, page_limit, after_date_id
+from shared_state import limiter_storage_uri
+
+# ASGI entry point (`uvicorn asgi:app`) for the same API. The I/O-bound
+# routes below are served natively with Motor, so a request waiting on
+# MongoDB holds no thread; model scoring runs in a small thread pool so it
+# does not stall the event loop. Every other route is handed to the Flask
+# app (app.py) unchanged, which also still runs on its own under WSGI.
+# The model bundle, prediction cache and page sizes are app.py's.
+
+SCORING_THREADS = int(os.getenv("ASGI_SCORING_THREADS", os.cpu_count() or 1))
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+
+db = AsyncIOMotorClient(os.getenv("MONGO_URI")).get_default_database()
+scoring_pool = ThreadPoolExecutor(max_workers=SCORING_THREADS, thread_name_prefix="scoring")
+# app.py's default limits, per route and client address, in the same backend
+rate_limiter = FixedWindowRateLimiter(storage_from_string(limiter_storage_uri()))
+RATE_LIMITS = [item for spec in flask_app.DEFAULT_RATE_LIMITS for item in parse_many(spec)]
+
+
+# Same body encoding as Flask's jsonify (datetimes as HTTP dates)
+def json_response(body, status=200, headers=None):
+    payload = json.dumps(body, default=lambda o: http_date(o) if isinstance(o, datetime) else str(o))
+    return Response(payload, status_code=status, headers=headers, media_type="application/json")
+
+def run_scoring(fn, *args):
+    return asyncio.get_running_loop().run_in_executor(scoring_pool, fn, *args)
+
+# Validates the same tokens flask_jwt_extended issues (HS256, identity in
+# "sub") and answers failures with its status codes and {"msg": ...} bodies
+def jwt_required(handler):
+    @wraps(handler)
+    async def wrapper(request):
+        header = request.headers.get("Authorization", "")
+        if not header.startswith("Bearer "):
+            return json_response({"msg": "Missing Authorization Header"}, 401)
+        try:
+            with JWT_DECODE_SECONDS.time():
+                claims = jwt.decode(header[len("Bearer "):], JWT_SECRET_KEY, algorithms=["HS256"])
+        except jwt.ExpiredSignatureError:
+            return json_response({"msg": "Token has expired"}, 401)
+        except jwt.InvalidTokenError as e:
+            return json_response({"msg": str(e)}, 422)
+        request.state.user_id = claims["sub"]
+        return await handler(request)
+    return wrapper
+
+# First limit the request exceeds, or None. Blocking (a round trip to a
+# shared backend), so it runs in the default executor.
+def _exceeded_limit(path, client):
+    for item in RATE_LIMITS:
+        if not rate_limiter.hit(item, "asgi", path, client):
+            return item
+    return None
+
+def rate_limited(handler):
+    @wraps(handler)
+    async def wrapper(request):
+        client = request.client.host if request.client else "unknown"
+        item = await asyncio.get_running_loop().run_in_executor(None, _exceeded_limit, request.url.path, client)
+        if item is not None:
+            return json_response({"message": f"Rate limit exceeded: {item}"}, 429)
+        return await handler(request)
+    return wrapper
+
+# Same series as app.py's after_request hook; mounted routes are timed there
+def timed(route, handler):
+    @wraps(handler)
+    async def wrapper(request):
+        started = time.perf_counter()
+        response = await handler(request)
+        REQUEST_SECONDS.labels(request.method, route, str(response.status_code)).observe(time.perf_counter() - started)
+        return response
+    return wrapper
+
+async def require_admin(request):
+    user = await db.users.find_one({"_id": ObjectId(request.state.user_id)}, {"role": 1})
+    return user is not None and user.get("role") == "admin"
+
+async def record_stats(update):
+    try:
+        await db.stats.update_one({"_id": stats_store.STATS_ID}, update, upsert=True)
+    except Exception as e:
+        flask_app.app.logger.warning(f"Statistics update failed: {e}")
+
+
+#Prediction
+@jwt_required
+async def predict(request):
+    if not flask_app.bundle:
+        if not await run_scoring(flask_app.load_artifacts):
+            return json_response({"message": "Model not loaded. Train first."}, 503)
+    b = flask_app.bundle
+    user_id = request.state.user_id
+
+    try:
+        data = await request.json()
+        results, valid_skills = await run_scoring(flask_app.score_profile, b, data)
+
+        #Save to History (app.py's write-behind queue; never blocks the loop)
+        user = flask_app.user_snapshots.get(user_id)
+        if user is None:
+            with MONGO_SECONDS.labels("user_lookup").time():
+                user = await db.users.find_one({"_id": ObjectId(user_id)}, flask_app.HISTORY_USER_FIELDS) or {}
+            flask_app.user_snapshots.put(user_id, user)
+        flask_app.history_writer.submit(flask_app.history_record(user_id, user, results), timeout=0)
+
+        return json_response({"top_predictions": results, "justification": f"Based on your skills: {', '.join(valid_skills)}"})
+
+    except json.JSONDecodeError:
+        return json_response({"message": "Request body must be JSON"}, 400)
+    except HistoryBacklogged as e:
+        return json_response({"message": str(e)}, 503, {"Retry-After": "1"})
+    except Exception as e:
+        print(f"Prediction Error: {e}")
+        return json_response({"message": f"Server Error: {str(e)}"}, 500)
+
+
+#History & Feedback
+@jwt_required
+async def history(request):
+    query = {"user_id": ObjectId(request.state.user_id)}
+    try:
+        limit = page_limit(request.query_params, flask_app.PAGE_SIZE, flask_app.PAGE_SIZE_MAX)
+        if request.query_params.get('cursor'):
+            query.update(after_date_id(*decode_cursor(request.query_params['cursor'], datetime, ObjectId)))
+    except ValueError as e:
+        return json_response({"message": str(e)}, 400)
+
+    cursor = db.history.find(query, flask_app.HISTORY_FIELDS).sort([("date", -1), ("_id", -1)])
+    if request.query_params.get('format') == 'ndjson':
+        if 'limit' in request.query_params: cursor = cursor.limit(limit)
+        cursor = cursor.batch_size(flask_app.STREAM_BATCH_SIZE)
+
+        async def generate():
+            async for h in cursor:
+                yield json.dumps(flask_app.serialize_history(h)) + "\n"
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    docs = await cursor.limit(limit + 1).to_list(limit + 1)
+    headers = {NEXT_CURSOR_HEADER: encode_cursor(docs[limit - 1]["date"], docs[limit - 1]["_id"])} if len(docs) > limit else None
+    return json_response([flask_app.serialize_history(h) for h in docs[:limit]], headers=headers)
+
+@jwt_required
+async def submit_feedback(request):
+    try:
+        data = await request.json()
+    except json.JSONDecodeError:
+        return json_response({"message": "Request body must be JSON"}, 400)
+    rating = int(data.get('rating', 0))
+
+    previous = await db.history.find_one_and_update(
+        {"_id": ObjectId(data.get('prediction_id')), "user_id": ObjectId(request.state.user_id)},
+        {"$set": {"feedback": rating}},
+        projection={"feedback": 1}
+    )
+    if previous is not None and previous.get("feedback") != rating:
+        await record_stats(stats_store.feedback_update(rating, previous.get("feedback")))
+        return json_response({"message": "Feedback saved!"})
+    return json_response({"message": "Error saving feedback"}, 404)
+
+
+#Profile & Stats
+@jwt_required
+async def get_profile(request):
+    user = await db.users.find_one({"_id": ObjectId(request.state.user_id)})
+    user['_id'] = str(user['_id'])
+    return json_response(user)
+
+async def _stats():
+    return stats_store.summarize(await db.stats.find_one({"_id": stats_store.STATS_ID}))
+
+@jwt_required
+async def job_distribution(request):
+    labels, data = stats_store.top_counts((await _stats())["roles"], 10)
+    return json_response({"labels": labels, "data": data})
+
+@jwt_required
+async def degree_job_stats(request):
+    labels, values = stats_store.top_counts((await _stats())["degrees"])
+    return json_response({"labels": labels, "data": values})
+
+@jwt_required
+async def admin_stats(request):
+    if not await require_admin(request):
+        return json_response({"message": "Access Denied"}, 403)
+    total_users, stats, recent_logs = await asyncio.gather(
+        db.users.count_documents({"role": "student"}),
+        _stats(),
+        db.history.find().sort("date", -1).limit(10).to_list(10)
+    )
+    return json_response(flask_app.admin_summary(total_users, stats, recent_logs))
+
+
+#Config API
+async def get_config(request):
+    b = flask_app.bundle
+    if not b or b.config is None:
+        return json_response({"message": "Metadata not found. Train model first."}, 404)
+    encoding = b.config.select(parse_accept_header(request.headers.get("Accept-Encoding"), Accept))
+    etag = b.config.etags[encoding]
+    headers = {"ETag": f'"{etag}"', "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if_none_match = parse_etags(request.headers.get("If-None-Match"))
+    if any(if_none_match.contains(tag) for tag in b.config.etags.values()):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(b.config.variants[encoding], headers=headers, media_type="application/json")
+
+
+# The headers app.py's after_request hook sets, for the native routes too
+class SecurityHeaders:
+    HEADERS = {"X-Frame-Options": "SAMEORIGIN", "X-Content-Type-Options": "nosniff",
+               "X-XSS-Protection": "1; mode=block"}
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in self.HEADERS.items():
+                    headers.setdefault(name, value)
+            await send(message)
+        await self.app(scope, receive, send_with_headers)
+
+
+NATIVE_ROUTES = [
+    ('/api/predict', predict, ['POST']),
+    ('/api/history', history, ['GET']),
+    ('/api/feedback', submit_feedback, ['POST']),
+    ('/api/profile', get_profile, ['GET']),
+    ('/api/stats/job_distribution', job_distribution, ['GET']),
+    ('/api/stats/degree_job', degree_job_stats, ['GET']),
+    ('/api/admin/stats', admin_stats, ['GET']),
+    ('/api/config', get_config, ['GET']),
+]
+
+app = Starlette(
+    routes=[Route(path, timed(path, rate_limited(handler)), methods=methods) for path, handler, methods in NATIVE_ROUTES] + [
+        # Everything else: the Flask app, run in Starlette's WSGI thread pool
+        Mount('/', app=WSGIMiddleware(flask_app.app)),
+    ],
+    middleware=[
+        Middleware(SecurityHeaders),
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
+                   expose_headers=[NEXT_CURSOR_HEADER]),
+    ],
+)
@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import scipy.sparse as sp
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_DELAY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+# Micro-batching front for the model: requests that arrive within
+# `window_ms` of each other (up to `max_batch` rows) are scored with a
+# single predict_proba call and each caller gets its own rows back.
+# Exposes the same predict_proba interface as the wrapped model.
+class BatchCoalescer:
+    def __init__(self, model, window_ms=2.0, max_batch=32):
+        self.model = model
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.queue_delay_counts = [0] * (len(QUEUE_DELAY_BUCKETS_MS) + 1)
+        self.queue_delay_total_ms = 0.0
+        self.queue_delay_max_ms = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="predict-coalescer", daemon=True)
+        self._thread.start()
+
+    def predict_proba(self, X):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                return self.model.predict_proba(X)
+            self._queue.put((X, time.perf_counter(), future))
+        return future.result()
+
+    def close(self):
+        # Requests queued before close are still scored; later ones bypass the queue
+        with self._lock:
+            if self._closed: return
+            self._closed = True
+            self._queue.put(None)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None: return
+
+            batch, rows = [item], item[0].shape[0]
+            deadline = time.perf_counter() + self.window
+            stop = False
+            while rows < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0: break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                rows += item[0].shape[0]
+
+            self._score(batch, rows)
+            if stop: return
+
+    def _score(self, batch, rows):
+        started = time.perf_counter()
+        delays_ms = [(started - enqueued) * 1000 for _, enqueued, _ in batch]
+        try:
+            inputs = [X for X, _, _ in batch]
+            # Sparse-input models get CSR rows (see FeatureEngine)
+            stacked = sp.vstack(inputs, format='csr') if sp.issparse(inputs[0]) else np.vstack(inputs)
+            probs = self.model.predict_proba(stacked)
+            offset = 0
+            for X, _, future in batch:
+                n = X.shape[0]
+                future.set_result(probs[offset:offset + n])
+                offset += n
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done(): future.set_exception(e)
+        self._record(rows, delays_ms)
+
+    @staticmethod
+    def _bucket(buckets, value):
+        for i, bound in enumerate(buckets):
+            if value <= bound: return i
+        return len(buckets)
+
+    def _record(self, rows, delays_ms):
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += len(delays_ms)
+            self.batch_size_counts[self._bucket(BATCH_SIZE_BUCKETS, rows)] += 1
+            for d in delays_ms:
+                self.queue_delay_counts[self._bucket(QUEUE_DELAY_BUCKETS_MS, d)] += 1
+                self.queue_delay_total_ms += d
+                if d > self.queue_delay_max_ms: self.queue_delay_max_ms = d
+
+    def stats(self):
+        with self._stats_lock:
+            size_labels = [f"<={b}" for b in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+            delay_labels = [f"<={b}ms" for b in QUEUE_DELAY_BUCKETS_MS] + [f">{QUEUE_DELAY_BUCKETS_MS[-1]}ms"]
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "batches": self.batches,
+                "requests": self.requests,
+                "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0,
+                "batch_size_histogram": dict(zip(size_labels, self.batch_size_counts)),
+                "queue_delay_histogram": dict(zip(delay_labels, self.queue_delay_counts)),
+                "avg_queue_delay_ms": round(self.queue_delay_total_ms / self.requests, 3) if self.requests else 0,
+                "max_queue_delay_ms": round(self.queue_delay_max_ms, 3),
+            }
@@ -0,0 +1,72 @@
+import os
+import ctypes
+
+import numpy as np
+import scipy.sparse as sp
+
+TREE_LIBRARY = "tree_eval.so"
+TREE_ARRAYS = ("tree_root", "tree_class", "tree_depth", "tree_nodes")
+SERVING_ARRAYS = ("serving_root", "serving_class", "serving_nodes", "serving_leaves",
+                  "serving_scale", "serving_class_mask")
+LEAF_BITS = {"int8": 8, "float16": 16}
+# SERVING_VARIANT=0 scores with the exact trees even when a bundle ships
+# the pruned, quantized variant (train_model.py --serving)
+USE_SERVING_VARIANT = os.getenv("SERVING_VARIANT", "1") != "0"
+
+_ptr = ctypes.c_void_p
+_i64 = ctypes.c_int64
+
+
+# Scores a bundle's trees with the native evaluator built next to it at
+# training time (ml-model/tree_eval.c). Same predict_proba interface as
+# the XGBClassifier it stands in for, without DMatrix construction or
+# XGBoost's per-call dispatch. The node arrays are the bundle's memmap views.
+# With `serving` (the header's serving report) it scores the pruned variant
+# instead, whose probabilities only approximate XGBoost's.
+class CompiledModel:
+    def __init__(self, library_path, arrays, n_classes, n_features, sparse_input=False, serving=None):
+        self.lib = ctypes.CDLL(library_path)
+        self.n_classes = n_classes
+        self.n_features_in_ = n_features
+        # Absent CSR entries are missing (NaN) to a sparse-trained booster
+        self.fill_value = np.nan if sparse_input else 0.0
+        self.approximate = serving is not None
+
+        if self.approximate:
+            self._score = self.lib.predict_proba_compact
+            self._score.argtypes = [_ptr, _i64, _i64, _ptr, _ptr, _i64, _i64, _ptr, _ptr, _ptr, _i64, _ptr, _ptr]
+            self.arrays = {name: np.ascontiguousarray(arrays[name]) for name in SERVING_ARRAYS}
+            a = self.arrays
+            self.n_trees = len(a["serving_root"])
+            self._tree_args = (a["serving_root"].ctypes.data, a["serving_class"].ctypes.data, self.n_trees,
+                               n_classes, a["serving_class_mask"].ctypes.data, a["serving_nodes"].ctypes.data,
+                               a["serving_leaves"].ctypes.data, LEAF_BITS[serving["leaf_dtype"]],
+                               a["serving_scale"].ctypes.data)
+        else:
+            self._score = self.lib.predict_proba
+            self._score.argtypes = [_ptr, _i64, _i64, _ptr, _ptr, _ptr, _i64, _i64, _ptr, _ptr]
+            self.arrays = {name: np.ascontiguousarray(arrays[name]) for name in TREE_ARRAYS}
+            a = self.arrays
+            self.n_trees = len(a["tree_root"])
+            self._tree_args = (a["tree_root"].ctypes.data, a["tree_class"].ctypes.data, a["tree_depth"].ctypes.data,
+                               self.n_trees, n_classes, a["tree_nodes"].ctypes.data)
+        self._score.restype = None
+
+    def _dense(self, X):
+        if not sp.issparse(X):
+            return np.ascontiguousarray(X, dtype=np.float32)
+        X = X.tocsr()
+        dense = np.full(X.shape, self.fill_value, dtype=np.float32)
+        if X.shape[0] == 1:
+            dense[0, X.indices] = X.data
+        else:
+            dense[np.repeat(np.arange(X.shape[0]), np.diff(X.indptr)), X.indices] = X.data
+        return dense
+
+    def predict_proba(self, X):
+        X = self._dense(X)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Feature shape mismatch, expected: {self.n_features_in_}, got {X.shape[1]}")
+        out = np.empty((X.shape[0], self.n_classes), dtype=np.float32)
+        self._score(X.ctypes.data, X.shape[0], X.shape[1], *self._tree_args, out.ctypes.data)
+        return out
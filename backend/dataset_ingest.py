@@ -0,0 +1,134 @@
+import io
+import os
+import csv
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Streaming ingestion of uploaded training CSVs. The upload is read record
+# by record and validated in fixed-size chunks, so memory stays flat no
+# matter how large the file is. Accepted rows are written twice, chunk by
+# chunk: as a normalized CSV (the canonical dataset, byte-stable so
+# appended uploads can be detected) and as Parquet for the trainer.
+
+REQUIRED_COLUMNS = {'degree', 'specialization', 'cgpa', 'graduation_year', 'skills', 'job_role'}
+DATASET_COLUMNS = ["degree", "specialization", "skills", "certifications", "cgpa",
+                   "graduation_year", "internship_experience", "job_role"]
+PARQUET_SCHEMA = pa.schema([
+    ("degree", pa.string()),
+    ("specialization", pa.string()),
+    ("skills", pa.string()),
+    ("certifications", pa.string()),
+    ("cgpa", pa.float64()),
+    ("graduation_year", pa.float64()),
+    ("internship_experience", pa.string()),
+    ("job_role", pa.string()),
+])
+# The strings pandas.read_csv treats as missing; the Parquet copy must agree
+# with what training on the CSV would have seen
+NA_STRINGS = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+              "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+MAX_REPORTED_ERRORS = 100
+
+
+class DatasetError(ValueError):
+    pass
+
+
+class _ChunkWriter:
+    def __init__(self, csv_path, parquet_path, report):
+        self.report = report
+        self.csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+        self.csv_writer = csv.writer(self.csv_file, lineterminator="\n")
+        self.csv_writer.writerow(DATASET_COLUMNS)
+        self.parquet_writer = pq.ParquetWriter(parquet_path, PARQUET_SCHEMA)
+
+    def reject(self, line, reason):
+        self.report["rows_rejected"] += 1
+        if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+            self.report["errors"].append({"line": line, "reason": reason})
+
+    def write(self, rows, lines):
+        if not rows: return
+        df = pd.DataFrame(rows, columns=DATASET_COLUMNS)
+        df = df.mask(df.isin(NA_STRINGS))
+
+        cgpa = pd.to_numeric(df["cgpa"], errors="coerce")
+        year = pd.to_numeric(df["graduation_year"], errors="coerce")
+        checks = [
+            (df["job_role"].isna(), "missing job_role"),
+            (df["cgpa"].notna() & (cgpa.isna() | (cgpa < 0) | (cgpa > 10)), "cgpa must be a number between 0 and 10"),
+            (df["graduation_year"].notna() & (year.isna() | (year % 1 != 0)), "graduation_year must be a whole number"),
+        ]
+        bad = pd.Series(False, index=df.index)
+        for mask, reason in checks:
+            for i in np.flatnonzero(mask & ~bad):
+                self.reject(lines[i], reason)
+            bad |= mask
+
+        good = ~bad
+        if not good.any(): return
+        self.csv_writer.writerows(row for row, ok in zip(rows, good) if ok)
+        typed = df[good].assign(cgpa=cgpa[good], graduation_year=year[good])
+        self.parquet_writer.write_table(pa.Table.from_pandas(typed, schema=PARQUET_SCHEMA, preserve_index=False))
+        self.report["rows_written"] += int(good.sum())
+
+    def close(self):
+        self.csv_file.close()
+        # Parquet is closed last so it is never older than its CSV
+        self.parquet_writer.close()
+
+
+def ingest_csv(stream, csv_path, parquet_path, chunk_rows=50000):
+    report = {"rows_read": 0, "rows_written": 0, "rows_rejected": 0, "errors": []}
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    writer = None
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if not header:
+            raise DatasetError("Invalid CSV. File is empty")
+        header = [h.strip() for h in header]
+        missing = REQUIRED_COLUMNS - set(header)
+        if missing:
+            raise DatasetError(f"Invalid CSV. Missing columns: {missing}")
+        positions = [header.index(c) if c in header else None for c in DATASET_COLUMNS]
+
+        writer = _ChunkWriter(csv_path, parquet_path, report)
+        rows, lines = [], []
+        for record in reader:
+            if not any(field.strip() for field in record): continue
+            report["rows_read"] += 1
+            if len(record) != len(header):
+                writer.reject(reader.line_num, f"expected {len(header)} fields, saw {len(record)}")
+                continue
+            rows.append([record[p].strip() if p is not None else "" for p in positions])
+            lines.append(reader.line_num)
+            if len(rows) >= chunk_rows:
+                writer.write(rows, lines)
+                rows, lines = [], []
+        writer.write(rows, lines)
+        writer.close()
+        report["errors"].sort(key=lambda e: e["line"])
+    except UnicodeDecodeError:
+        _discard(writer, csv_path, parquet_path)
+        raise DatasetError("Invalid CSV. File must be UTF-8 encoded")
+    except csv.Error as e:
+        _discard(writer, csv_path, parquet_path)
+        raise DatasetError(f"Invalid CSV. {e}")
+    except Exception:
+        _discard(writer, csv_path, parquet_path)
+        raise
+    finally:
+        text.detach()
+    return report
+
+def _discard(writer, *paths):
+    if writer:
+        try: writer.close()
+        except Exception: pass
+    for path in paths:
+        try: os.remove(path)
+        except OSError: pass
@@ -0,0 +1,111 @@
+import os
+import sys
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from dotenv import load_dotenv
+
+# Indexes the app's queries rely on, declared in one place. ensure_indexes
+# runs at app start (and `python db_indexes.py create`); creating an index
+# that already exists with the same spec is a no-op. `python db_indexes.py
+# check` explains every query in ENDPOINT_QUERIES and exits non-zero if
+# any of them would scan a whole collection.
+
+INDEXES = {
+    "users": [
+        # Also what keeps /register from creating a second account
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("role", ASCENDING)], name="role"),
+        IndexModel([("degree", ASCENDING)], name="degree"),
+    ],
+    "history": [
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="user_date"),
+        IndexModel([("date", DESCENDING)], name="date"),
+        IndexModel([("feedback", ASCENDING)], name="feedback"),
+    ],
+    "training_jobs": [
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created"),
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+        IndexModel([("finished_at", ASCENDING)], name="finished_at"),
+    ],
+}
+
+# (name, collection, filter, sort, limit) for what the endpoints run
+ENDPOINT_QUERIES = [
+    ("register / login by email", "users", {"email": "someone@example.com"}, None, 1),
+    ("admin_stats student count", "users", {"role": "student"}, None, 0),
+    ("get_all_users", "users", {"role": {"$ne": "admin"}, "_id": {"$gt": ObjectId()}}, [("_id", 1)], 101),
+    ("compare_stats degree match", "users", {"degree": "B.Tech"}, None, 0),
+    ("history", "history", {"user_id": ObjectId(), "$or": [{"date": {"$lt": datetime.now()}},
+                                                          {"date": datetime.now(), "_id": {"$lt": ObjectId()}}]},
+     [("date", -1), ("_id", -1)], 101),
+    ("admin_stats recent logs", "history", {}, [("date", -1)], 10),
+    ("export history", "history", {"date": {"$gte": datetime.now()}}, [("date", 1)], 0),
+    ("stats rebuild ratings", "history", {"feedback": {"$type": "number"}}, None, 0),
+    ("history backfill", "history", {"degree": {"$exists": False}}, [("_id", 1)], 500),
+    ("training_jobs", "training_jobs", {}, [("created_at", -1)], 20),
+    ("claim_next_job", "training_jobs", {"status": "queued"}, [("created_at", 1)], 1),
+    ("metrics training durations", "training_jobs", {"finished_at": {"$gt": datetime.now()}}, [("finished_at", 1)], 500),
+]
+
+
+def ensure_indexes(db, log=print):
+    created = []
+    for collection, indexes in INDEXES.items():
+        try:
+            created += db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            # e.g. duplicate emails already stored, or an index of the same
+            # name with different options; the others in the list still matter
+            log(f"Could not create indexes on {collection}: {e}")
+    return created
+
+def _stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+def check_query_plans(db):
+    results = []
+    for name, collection, query, sort, limit in ENDPOINT_QUERIES:
+        command = {"find": collection, "filter": query}
+        if sort:
+            command["sort"] = dict(sort)
+        if limit:
+            command["limit"] = limit
+        explain = db.command({"explain": command, "verbosity": "queryPlanner"})
+        stages = list(_stages(explain["queryPlanner"]["winningPlan"]))
+        results.append((name, collection, stages))
+    return results
+
+def main():
+    load_dotenv()
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command not in ("create", "check"):
+        print("Usage: python db_indexes.py create|check")
+        sys.exit(2)
+    db = MongoClient(os.getenv("MONGO_URI")).get_default_database()
+
+    if command == "create":
+        created = ensure_indexes(db)
+        print(f"Indexes ensured: {', '.join(created) or 'none'}")
+        return
+
+    failures = 0
+    for name, collection, stages in check_query_plans(db):
+        scan = "COLLSCAN" in stages
+        failures += scan
+        print(f"{'FAIL' if scan else 'ok  '} {name:<30} {collection:<14} {' <- '.join(stages)}")
+    if failures:
+        print(f"{failures} queries scan a whole collection; run `python db_indexes.py create`.")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import sys
+import time
+import fnmatch
+import argparse
+import threading
+import socketserver
+
+# Minimal in-memory Redis-protocol server for local runs and tests of the
+# shared state backend (SHARED_STATE_URI=redis://localhost:6390/0). It
+# implements only the commands shared_state.py sends, plus a few for
+# inspection; nothing is persisted.
+#   python fake_redis.py [--port 6390]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.dbs = {}
+        self.lock = threading.Lock()
+
+    def _db(self, n):
+        return self.dbs.setdefault(n, {})
+
+    def _live(self, db, key):
+        entry = db.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.monotonic():
+            del db[key]
+            return None
+        return entry
+
+    def command(self, session, args):
+        name = args[0].upper().decode()
+        with self.lock:
+            db = self._db(session["db"])
+            handler = getattr(self, f"cmd_{name.lower()}", None)
+            if handler is None:
+                return Exception(f"ERR unknown command '{name}'")
+            try:
+                return handler(session, db, *args[1:])
+            except (TypeError, ValueError, IndexError):
+                return Exception(f"ERR wrong arguments for '{name}' command")
+
+    def cmd_ping(self, session, db, *args):
+        return args[0] if args else "PONG"
+
+    def cmd_auth(self, session, db, *args):
+        return "OK"
+
+    def cmd_select(self, session, db, n):
+        session["db"] = int(n)
+        return "OK"
+
+    def cmd_get(self, session, db, key):
+        entry = self._live(db, key)
+        return entry[0] if entry else None
+
+    def cmd_mget(self, session, db, *keys):
+        return [self.cmd_get(session, db, k) for k in keys]
+
+    def cmd_set(self, session, db, key, value, *opts):
+        opts = [o.upper() if isinstance(o, bytes) else o for o in opts]
+        expires = None
+        if b"EX" in opts: expires = time.monotonic() + int(opts[opts.index(b"EX") + 1])
+        if b"PX" in opts: expires = time.monotonic() + int(opts[opts.index(b"PX") + 1]) / 1000
+        exists = self._live(db, key) is not None
+        if (b"NX" in opts and exists) or (b"XX" in opts and not exists):
+            return None
+        db[key] = (value, expires)
+        return "OK"
+
+    def cmd_incrby(self, session, db, key, amount):
+        entry = self._live(db, key) or (b"0", None)
+        value = int(entry[0]) + int(amount)
+        db[key] = (str(value).encode(), entry[1])
+        return value
+
+    def cmd_incr(self, session, db, key):
+        return self.cmd_incrby(session, db, key, b"1")
+
+    def cmd_expire(self, session, db, key, seconds):
+        entry = self._live(db, key)
+        if not entry: return 0
+        db[key] = (entry[0], time.monotonic() + int(seconds))
+        return 1
+
+    def cmd_pttl(self, session, db, key):
+        entry = self._live(db, key)
+        if not entry: return -2
+        return -1 if entry[1] is None else int((entry[1] - time.monotonic()) * 1000)
+
+    def cmd_ttl(self, session, db, key):
+        ms = self.cmd_pttl(session, db, key)
+        return ms if ms < 0 else ms // 1000
+
+    def cmd_del(self, session, db, *keys):
+        return sum(self._live(db, k) is not None and db.pop(k) is not None for k in keys)
+
+    def cmd_exists(self, session, db, *keys):
+        return sum(self._live(db, k) is not None for k in keys)
+
+    def cmd_dbsize(self, session, db):
+        return sum(self._live(db, k) is not None for k in list(db))
+
+    # One pass over everything: the cursor it returns is always 0
+    def cmd_scan(self, session, db, cursor, *opts):
+        opts = [o.upper() if i % 2 == 0 else o for i, o in enumerate(opts)]
+        pattern = opts[opts.index(b"MATCH") + 1] if b"MATCH" in opts else b"*"
+        return [b"0", [k for k in list(db) if self._live(db, k) is not None and fnmatch.fnmatchcase(k, pattern)]]
+
+    def cmd_flushdb(self, session, db):
+        db.clear()
+        return "OK"
+
+
+def _reply(value):
+    if isinstance(value, Exception):
+        return b"-%s\r\n" % str(value).encode()
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_reply(v) for v in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # inline command (e.g. from telnet)
+        args = []
+        for _ in range(int(line[1:])):
+            n = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(n + 2)[:-2])
+        return args
+
+    def handle(self):
+        session = {"db": 0}
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            if args:
+                self.wfile.write(_reply(self.server.store.command(session, args)))
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 6390)):
+        super().__init__(address, _Handler)
+        self.store = FakeRedis()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="fake-redis", daemon=True).start()
+        return self
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory Redis-protocol server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    server = FakeRedisServer((args.host, args.port))
+    print(f"Fake Redis listening on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import numpy as np
+import scipy.sparse as sp
+
+STOP_WORDS = {"communication", "problem solving", "critical thinking", "teamwork", "leadership"}
+
+
+# Precompiled feature assembly for the prediction hot path.
+# Built once per loaded model so a request only does dict lookups and
+# float arithmetic; the output row matches what the pandas pipeline
+# (scaler.transform -> mlb.transform -> reindex) fed to XGBoost.
+# Models trained on CSR (sparse=True) get CSR rows holding only the
+# non-zero entries, since XGBoost reads an absent entry as missing.
+class FeatureEngine:
+    def __init__(self, label_encoders, scaler, mlb, feature_names, sparse=False):
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+        self.sparse = sparse
+
+        # LabelEncoder classes_ are sorted, so position == encoded value
+        self.degree_index = {c: i for i, c in enumerate(label_encoders["degree"].classes_)}
+        self.spec_index = {c: i for i, c in enumerate(label_encoders["specialization"].classes_)}
+        self.cert_index = {c: i for i, c in enumerate(label_encoders["certifications"].classes_)}
+
+        # Scaler parameters inlined as plain floats (same float64 maths as transform)
+        self.cgpa_mean, self.year_mean = (float(v) for v in scaler.mean_)
+        self.cgpa_scale, self.year_scale = (float(v) for v in scaler.scale_)
+
+        columns = {name: i for i, name in enumerate(self.feature_names)}
+        self.cgpa_col = columns.get("cgpa")
+        self.year_col = columns.get("graduation_year")
+        self.intern_col = columns.get("internship_experience")
+        self.degree_col = columns.get("degree")
+        self.spec_col = columns.get("specialization")
+        self.cert_col = columns.get("certifications")
+
+        self.fields = sorted(
+            (col, key) for col, key in (
+                (self.cgpa_col, "cgpa_scaled"),
+                (self.year_col, "graduation_year_scaled"),
+                (self.intern_col, "internship_encoded"),
+                (self.degree_col, "degree_encoded"),
+                (self.spec_col, "specialization_encoded"),
+                (self.cert_col, "certifications_encoded"),
+            ) if col is not None
+        )
+
+        # Skill -> column in the model input (None if the model never saw it)
+        self.skill_columns = {skill: columns.get(skill) for skill in mlb.classes_}
+
+    @staticmethod
+    def _lookup(index, value):
+        # Unknown values fall back to the first class, like safe_transform did
+        try:
+            return index.get(value, 0)
+        except TypeError:
+            return 0
+
+    def process(self, data):
+        skills_list = data.get("skills", [])
+        if not isinstance(skills_list, list): skills_list = []
+        clean_skills = [s.strip() for s in skills_list if s.strip().lower() not in STOP_WORDS]
+        valid_skills = [skill for skill in clean_skills if skill in self.skill_columns]
+
+        degree_enc = self._lookup(self.degree_index, data.get("degree", "B.Tech"))
+        spec_enc = self._lookup(self.spec_index, data.get("specialization", "Computer Science"))
+        cert_enc = self._lookup(self.cert_index, data.get("certifications", "None"))
+
+        try:
+            val_cgpa = float(data.get("cgpa", 0))
+            val_year = int(data.get("graduation_year", 2024))
+        except:
+            val_cgpa, val_year = 0.0, 2024
+
+        raw_intern = data.get("internships", 0)
+        intern_val = 1 if str(raw_intern).lower() in ['1', 'true', 'yes'] else 0
+
+        processed_record = {
+            "cgpa_scaled": (val_cgpa - self.cgpa_mean) / self.cgpa_scale,
+            "graduation_year_scaled": (val_year - self.year_mean) / self.year_scale,
+            "internship_encoded": intern_val,
+            "degree_encoded": degree_enc,
+            "specialization_encoded": spec_enc,
+            "certifications_encoded": cert_enc,
+            "skills_encoded_count": len(valid_skills)
+        }
+        return processed_record, valid_skills
+
+    def fill(self, row, processed_record, valid_skills):
+        # row must be a zeroed float32 vector of length n_features
+        for col, key in self.fields:
+            row[col] = processed_record[key]
+        for skill in valid_skills:
+            col = self.skill_columns[skill]
+            if col is not None:
+                row[col] = 1.0
+        return row
+
+    def entries(self, processed_record, valid_skills, indices, data):
+        # Appends one CSR row (sorted column indices, non-zero values)
+        for col, key in self.fields:
+            value = processed_record[key]
+            if value != 0:
+                indices.append(col)
+                data.append(value)
+        skill_cols = sorted({self.skill_columns[s] for s in valid_skills} - {None})
+        indices.extend(skill_cols)
+        data.extend([1.0] * len(skill_cols))
+
+    def _csr(self, data, indices, indptr):
+        return sp.csr_matrix(
+            (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=(len(indptr) - 1, self.n_features)
+        )
+
+    def vectorize(self, processed_record, valid_skills):
+        if self.sparse:
+            indices, data = [], []
+            self.entries(processed_record, valid_skills, indices, data)
+            return self._csr(data, indices, [0, len(indices)])
+        X = np.zeros((1, self.n_features), dtype=np.float32)
+        self.fill(X[0], processed_record, valid_skills)
+        return X
+
+    def encode(self, data):
+        processed_record, valid_skills = self.process(data)
+        return self.vectorize(processed_record, valid_skills), processed_record, valid_skills
+
+    def encode_many(self, profiles):
+        valid_skills_list = []
+        if self.sparse:
+            indices, values, indptr = [], [], [0]
+            for data in profiles:
+                processed_record, valid_skills = self.process(data)
+                self.entries(processed_record, valid_skills, indices, values)
+                indptr.append(len(indices))
+                valid_skills_list.append(valid_skills)
+            return self._csr(values, indices, indptr), valid_skills_list
+
+        X = np.zeros((len(profiles), self.n_features), dtype=np.float32)
+        for row, data in zip(X, profiles):
+            processed_record, valid_skills = self.process(data)
+            self.fill(row, processed_record, valid_skills)
+            valid_skills_list.append(valid_skills)
+        return X, valid_skills_list
@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+from datetime import datetime
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+import stats_store
+
+# History records carry a snapshot of the profile fields the dashboards
+# group by, taken when the prediction is made, so statistics never join
+# `history` to `users`. Records written before that are filled in by a
+# background migration in bounded batches (`_id` order, pausing between
+# batches) and moving their degree counts out of "Unknown";
+# `python history_backfill.py` runs it in the foreground.
+
+PROFILE_FIELDS = ("degree", "specialization", "graduation_year")
+MIGRATION_ID = "history_profile_snapshot"
+BACKFILL_BATCH = int(os.getenv("HISTORY_BACKFILL_BATCH", 500))
+BACKFILL_PAUSE = float(os.getenv("HISTORY_BACKFILL_PAUSE", 0.2))
+
+
+def profile_snapshot(user):
+    return {field: (user or {}).get(field) for field in PROFILE_FIELDS}
+
+def backfill(db, batch_size=BACKFILL_BATCH, pause=BACKFILL_PAUSE):
+    if db.migrations.find_one({"_id": MIGRATION_ID, "finished_at": {"$exists": True}}):
+        return 0
+
+    # Counters rebuilt from snapshots have these records under "Unknown";
+    # otherwise the next rebuild counts them afresh
+    move_degrees = not stats_store.needs_rebuild(db)
+    updated, last_id = 0, None
+    while True:
+        query = {"degree": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(db.history.find(query, {"user_id": 1}).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        ids_by_user = {}
+        for h in batch:
+            ids_by_user.setdefault(h.get("user_id"), []).append(h["_id"])
+        users = {u["_id"]: u for u in db.users.find(
+            {"_id": {"$in": [uid for uid in ids_by_user if uid is not None]}},
+            {field: 1 for field in PROFILE_FIELDS}
+        )}
+        # Records of deleted users get empty fields so they are not revisited.
+        # One update per user: the counts say how many records each degree
+        # takes over from "Unknown" in the statistics
+        filled, modified = {}, 0
+        for uid, ids in ids_by_user.items():
+            snapshot = profile_snapshot(users.get(uid))
+            n = db.history.update_many({"_id": {"$in": ids}, "degree": {"$exists": False}},
+                                       {"$set": snapshot}).modified_count
+            filled[snapshot["degree"]] = filled.get(snapshot["degree"], 0) + n
+            modified += n
+        if move_degrees: stats_store.record_degrees_filled(db, filled)
+        updated += modified
+        db.migrations.update_one({"_id": MIGRATION_ID}, {"$set": {"last_id": last_id, "updated_at": datetime.now()},
+                                                          "$inc": {"records": modified}}, upsert=True)
+        time.sleep(pause)
+
+    db.migrations.update_one({"_id": MIGRATION_ID}, {"$set": {"finished_at": datetime.now()}}, upsert=True)
+    return updated
+
+def main():
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_URI")).get_default_database()
+    if "--force" in sys.argv[1:]:
+        db.migrations.delete_one({"_id": MIGRATION_ID})
+    print(f"History backfill: added profile fields to {backfill(db)} records.")
+
+if __name__ == '__main__':
+    main()
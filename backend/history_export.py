@@ -0,0 +1,150 @@
+import io
+import csv
+import json
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Bulk export of `history` for offline analysis (GET /api/admin/export/history).
+# Documents come off one server-side cursor in batches of `batch_size` and
+# each batch is encoded and handed to the response before the next one is
+# read, so memory depends on the batch size and not on the export size.
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+EXPORT_FIELDS = ("_id", "user_id", "user_name", "degree", "specialization", "graduation_year",
+                 "prediction", "confidence", "top_predictions", "feedback", "flagged", "batch", "date")
+
+PARQUET_SCHEMA = pa.schema([
+    ("_id", pa.string()),
+    ("user_id", pa.string()),
+    ("user_name", pa.string()),
+    ("degree", pa.string()),
+    ("specialization", pa.string()),
+    ("graduation_year", pa.string()),
+    ("prediction", pa.string()),
+    ("confidence", pa.float64()),
+    ("top_predictions", pa.list_(pa.struct([("job_role", pa.string()), ("confidence", pa.float64())]))),
+    ("feedback", pa.float64()),
+    ("flagged", pa.bool_()),
+    ("batch", pa.bool_()),
+    ("date", pa.timestamp("ms")),
+])
+
+
+def export_query(date_from=None, date_to=None, roles=None):
+    query = {}
+    if date_from or date_to:
+        query["date"] = {}
+        if date_from: query["date"]["$gte"] = date_from
+        if date_to: query["date"]["$lt"] = date_to
+    if roles:
+        query["prediction"] = {"$in": roles}
+    return query
+
+def _record(doc):
+    top = [{"job_role": p.get("job_role"), "confidence": p.get("confidence")}
+           for p in doc.get("top_predictions") or []]
+    return {
+        "_id": str(doc["_id"]),
+        "user_id": str(doc["user_id"]) if doc.get("user_id") is not None else None,
+        "user_name": doc.get("user_name"),
+        "degree": doc.get("degree"),
+        "specialization": doc.get("specialization"),
+        # Profile values are free text (e.g. "" before the profile is filled)
+        "graduation_year": str(doc["graduation_year"]) if doc.get("graduation_year") not in (None, "") else None,
+        "prediction": doc.get("prediction"),
+        "confidence": doc.get("confidence"),
+        "top_predictions": top,
+        "feedback": doc.get("feedback"),
+        "flagged": bool(doc.get("flagged", False)),
+        "batch": bool(doc.get("batch", False)),
+        "date": doc.get("date"),
+    }
+
+def _batches(cursor, batch_size):
+    batch = []
+    for doc in cursor:
+        batch.append(_record(doc))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _ndjson(batches):
+    for batch in batches:
+        yield "".join(json.dumps({**r, "date": r["date"].isoformat() if r["date"] else None}) + "\n"
+                      for r in batch)
+
+def _csv(batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batches:
+        for r in batch:
+            writer.writerow([
+                json.dumps(r[f]) if f == "top_predictions"
+                else r[f].isoformat() if f == "date" and r[f]
+                else r[f]
+                for f in EXPORT_FIELDS
+            ])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+# Write-only file for ParquetWriter that hands out what was written so far.
+# It keeps counting the position: the footer stores absolute offsets.
+class _StreamSink(io.RawIOBase):
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _parquet(batches):
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, PARQUET_SCHEMA)
+    try:
+        # One row group per batch
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=PARQUET_SCHEMA))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def stream_history(collection, query, fmt, batch_size):
+    cursor = collection.find(query, dict.fromkeys(EXPORT_FIELDS, 1)).sort("date", 1).batch_size(batch_size)
+    encode = {"csv": _csv, "ndjson": _ndjson, "parquet": _parquet}[fmt]
+    try:
+        for chunk in encode(_batches(cursor, batch_size)):
+            if chunk:
+                yield chunk
+    finally:
+        cursor.close()
+
+def export_filename(fmt):
+    return f"history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{EXPORT_FORMATS[fmt][1]}"
@@ -0,0 +1,272 @@
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from bson import json_util
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from metrics import MONGO_SECONDS
+
+# Write-behind queue for prediction history. /api/predict hands its record
+# over and answers at once; a background thread collects records for up to
+# `flush_ms` (or `batch_size` records) and writes them with one unordered
+# insert_many. At most `max_pending` records wait in memory: past that a
+# submit blocks for up to `timeout` seconds and then fails with
+# HistoryBacklogged (503), so a slow MongoDB slows producers down instead
+# of growing the queue. Records that still cannot be written after
+# `retries` attempts, or are left over at shutdown, are appended to a spill
+# file (MongoDB extended JSON, one per line) that replay_spill() writes back.
+
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", 200))
+HISTORY_FLUSH_MS = float(os.getenv("HISTORY_FLUSH_MS", 200))
+HISTORY_MAX_PENDING = int(os.getenv("HISTORY_MAX_PENDING", 10000))
+HISTORY_ENQUEUE_TIMEOUT = float(os.getenv("HISTORY_ENQUEUE_TIMEOUT", 2))
+HISTORY_FLUSH_RETRIES = int(os.getenv("HISTORY_FLUSH_RETRIES", 3))
+HISTORY_SPILL_PATH = os.getenv("HISTORY_SPILL_PATH", "logs/history_spill.ndjson")
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 300))
+
+DUPLICATE_KEY = 11000
+
+
+class HistoryBacklogged(Exception):
+    pass
+
+
+class HistoryWriter:
+    def __init__(self, get_db, on_written=None, batch_size=HISTORY_BATCH_SIZE, flush_ms=HISTORY_FLUSH_MS,
+                 max_pending=HISTORY_MAX_PENDING, timeout=HISTORY_ENQUEUE_TIMEOUT,
+                 retries=HISTORY_FLUSH_RETRIES, spill_path=HISTORY_SPILL_PATH, log=print):
+        self.get_db = get_db
+        self.on_written = on_written
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000.0
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retries = retries
+        self.spill_path = spill_path
+        self.log = log
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.retried = 0
+        self.spilled = 0
+        self.rejected = 0
+        self.last_error = None
+
+    # Started on first use and again in a forked child (e.g. gunicorn --preload),
+    # which inherits the object but not the thread
+    def _ensure_thread(self):
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        if self._pid != os.getpid():
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            self._stopping = threading.Event()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def _count(self, **amounts):
+        with self._stats_lock:
+            for attr, n in amounts.items():
+                setattr(self, attr, getattr(self, attr) + n)
+
+    def submit(self, record, timeout=None):
+        # The _id is fixed before the first attempt, so a retried insert is idempotent
+        record.setdefault("_id", ObjectId())
+        with self._lock:
+            closed = self._closed
+            if not closed: self._ensure_thread()
+        if closed:
+            # Shutting down: write through
+            self._flush([record])
+            return
+        try:
+            self._queue.put(record, timeout=self.timeout if timeout is None else timeout)
+        except queue.Full:
+            self._count(rejected=1)
+            raise HistoryBacklogged("History writes are backed up, try again shortly")
+        self._count(submitted=1)
+
+    def _run(self):
+        q, stopping = self._queue, self._stopping
+        while True:
+            try:
+                first = q.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if stopping.is_set(): return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = 0 if stopping.is_set() else deadline - time.monotonic()
+                try:
+                    batch.append(q.get(timeout=remaining) if remaining > 0 else q.get_nowait())
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        for attempt in range(self.retries + 1):
+            try:
+                written = self._insert(batch)
+                break
+            except PyMongoError as e:
+                self.last_error = str(e)
+                if attempt == self.retries:
+                    self.log(f"History flush failed after {attempt + 1} attempts: {e}")
+                    self._spill(batch)
+                    return
+                self._count(retried=1)
+                time.sleep(min(0.1 * 2 ** attempt, 2.0))
+
+        self._count(written=len(written), batches=1)
+        if written and self.on_written is not None:
+            try:
+                self.on_written(written)
+            except Exception as e:
+                self.log(f"History post-write hook failed: {e}")
+
+    # Returns the records now in the collection. A duplicate _id means an
+    # earlier attempt got through; any other per-record error is final.
+    def _insert(self, docs):
+        try:
+            with MONGO_SECONDS.labels("history_insert").time():
+                self.get_db().history.insert_many(docs, ordered=False)
+            return docs
+        except BulkWriteError as e:
+            failed = {err["index"] for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY}
+            if failed:
+                self.last_error = e.details["writeErrors"][0].get("errmsg")
+                self.log(f"History flush rejected {len(failed)} records: {self.last_error}")
+                self._spill([docs[i] for i in sorted(failed)])
+            return [d for i, d in enumerate(docs) if i not in failed]
+
+    def _spill(self, docs):
+        if not docs: return
+        try:
+            with self._spill_lock:
+                os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    f.writelines(json_util.dumps(doc) + "\n" for doc in docs)
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._count(spilled=len(docs))
+        except OSError as e:
+            self.log(f"History spill failed, {len(docs)} records lost: {e}")
+
+    # Writes spilled records back (called when the app starts). The file is
+    # renamed first so concurrent app processes do not replay it twice;
+    # records that fail again go to a fresh spill file.
+    def replay_spill(self):
+        claimed = f"{self.spill_path}.{os.getpid()}.replay"
+        try:
+            with self._spill_lock:
+                os.rename(self.spill_path, claimed)
+        except FileNotFoundError:
+            return 0
+
+        replayed, batch = 0, []
+        with open(claimed, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip(): continue
+                batch.append(json_util.loads(line))
+                if len(batch) == self.batch_size:
+                    self._flush(batch)
+                    replayed, batch = replayed + len(batch), []
+        if batch:
+            self._flush(batch)
+            replayed += len(batch)
+        os.remove(claimed)
+        return replayed
+
+    # Durable shutdown: the thread drains the queue, and what it could not
+    # take in `timeout` seconds is spilled rather than dropped
+    def close(self, timeout=10.0):
+        with self._lock:
+            if self._closed: return
+            self._closed = True
+            thread = self._thread if self._pid == os.getpid() else None
+        if thread is None:
+            return
+        self._stopping.set()
+        thread.join(timeout)
+
+        leftovers = []
+        while True:
+            try:
+                leftovers.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if thread.is_alive():
+            self._spill(leftovers)
+        elif leftovers:
+            self._flush(leftovers)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batch_size": self.batch_size,
+                "flush_ms": self.flush_interval * 1000,
+                "max_pending": self.max_pending,
+                "pending": self._queue.qsize(),
+                "submitted": self.submitted,
+                "written": self.written,
+                "batches": self.batches,
+                "avg_batch_size": round(self.written / self.batches, 2) if self.batches else 0,
+                "retried": self.retried,
+                "spilled": self.spilled,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
+
+
+# user_id -> the user fields a history record copies (name and profile
+# snapshot), so a prediction does not re-read the user document. Entries
+# expire after `ttl` seconds; the owning process drops one as soon as the
+# profile changes, other processes see the change within the TTL.
+class UserSnapshotCache:
+    def __init__(self, max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None: del self._data[user_id]
+                self.misses += 1
+                return None
+            self._data.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, user_id, user):
+        if self.max_size <= 0: return
+        with self._lock:
+            self._data[user_id] = (user, time.monotonic() + self.ttl)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
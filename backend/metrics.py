@@ -0,0 +1,187 @@
+import os
+import bisect
+import threading
+import time
+
+# In-process latency histograms, rendered in the Prometheus text format
+# (0.0.4) by GET /metrics. Recording is a bucket search and two additions
+# under a per-series lock; everything else (cumulative buckets, cache and
+# queue counters read from their owners) is computed only when the
+# endpoint is scraped. Each app process keeps its own series.
+# METRICS_ENABLED=0 turns recording into a no-op.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; request stages are sub-millisecond, Mongo and routes up to seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LOAD_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TRAINING_BUCKETS = (10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pairs):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+def _number(value):
+    if value == float("inf"): return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _header(name, documentation, kind):
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+
+def _histogram_lines(name, pairs, buckets, counts, total):
+    lines, cumulative = [], 0
+    for bound, count in zip(tuple(buckets) + (float("inf"),), counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(list(pairs) + [('le', _number(float(bound)))])} {cumulative}")
+    lines.append(f"{name}_sum{_labels(pairs)} {_number(total)}")
+    lines.append(f"{name}_count{_labels(pairs)} {cumulative}")
+    return lines
+
+
+class _Timer:
+    __slots__ = ("series", "started")
+
+    def __init__(self, series):
+        self.series = series
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.series.observe(time.perf_counter() - self.started)
+
+
+class _HistogramSeries:
+    __slots__ = ("bounds", "counts", "total", "lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        if not METRICS_ENABLED: return
+        i = bisect.bisect_left(self.bounds, value)  # first bucket with le >= value
+        with self.lock:
+            self.counts[i] += 1
+            self.total += value
+
+    def time(self):
+        return _Timer(self)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.total
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values):
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    def _header(self):
+        return _header(self.name, self.documentation, self.kind)
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._series.items())
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+    # Shortcuts for a histogram without labels
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def render(self):
+        lines = self._header()
+        for values, series in self._items():
+            counts, total = series.snapshot()
+            lines.extend(_histogram_lines(self.name, list(zip(self.labelnames, values)), self.buckets, counts, total))
+        return lines
+
+
+# Values owned by other objects (cache counters, queue sizes), read at
+# scrape time. `collect` returns {((label, value), ...): number}.
+class Collected:
+    def __init__(self, name, documentation, kind, collect, registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.collect = collect
+        (registry or REGISTRY).register(self)
+
+    def render(self):
+        lines = _header(self.name, self.documentation, self.kind)
+        for pairs, value in self.collect().items():
+            lines.append(f"{self.name}{_labels(pairs)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    # A collector that fails (e.g. MongoDB unreachable) is left out of the
+    # scrape instead of failing it
+    def render(self, log=print):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                log(f"Metrics collection failed for {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+
+#Instruments shared by app.py, asgi.py and history_writer.py
+REQUEST_SECONDS = Histogram(
+    "edu2job_http_request_seconds", "Time to produce a response (streamed bodies: until the first byte is ready).",
+    ("method", "route", "status"))
+JWT_DECODE_SECONDS = Histogram(
+    "edu2job_jwt_decode_seconds", "Access token decoding and verification.")
+PREDICT_STAGE_SECONDS = Histogram(
+    "edu2job_predict_stage_seconds", "Time spent in each stage of scoring one profile.", ("stage",))
+MONGO_SECONDS = Histogram(
+    "edu2job_mongo_seconds", "MongoDB calls on the prediction path.", ("operation",))
+MODEL_LOAD_SECONDS = Histogram(
+    "edu2job_model_load_seconds", "Loading and warming up a model version.", ("result",), buckets=LOAD_BUCKETS)
@@ -0,0 +1,245 @@
+import os
+import sys
+import gzip
+import json
+import pickle
+import hashlib
+import tempfile
+import threading
+
+import numpy as np
+from sklearn.preprocessing import LabelEncoder, StandardScaler, MultiLabelBinarizer
+from xgboost import XGBClassifier
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from feature_engine import FeatureEngine
+from compiled_model import CompiledModel, TREE_LIBRARY, USE_SERVING_VARIANT
+
+# The bundle format is defined once, next to its writer in the trainer;
+# appended so a backend module always wins a name clash
+ML_MODEL_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ml-model"))
+if ML_MODEL_DIR not in sys.path:
+    sys.path.append(ML_MODEL_DIR)
+from model_bundle import read_bundle, BUNDLE_FILE, VERSIONS_DIR, CURRENT_FILE
+
+LEGACY_VERSION = "legacy"
+
+
+# The /api/config body (the bundle's metadata), serialized and compressed
+# once per bundle. Each encoding is a distinct representation, so each gets
+# its own strong ETag; all of them change with the version and content.
+class ConfigPayload:
+    ENCODINGS = ("br", "gzip")
+
+    def __init__(self, version, metadata):
+        body = json.dumps(metadata, sort_keys=True, separators=(",", ":")).encode()
+        tag = f"{version}-{hashlib.sha256(body).hexdigest()[:16]}"
+        self.variants = {"identity": body, "gzip": gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=11)
+        self.etags = {enc: tag if enc == "identity" else f"{tag}-{enc}" for enc in self.variants}
+
+    # Smallest variant the client accepts (werkzeug Accept-Encoding)
+    def select(self, accept_encodings):
+        for enc in self.ENCODINGS:
+            if enc in self.variants and accept_encodings[enc] > 0:
+                return enc
+        return "identity"
+
+
+# Everything a prediction needs from one training run. A bundle is never
+# mutated after it goes live; the app swaps the whole object at once so a
+# request always sees a model, encoders and feature layout that belong together.
+# `model` can be left to `load_model`, called on first use: the XGBoost
+# booster is rebuilt in private memory, so bundles with a compiled evaluator
+# score from its memmap'd arrays (shared by all workers) and drop the booster
+# again after warm_up.
+class ModelBundle:
+    def __init__(self, version, path, model, label_encoders, scaler, mlb, feature_names, feature_selector=None, metadata=None, metrics=None, sparse_input=False, predictor=None, load_model=None):
+        self.version = version
+        self.path = path
+        self._model = model
+        self._load_model = load_model
+        self._model_lock = threading.Lock()
+        self.label_encoders = label_encoders
+        self.scaler = scaler
+        self.mlb = mlb
+        self.feature_names = feature_names
+        self.feature_selector = feature_selector
+        self.metadata = metadata
+        self.metrics = metrics
+        self.sparse_input = sparse_input
+        self.feature_engine = FeatureEngine(label_encoders, scaler, mlb, feature_names, sparse=sparse_input)
+        self.predictor = predictor or self.model
+        # What scores whole matrices (/api/predict/batch); `predictor` may get
+        # wrapped in a coalescer for single profiles
+        self.batch_predictor = self.predictor
+        self.config = ConfigPayload(version, metadata) if metadata is not None else None
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    def warm_up(self):
+        # Score a default profile end to end before the bundle takes traffic
+        X, _, _ = self.feature_engine.encode({})
+        n_expected = getattr(self.model, "n_features_in_", X.shape[1])
+        if X.shape[1] != n_expected:
+            raise ValueError(f"Feature layout mismatch: {X.shape[1]} features, model expects {n_expected}")
+        probs = self.model.predict_proba(X)
+        n_classes = len(self.label_encoders["job_role"].classes_)
+        if probs.shape[1] != n_classes:
+            raise ValueError(f"Model outputs {probs.shape[1]} classes, job_role encoder has {n_classes}")
+        self.label_encoders["job_role"].inverse_transform([int(probs[0].argmax())])
+
+        if self.predictor is not self.model:
+            compiled = self.predictor.predict_proba(X)
+            if self.predictor.approximate:
+                # Pruned/quantized: its agreement was measured at training time
+                ok = compiled.shape == probs.shape and np.isfinite(compiled).all() and abs(compiled.sum() - 1) < 1e-3
+            else:
+                ok = compiled.shape == probs.shape and np.allclose(compiled, probs, atol=1e-5)
+            if not ok:
+                print(f"Compiled evaluator for {self.version} disagrees with XGBoost; using XGBoost.")
+                self.predictor = self.batch_predictor = self.model
+            elif self._load_model is not None:
+                with self._model_lock:
+                    self._model = None
+
+
+# Immutable, versioned artifact directories under <root>/versions/<version>,
+# with <root>/CURRENT naming the live one. Falls back to the flat .pkl files
+# in <root> (reported as version "legacy") when no versions exist yet.
+class ModelRegistry:
+    def __init__(self, root):
+        self.root = root
+        self.versions_dir = os.path.join(root, VERSIONS_DIR)
+
+    def versions(self):
+        if not os.path.isdir(self.versions_dir): return []
+        return sorted(
+            d for d in os.listdir(self.versions_dir)
+            if not d.startswith('.') and os.path.isdir(os.path.join(self.versions_dir, d))
+        )
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                version = f.read().strip()
+            if version in self.versions(): return version
+        except FileNotFoundError:
+            pass
+        versions = self.versions()
+        if versions: return versions[-1]
+        if os.path.exists(os.path.join(self.root, 'career_model.pkl')): return LEGACY_VERSION
+        return None
+
+    def previous_version(self, version):
+        versions = self.versions()
+        if version not in versions: return None
+        i = versions.index(version)
+        return versions[i - 1] if i > 0 else None
+
+    def version_path(self, version):
+        if version == LEGACY_VERSION: return self.root
+        return os.path.join(self.versions_dir, version)
+
+    def set_current(self, version):
+        # Write-then-rename so readers never see a half-written pointer
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix='.CURRENT.')
+        with os.fdopen(fd, 'w') as f:
+            f.write(version)
+        os.replace(tmp, os.path.join(self.root, CURRENT_FILE))
+
+    def load(self, version=None):
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError("No trained model found. Train first.")
+        if version != LEGACY_VERSION and version not in self.versions():
+            raise FileNotFoundError(f"Unknown model version: {version}")
+        path = self.version_path(version)
+        if os.path.exists(os.path.join(path, BUNDLE_FILE)):
+            return self._load_bundle_file(version, path)
+        return self._load_pickles(version, path)
+
+    def _load_bundle_file(self, version, path):
+        header, arrays = read_bundle(os.path.join(path, BUNDLE_FILE))
+        vocab = header["vocab"]
+
+        label_encoders = {}
+        for col in ("job_role", "degree", "specialization", "certifications"):
+            le = LabelEncoder()
+            le.classes_ = np.array(vocab[col], dtype=object)
+            label_encoders[col] = le
+
+        scaler = StandardScaler()
+        scaler.mean_ = arrays["scaler_mean"]
+        scaler.scale_ = arrays["scaler_scale"]
+        scaler.var_ = arrays["scaler_var"]
+        scaler.n_samples_seen_ = header["scaler"]["n_samples_seen"]
+        scaler.n_features_in_ = len(header["scaler"]["features"])
+
+        mlb = MultiLabelBinarizer(classes=vocab["skills"], sparse_output=True)
+        mlb.fit([])
+
+        # Native tree evaluator built at training time, when it shipped
+        predictor = None
+        library = os.path.join(path, TREE_LIBRARY)
+        if os.path.exists(library) and "tree_root" in arrays:
+            serving = header.get("serving") if USE_SERVING_VARIANT and "serving_root" in arrays else None
+            try:
+                predictor = CompiledModel(library, arrays, len(vocab["job_role"]), len(header["feature_names"]),
+                                          sparse_input=header.get("sparse_input", False), serving=serving)
+            except OSError as e:
+                print(f"Could not load {library}: {e}")
+
+        # load_model() wants bytes of its own: this copy is private to the
+        # process, unlike the arrays the compiled evaluator reads
+        def load_model():
+            model = XGBClassifier()
+            model.load_model(bytearray(arrays["booster"]))
+            return model
+
+        return ModelBundle(
+            version, path, None, label_encoders, scaler, mlb,
+            feature_names=header["feature_names"],
+            metadata=header.get("metadata"),
+            metrics=header.get("metrics"),
+            sparse_input=header.get("sparse_input", False),
+            predictor=predictor,
+            load_model=load_model
+        )
+
+    # Older versions (and the flat "legacy" layout) still ship as pickles
+    def _load_pickles(self, version, path):
+        def load_pickle(name):
+            with open(os.path.join(path, name), 'rb') as f:
+                return pickle.load(f)
+
+        try:
+            feature_selector = load_pickle('feature_selector.pkl')
+        except Exception:
+            feature_selector = None
+        try:
+            metadata = load_pickle('metadata.pkl')
+        except Exception:
+            metadata = None
+
+        return ModelBundle(
+            version, path,
+            model=load_pickle('career_model.pkl'),
+            label_encoders=load_pickle('label_encoders.pkl'),
+            scaler=load_pickle('scaler.pkl'),
+            mlb=load_pickle('skills_mlb.pkl'),
+            feature_names=load_pickle('feature_names.pkl'),
+            feature_selector=feature_selector,
+            metadata=metadata
+        )
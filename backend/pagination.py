@@ -0,0 +1,52 @@
+import json
+import base64
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from flask import Response, jsonify
+
+# Keyset pagination: a page ends with the sort key of its last document,
+# handed to the client as an opaque cursor, and the next page starts
+# strictly after it. Unlike skip/offset, every page costs the same however
+# deep the client reads. List endpoints send the cursor of the next page
+# in the X-Next-Cursor header and keep returning a plain JSON array.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values):
+    raw = [v.isoformat() if isinstance(v, datetime) else str(v) for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip("=")
+
+def decode_cursor(token, *types):
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if len(raw) != len(types):
+            raise ValueError
+        return [datetime.fromisoformat(v) if t is datetime else ObjectId(v) for v, t in zip(raw, types)]
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def page_limit(args, default, maximum):
+    try:
+        limit = int(args.get("limit", default))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    return max(1, min(limit, maximum))
+
+# Everything after (date, _id) in (date desc, _id desc) order
+def after_date_id(date, oid):
+    return {"$or": [{"date": {"$lt": date}}, {"date": date, "_id": {"$lt": oid}}]}
+
+def ndjson_response(docs, serialize):
+    def generate():
+        for doc in docs:
+            yield json.dumps(serialize(doc)) + "\n"
+    return Response(generate(), mimetype="application/x-ndjson")
+
+def page_response(cursor, limit, serialize, next_cursor):
+    docs = list(cursor.limit(limit + 1))
+    response = jsonify([serialize(doc) for doc in docs[:limit]])
+    if len(docs) > limit:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor(docs[limit - 1])
+    return response
@@ -0,0 +1,160 @@
+import os
+import queue
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+# bcrypt hashing and checking run in a small process pool instead of on the
+# request thread, so a burst of logins costs the pool's CPUs and not the
+# web workers that serve /api/predict. At most `workers + max_queue` calls
+# are in flight; past that a call fails at once with PoolSaturated and the
+# endpoint answers 503 instead of queueing indefinitely.
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", 2))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", 16))
+BCRYPT_TIMEOUT = float(os.getenv("BCRYPT_TIMEOUT", 10))
+# bcrypt only reads the first 72 bytes; newer releases raise instead
+MAX_PASSWORD_BYTES = 72
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+def _encode(password):
+    return password.encode("utf-8")[:MAX_PASSWORD_BYTES]
+
+# Checked in the calling process, before a pool slot is taken; the routes
+# answer 400 for these, so reaching here is a bug in the caller
+def _require_password(password):
+    if not isinstance(password, str) or not password:
+        raise ValueError("Password must be a non-empty string")
+    return password
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(_encode(password), bcrypt.gensalt(rounds)).decode("utf-8")
+
+def _check(pw_hash, password):
+    try:
+        return bcrypt.checkpw(_encode(password), pw_hash.encode("utf-8"))
+    except ValueError:
+        # Not a bcrypt hash (e.g. the empty password of Google accounts)
+        return False
+
+
+class PasswordHasher:
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=BCRYPT_WORKERS, max_queue=BCRYPT_MAX_QUEUE,
+                 timeout=BCRYPT_TIMEOUT, log=print):
+        self.rounds = rounds
+        self.timeout = timeout
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool = None
+        self._pid = None
+        self._pool_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._rehashes = None
+        self._rehash_thread = None
+        self._rehash_pid = None
+        self.log = log
+        self.completed = 0
+        self.rejected = 0
+        # Forked, and all at once on the first submit (executor behaviour
+        # for fork), which happens here: create the hasher before the app
+        # starts threads so the workers are copies of a single-threaded process
+        self._ensure_pool()
+
+    # Created again in a forked child (e.g. gunicorn --preload), which
+    # inherits the executor but neither its management thread nor its
+    # workers; the inherited one is dropped, not shut down
+    def _ensure_pool(self):
+        with self._pool_lock:
+            if self._pid != os.getpid():
+                pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context("fork"))
+                pool.submit(int).result()
+                self._pool, self._pid = pool, os.getpid()
+                self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+            return self._pool, self._slots
+
+    def _submit(self, fn, *args):
+        pool, slots = self._ensure_pool()
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturated("Password hashing is saturated, try again shortly")
+        try:
+            future = pool.submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda f: self._done(slots))
+        return future
+
+    def _done(self, slots):
+        slots.release()
+        with self._lock:
+            self.completed += 1
+
+    def _result(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise PoolSaturated("Password hashing timed out")
+
+    def hash(self, password):
+        return self._result(self._submit(_hash, _require_password(password), self.rounds))
+
+    def check(self, pw_hash, password):
+        return self._result(self._submit(_check, pw_hash, _require_password(password)))
+
+    # True for hashes made with a different cost than the configured one
+    def needs_rehash(self, pw_hash):
+        try:
+            return int(pw_hash.split("$")[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return False
+
+    # Re-hash in the background after a successful login; skipped when the
+    # pool is busy (the next login tries again). `on_done(new_hash)` stores
+    # the hash: it runs on a thread of its own, not in the future's done
+    # callback, which the executor's management thread runs while other
+    # results wait behind it (and whose exceptions it drops)
+    def rehash_later(self, password, on_done):
+        try:
+            future = self._submit(_hash, _require_password(password), self.rounds)
+        except PoolSaturated:
+            return False
+        self._ensure_rehash_thread().put((future, on_done))
+        return True
+
+    # Per process, like the pool. Unbounded: every entry holds a pool slot
+    def _ensure_rehash_thread(self):
+        with self._pool_lock:
+            if self._rehash_thread is None or self._rehash_pid != os.getpid():
+                self._rehashes = queue.Queue()
+                self._rehash_pid = os.getpid()
+                self._rehash_thread = threading.Thread(target=self._store_rehashes, args=(self._rehashes,),
+                                                       name="password-rehash", daemon=True)
+                self._rehash_thread.start()
+            return self._rehashes
+
+    def _store_rehashes(self, rehashes):
+        while True:
+            future, on_done = rehashes.get()
+            try:
+                on_done(future.result(timeout=self.timeout))
+            except Exception as e:
+                self.log(f"Password rehash failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {"rounds": self.rounds, "completed": self.completed, "rejected": self.rejected}
+
+    # wait=True also joins the workers; a process that leaves through
+    # os._exit must, or they outlive it holding its inherited descriptors
+    def close(self, wait=False):
+        if self._pid == os.getpid():
+            self._pool.shutdown(wait=wait, cancel_futures=True)
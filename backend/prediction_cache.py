@@ -0,0 +1,109 @@
+import json
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+# Bounded LRU + TTL cache of top-k results, keyed by the model version and
+# the canonical processed feature record, so equivalent profiles (same
+# encoded fields, same skill set in any order) share one entry.
+# With a shared backend (shared_state.py) entries live there instead, as
+# JSON under a hash of the key, and every app process sees them; a lookup
+# is one GET. An unreachable backend counts as a miss.
+class PredictionCache:
+    PREFIX = "prediction:"
+
+    def __init__(self, max_size=10000, ttl=3600, backend=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.backend = backend
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(model_version, processed_record, valid_skills):
+        return (
+            model_version,
+            tuple(processed_record[k] for k in sorted(processed_record) if k != "skills_encoded_count"),
+            frozenset(valid_skills),
+        )
+
+    def _shared_key(self, key):
+        version, fields, skills = key
+        raw = json.dumps([version, fields, sorted(skills)], default=str)
+        return self.PREFIX + hashlib.sha1(raw.encode()).hexdigest()
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def get(self, key):
+        if not self.enabled: return None
+        if self.backend is not None:
+            try:
+                raw = self.backend.get(self._shared_key(key))
+            except Exception:
+                self._count("errors")
+                raw = None
+            self._count("misses" if raw is None else "hits")
+            return None if raw is None else json.loads(raw)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if not self.enabled: return
+        if self.backend is not None:
+            try:
+                self.backend.set(self._shared_key(key), json.dumps(value), ttl=self.ttl)
+            except Exception:
+                self._count("errors")
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    # Shared entries are keyed by model version and simply expire
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend.describe() if self.backend is not None else "local",
+                "size": len(self._data) if self.backend is None else None,
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            }
@@ -88,9 +88,13 @@ def create_history(user_ids):
             feedback = random.choice([None, 3, 4, 5])
             flagged = random.choice([True, False, False, False, False])
             
+            user = db.users.find_one({"_id": uid})
             log = {
                 "user_id": uid,
-                "user_name": db.users.find_one({"_id": uid})["name"],
+                "user_name": user["name"],
+                "degree": user.get("degree"),
+                "specialization": user.get("specialization"),
+                "graduation_year": user.get("graduation_year"),
                 "prediction": role,
                 "confidence": confidence,
                 "top_predictions": [
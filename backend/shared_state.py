@@ -0,0 +1,274 @@
+import os
+import re
+import time
+import socket
+import threading
+from urllib.parse import urlparse
+
+from limits.storage import Storage
+
+# Key/value state shared by every app process: rate-limit counters and the
+# prediction cache. The backend is chosen by SHARED_STATE_URI:
+#   memory://                 this process only (the default)
+#   redis://[:password@]host:port/db
+#                             any Redis-protocol server (fake_redis.py for
+#                             local runs), through a pool of persistent
+#                             connections; commands that belong together
+#                             go out in one pipelined write
+SHARED_STATE_URI = os.getenv("SHARED_STATE_URI", "memory://")
+SHARED_STATE_POOL_SIZE = int(os.getenv("SHARED_STATE_POOL_SIZE", 16))
+SHARED_STATE_TIMEOUT = float(os.getenv("SHARED_STATE_TIMEOUT", 1.0))
+
+
+class RespError(Exception):
+    pass
+
+
+#Redis protocol (RESP2) client
+def _encode(args):
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode("utf-8")
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+class _Connection:
+    def __init__(self, host, port, timeout):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def send(self, commands):
+        self.sock.sendall(b"".join(_encode(c) for c in commands))
+
+    def read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = self.reader.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self.read() for _ in range(n)]
+        raise ConnectionError(f"Unexpected reply {line!r}")
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+class RedisBackend:
+    def __init__(self, uri, pool_size=SHARED_STATE_POOL_SIZE, timeout=SHARED_STATE_TIMEOUT):
+        parsed = urlparse(uri)
+        self.host, self.port = parsed.hostname or "localhost", parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.strip("/") or 0)
+        self.timeout = timeout
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = _Connection(self.host, self.port, self.timeout)
+        setup = ([["AUTH", self.password]] if self.password else []) + ([["SELECT", self.db]] if self.db else [])
+        if setup:
+            conn.send(setup)
+            for _ in setup:
+                reply = conn.read()
+                if isinstance(reply, RespError):
+                    conn.close()
+                    raise reply
+        return conn
+
+    # All commands in one write, then all replies: one round trip
+    def pipeline(self, commands):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ConnectionError("Shared state connection pool exhausted")
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            conn = conn or self._connect()
+            try:
+                conn.send(commands)
+                replies = [conn.read() for _ in commands]
+            except Exception:
+                conn.close()
+                raise
+            with self._lock:
+                self._idle.append(conn)
+        finally:
+            self._slots.release()
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def get(self, key):
+        return self.execute("GET", key)
+
+    def set(self, key, value, ttl=None):
+        self.execute(*(["SET", key, value] + (["PX", int(ttl * 1000)] if ttl else [])))
+
+    # Counter that starts expiring when it is created (fixed windows)
+    def incr(self, key, expiry, amount=1):
+        return self.pipeline([["SET", key, 0, "EX", int(expiry), "NX"], ["INCRBY", key, amount]])[1]
+
+    def counter(self, key):
+        return int(self.get(key) or 0)
+
+    def ttl(self, key):
+        ms = self.execute("PTTL", key)
+        return ms / 1000 if ms > 0 else 0
+
+    def delete(self, *keys):
+        return self.execute("DEL", *keys) if keys else 0
+
+    def delete_prefix(self, prefix):
+        pattern, cursor, deleted = re.sub(r"([*?\[\]\\])", r"\\\1", prefix) + "*", b"0", 0
+        while True:
+            cursor, keys = self.execute("SCAN", cursor, "MATCH", pattern, "COUNT", 500)
+            deleted += self.delete(*keys)
+            if cursor in (b"0", 0):
+                return deleted
+
+    def ping(self):
+        return self.execute("PING") == "PONG"
+
+    def flush(self):
+        return self.execute("FLUSHDB")
+
+    def describe(self):
+        return f"redis://{self.host}:{self.port}/{self.db}"
+
+
+# Same interface for a single process
+class MemoryBackend:
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return entry[0] if entry else None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+
+    def incr(self, key, expiry, amount=1):
+        with self._lock:
+            entry = self._live(key) or (0, time.monotonic() + expiry)
+            self._data[key] = (int(entry[0]) + amount, entry[1])
+            return self._data[key][0]
+
+    def counter(self, key):
+        return int(self.get(key) or 0)
+
+    def ttl(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return max(0.0, entry[1] - time.monotonic()) if entry and entry[1] else 0
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(k, None) is not None for k in keys)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(prefix)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def ping(self):
+        return True
+
+    def flush(self):
+        with self._lock:
+            self._data.clear()
+
+    def describe(self):
+        return "memory://"
+
+
+def backend_from_uri(uri):
+    scheme = urlparse(uri).scheme
+    if scheme == "memory":
+        return MemoryBackend()
+    if scheme == "redis":
+        return RedisBackend(uri)
+    raise ValueError(f"Unsupported SHARED_STATE_URI scheme: {scheme}")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = backend_from_uri(SHARED_STATE_URI)
+        return _backend
+
+
+# Flask-Limiter storage ("shared://") on top of the configured backend
+class SharedLimiterStorage(Storage):
+    STORAGE_SCHEME = ["shared"]
+    PREFIX = "limiter:"
+
+    def __init__(self, uri=None, wrap_exceptions=False, backend=None, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.backend = backend or get_backend()
+
+    @property
+    def base_exceptions(self):
+        return (ConnectionError, OSError, RespError)
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        return self.backend.incr(self.PREFIX + key, expiry, amount)
+
+    def get(self, key):
+        return self.backend.counter(self.PREFIX + key)
+
+    def get_expiry(self, key):
+        return time.time() + self.backend.ttl(self.PREFIX + key)
+
+    def check(self):
+        try:
+            return self.backend.ping()
+        except Exception:
+            return False
+
+    # Every limit of every client, across all app processes
+    def reset(self):
+        return self.backend.delete_prefix(self.PREFIX)
+
+    def clear(self, key):
+        self.backend.delete(self.PREFIX + key)
+
+def limiter_storage_uri():
+    return "memory://" if isinstance(get_backend(), MemoryBackend) else "shared://"
@@ -0,0 +1,185 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
+from dotenv import load_dotenv
+
+# Dashboard statistics kept as counters in one summary document (Mongo
+# `stats`, _id "history") instead of aggregating `history` on every load.
+# app.py bumps them after each history write (for predictions, once per
+# batch flushed by history_writer.py); `python stats_store.py rebuild`
+# recomputes them from `history` if they ever drift (a crash between the
+# two writes, history edited by hand or seeded directly). The app runs it
+# once by itself, at the first start on a database whose counters were
+# never rebuilt (it had history before them).
+
+STATS_ID = "history"
+REBUILD_ID = "history_rebuild"
+# A rebuild claim older than this belongs to a process that died
+REBUILD_TIMEOUT = timedelta(hours=1)
+UNKNOWN_DEGREE = "Unknown"
+
+
+class RebuildRunning(Exception):
+    pass
+
+
+# Role and degree names become field names: escape what Mongo would read
+# as a path separator or operator
+def _field(value):
+    return str(value).replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+def _unfield(name):
+    return name.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+
+#Incremental updates (used by app.py and asgi.py)
+def predictions_update(roles, degree):
+    inc = {"total": len(roles)}
+    for role in roles:
+        key = f"roles.{_field(role)}"
+        inc[key] = inc.get(key, 0) + 1
+    inc[f"degrees.{_field(degree or UNKNOWN_DEGREE)}"] = len(roles)
+    return {"$inc": inc}
+
+# Several history records at once, each under its own snapshotted degree
+def history_update(records):
+    inc = {"total": len(records)}
+    for key in [f"roles.{_field(r['prediction'])}" for r in records] + \
+               [f"degrees.{_field(r.get('degree') or UNKNOWN_DEGREE)}" for r in records]:
+        inc[key] = inc.get(key, 0) + 1
+    return {"$inc": inc}
+
+def feedback_update(rating, previous=None):
+    inc = {f"ratings.{_field(rating)}": 1, "rating_sum": rating, "rating_count": 1}
+    # A changed rating moves from its old bucket to the new one
+    if isinstance(previous, (int, float)):
+        inc[f"ratings.{_field(previous)}"] = -1
+        inc["rating_sum"] -= previous
+        inc["rating_count"] = 0
+    return {"$inc": inc}
+
+def record_predictions(db, roles, degree):
+    db.stats.update_one({"_id": STATS_ID}, predictions_update(roles, degree), upsert=True)
+
+def record_history(db, records):
+    db.stats.update_one({"_id": STATS_ID}, history_update(records), upsert=True)
+
+def record_feedback(db, rating, previous=None):
+    db.stats.update_one({"_id": STATS_ID}, feedback_update(rating, previous), upsert=True)
+
+# Records counted under UNKNOWN_DEGREE that history_backfill.py gave a
+# degree: {degree: records}
+def record_degrees_filled(db, filled):
+    inc = {}
+    for degree, n in filled.items():
+        if not degree or degree == UNKNOWN_DEGREE: continue
+        inc[f"degrees.{_field(degree)}"] = inc.get(f"degrees.{_field(degree)}", 0) + n
+        inc[f"degrees.{_field(UNKNOWN_DEGREE)}"] = inc.get(f"degrees.{_field(UNKNOWN_DEGREE)}", 0) - n
+    if inc:
+        db.stats.update_one({"_id": STATS_ID}, {"$inc": inc}, upsert=True)
+
+
+#Reads (O(1): one document by _id)
+def summarize(doc):
+    doc = doc or {}
+    count = doc.get("rating_count", 0)
+    return {
+        "total": doc.get("total", 0),
+        "roles": {_unfield(k): v for k, v in doc.get("roles", {}).items() if v > 0},
+        "degrees": {_unfield(k): v for k, v in doc.get("degrees", {}).items() if v > 0},
+        "ratings": {_unfield(k): v for k, v in doc.get("ratings", {}).items() if v > 0},
+        "average_rating": doc.get("rating_sum", 0) / count if count else None,
+    }
+
+def read_stats(db):
+    return summarize(db.stats.find_one({"_id": STATS_ID}))
+
+def top_counts(counts, limit=None):
+    items = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+    return [k for k, _ in items], [v for _, v in items]
+
+
+#Reconciliation
+# The counters as flat "roles.<role>"-style paths, for $inc
+def _flatten(doc):
+    doc = doc or {}
+    flat = {key: doc.get(key, 0) for key in ("total", "rating_sum", "rating_count")}
+    for group in ("roles", "degrees", "ratings"):
+        for name, value in doc.get(group, {}).items():
+            flat[f"{group}.{name}"] = value
+    return flat
+
+# True until a rebuild has counted degrees from the history records'
+# snapshots (earlier rebuilds joined `users`)
+def needs_rebuild(db):
+    doc = db.stats.find_one({"_id": STATS_ID}, {"degrees_from": 1})
+    return (doc or {}).get("degrees_from") != "snapshot"
+
+# Counts history into a staging document, then moves the live counters by
+# the difference with one $inc instead of replacing them, so increments made
+# while it scans are kept. Only records older than the scan's start are
+# counted: the live counters are read first, so a record created after
+# that arrives through its own increment. One rebuild at a time (the
+# staging document is the claim); RebuildRunning if another is under way.
+def rebuild(db):
+    now = datetime.now()
+    try:
+        db.stats.replace_one({"_id": REBUILD_ID, "started_at": {"$lt": now - REBUILD_TIMEOUT}},
+                             {"started_at": now}, upsert=True)
+    except DuplicateKeyError:
+        raise RebuildRunning("A statistics rebuild is already running")
+
+    try:
+        before = _flatten(db.stats.find_one({"_id": STATS_ID}))
+        scanned = {"_id": {"$lt": ObjectId()}}
+        roles = db.history.aggregate([{"$match": scanned}, {"$group": {"_id": "$prediction", "count": {"$sum": 1}}}])
+        # Degree as snapshotted on the record (history_backfill.py)
+        degrees = db.history.aggregate([{"$match": scanned}, {"$group": {"_id": "$degree", "count": {"$sum": 1}}}])
+        ratings = db.history.aggregate([
+            {"$match": {**scanned, "feedback": {"$type": "number"}}},
+            {"$group": {"_id": "$feedback", "count": {"$sum": 1}}}
+        ])
+
+        doc = {"total": db.history.count_documents(scanned), "roles": {}, "degrees": {}, "ratings": {},
+               "rating_sum": 0, "rating_count": 0}
+        for r in roles:
+            doc["roles"][_field(r["_id"])] = r["count"]
+        for d in degrees:
+            key = _field(d["_id"] or UNKNOWN_DEGREE)
+            doc["degrees"][key] = doc["degrees"].get(key, 0) + d["count"]
+        for r in ratings:
+            doc["ratings"][_field(r["_id"])] = r["count"]
+            doc["rating_sum"] += r["_id"] * r["count"]
+            doc["rating_count"] += r["count"]
+        db.stats.update_one({"_id": REBUILD_ID}, {"$set": {"counters": doc}})
+
+        after = _flatten(doc)
+        delta = {key: after.get(key, 0) - before.get(key, 0) for key in set(before) | set(after)}
+        update = {"$set": {"rebuilt_at": datetime.now(), "degrees_from": "snapshot"}}
+        if any(delta.values()):
+            update["$inc"] = {key: n for key, n in delta.items() if n}
+        db.stats.update_one({"_id": STATS_ID}, update, upsert=True)
+        return doc
+    finally:
+        db.stats.delete_one({"_id": REBUILD_ID})
+
+def main():
+    load_dotenv()
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python stats_store.py rebuild")
+        sys.exit(2)
+    db = MongoClient(os.getenv("MONGO_URI")).get_default_database()
+    try:
+        doc = rebuild(db)
+    except RebuildRunning as e:
+        print(e)
+        sys.exit(1)
+    print(f"Statistics rebuilt: {doc['total']} predictions, {len(doc['roles'])} roles, "
+          f"{len(doc['degrees'])} degrees, {doc['rating_count']} ratings.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import uuid
+
+import mongomock
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ML_MODEL_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "ml-model")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.append(ML_MODEL_DIR)  # trainer modules (tree_compiler, model_bundle)
+
+# Read at import time by app.py and its modules: no background threads
+# touching a real MongoDB, cheap bcrypt, process-local shared state
+for key, value in {
+    "MODEL_WATCH_INTERVAL": "0",
+    "ENSURE_INDEXES": "0",
+    "HISTORY_BACKFILL": "0",
+    "STATS_INITIAL_REBUILD": "0",
+    "MONGO_URI": "mongodb://localhost:1/edu2job_test",
+    "JWT_SECRET_KEY": "test-secret-key-with-at-least-32-bytes",
+    "BCRYPT_ROUNDS": "4",
+    "SHARED_STATE_URI": "memory://",
+}.items():
+    os.environ.setdefault(key, value)
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+# A throwaway database on a real server, for what mongomock cannot answer
+# (query plans); set TEST_MONGO_URI to run those tests
+@pytest.fixture
+def mongo_db():
+    uri = os.getenv("TEST_MONGO_URI")
+    if not uri:
+        pytest.skip("TEST_MONGO_URI is not set")
+    client = MongoClient(uri, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        pytest.skip(f"MongoDB at TEST_MONGO_URI is unreachable: {e}")
+    name = f"edu2job_test_{uuid.uuid4().hex[:8]}"
+    yield client[name]
+    client.drop_database(name)
+    client.close()
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    # app.py creates logs/ in the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        import app
+    finally:
+        os.chdir(cwd)
+    return app
+
+@pytest.fixture
+def client(app_module, db):
+    app_module.mongo.db = db
+    app_module.app.config["TESTING"] = True
+    app_module.limiter.reset()
+    return app_module.app.test_client()
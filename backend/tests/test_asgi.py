@@ -0,0 +1,51 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from mongomock_motor import AsyncMongoMockClient
+from starlette.testclient import TestClient
+
+RESULTS = [{"job_role": "Backend Developer", "confidence": 80.0}, {"job_role": "Data Analyst", "confidence": 12.5}]
+
+
+@pytest.fixture
+def asgi_app(app_module, db, monkeypatch):
+    import asgi
+    app_module.mongo.db = db
+    monkeypatch.setattr(asgi, "db", AsyncMongoMockClient().db)
+    return asgi
+
+def _token(app_module, user_id):
+    with app_module.app.app_context():
+        return {"Authorization": "Bearer " + create_access_token(identity=str(user_id))}
+
+async def _add_user(asgi_app, **fields):
+    return (await asgi_app.db.users.insert_one({"name": "Ann", "role": "student", "degree": "B.Tech", **fields})).inserted_id
+
+
+def test_native_routes(asgi_app, app_module, monkeypatch):
+    with TestClient(asgi_app.app) as client:
+        user_id = client.portal.call(_add_user, asgi_app)
+        headers = _token(app_module, user_id)
+
+        assert client.get("/api/profile").status_code == 401
+        profile = client.get("/api/profile", headers=headers)
+        assert profile.status_code == 200 and profile.json()["name"] == "Ann"
+        assert profile.headers["X-Content-Type-Options"] == "nosniff"
+
+        monkeypatch.setattr(app_module, "bundle", object())
+        monkeypatch.setattr(app_module, "score_profile", lambda b, data: (RESULTS, data["skills"]))
+        prediction = client.post("/api/predict", json={"skills": ["Python"]}, headers=headers)
+        assert prediction.status_code == 200
+        assert prediction.json()["top_predictions"] == RESULTS
+
+        bad = client.post("/api/predict", content=b"{not json", headers={**headers, "Content-Type": "application/json"})
+        assert bad.status_code == 400
+
+        assert client.get("/api/history", headers=headers).json() == []
+        assert client.get("/api/stats/job_distribution", headers=headers).json() == {"labels": [], "data": []}
+        assert client.get("/api/admin/stats", headers=headers).status_code == 403
+
+def test_mounted_flask_routes(asgi_app):
+    with TestClient(asgi_app.app) as client:
+        response = client.post("/register", json={"name": "Bo", "email": "bo@example.com", "password": "Passw0rd1"})
+        assert response.status_code == 201
+        assert client.get("/api/config").status_code == 404  # no model loaded
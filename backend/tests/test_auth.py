@@ -0,0 +1,40 @@
+import pytest
+
+
+@pytest.fixture
+def registered(client):
+    body = {"name": "Ann", "email": "ann@example.com", "password": "Passw0rd1"}
+    assert client.post("/register", json=body).status_code == 201
+    return body
+
+def _token(client, email, password):
+    return client.post("/login", json={"email": email, "password": password}).get_json()["token"]
+
+@pytest.mark.parametrize("password", [None, "", 12345678])
+def test_register_rejects_missing_password(client, password):
+    body = {"name": "Ann", "email": "ann@example.com", "password": password}
+    assert client.post("/register", json=body).status_code == 400
+
+@pytest.mark.parametrize("password", [None, ""])
+def test_login_rejects_empty_password(client, registered, password):
+    response = client.post("/login", json={"email": registered["email"], "password": password})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("new_password", [None, "", ["Passw0rd2"]])
+def test_password_reset_rejects_empty_password(client, db, registered, new_password):
+    stored = db.users.find_one({"email": registered["email"]})["password"]
+    response = client.post("/api/reset_password_manual", json={
+        "email": registered["email"], "name": registered["name"], "new_password": new_password})
+    assert response.status_code == 400
+    assert db.users.find_one({"email": registered["email"]})["password"] == stored
+
+    # Neither did an empty password become valid
+    assert client.post("/login", json={"email": registered["email"], "password": ""}).status_code == 400
+
+def test_change_password(client, registered):
+    headers = {"Authorization": f"Bearer {_token(client, registered['email'], registered['password'])}"}
+    body = {"old_password": registered["password"]}
+    assert client.post("/api/change_password", json=body, headers=headers).status_code == 400
+    body["new_password"] = "Passw0rd2"
+    assert client.post("/api/change_password", json=body, headers=headers).status_code == 200
+    assert _token(client, registered["email"], "Passw0rd2")
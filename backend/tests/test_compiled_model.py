@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from xgboost import XGBClassifier
+
+from compiled_model import CompiledModel
+from tree_compiler import PARITY_TOLERANCE, build_library, flatten_booster
+
+N_FEATURES = 12
+N_CLASSES = 4
+
+
+@pytest.fixture(scope="module")
+def library(tmp_path_factory):
+    path = build_library(str(tmp_path_factory.mktemp("tree_eval")))
+    if path is None:
+        pytest.skip("no C compiler")
+    return path
+
+def _data(rng, rows):
+    X = rng.random((rows, N_FEATURES), dtype=np.float32)
+    X[X < 0.4] = 0  # skill-like columns: mostly absent
+    y = (X[:, 0] * 2 + X[:, 1] + (X[:, 2] > 0)).astype(int) % N_CLASSES
+    return X, y
+
+def _train(X, y):
+    model = XGBClassifier(n_estimators=15, max_depth=4, learning_rate=0.3, tree_method="hist")
+    model.fit(X, y)
+    return model
+
+def test_dense_parity_with_xgboost(library):
+    rng = np.random.default_rng(0)
+    X, y = _data(rng, 400)
+    model = _train(X, y)
+    compiled = CompiledModel(library, flatten_booster(model.get_booster()), N_CLASSES, N_FEATURES)
+
+    X_test, _ = _data(rng, 200)
+    X_test[:5, 3] = np.nan  # missing values take the default branch
+    got = compiled.predict_proba(X_test)
+    np.testing.assert_allclose(got, model.predict_proba(X_test), atol=PARITY_TOLERANCE)
+    np.testing.assert_allclose(got.sum(axis=1), 1.0, atol=1e-5)
+
+def test_sparse_parity_with_xgboost(library):
+    # A CSR-trained booster reads absent entries as missing, not zero
+    rng = np.random.default_rng(1)
+    X, y = _data(rng, 400)
+    model = _train(sp.csr_matrix(X), y)
+    compiled = CompiledModel(library, flatten_booster(model.get_booster()), N_CLASSES, N_FEATURES, sparse_input=True)
+
+    X_test = sp.csr_matrix(_data(rng, 200)[0])
+    np.testing.assert_allclose(compiled.predict_proba(X_test), model.predict_proba(X_test), atol=PARITY_TOLERANCE)
+    np.testing.assert_allclose(compiled.predict_proba(X_test[:1]), model.predict_proba(X_test[:1]), atol=PARITY_TOLERANCE)
@@ -0,0 +1,57 @@
+from db_indexes import INDEXES, ensure_indexes, check_query_plans, _stages
+
+
+def test_ensure_indexes_is_idempotent(db):
+    ensure_indexes(db)
+    ensure_indexes(db)
+    for collection, indexes in INDEXES.items():
+        names = set(db[collection].index_information())
+        assert {i.document["name"] for i in indexes} <= names
+
+def test_register_duplicate_email_hits_unique_index(client, db):
+    ensure_indexes(db)
+    body = {"name": "Ann", "email": "ann@example.com", "password": "Passw0rd1"}
+    assert client.post("/register", json=body).status_code == 201
+
+    response = client.post("/register", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "Email already exists"
+    assert db.users.count_documents({"email": "ann@example.com"}) == 1
+
+
+def test_stages_walks_nested_plans():
+    plan = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}
+    assert list(_stages(plan)) == ["LIMIT", "FETCH", "IXSCAN"]
+    assert list(_stages({"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]})) == \
+        ["OR", "IXSCAN", "COLLSCAN"]
+
+class _ExplainingDb:
+    # What mongod answers to `explain` when a collection has no usable index
+    def __init__(self, indexed):
+        self.indexed = indexed
+        self.commands = []
+
+    def command(self, command):
+        self.commands.append(command)
+        collection = command["explain"]["find"]
+        leaf = {"stage": "IXSCAN"} if collection in self.indexed else {"stage": "COLLSCAN"}
+        return {"queryPlanner": {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "FETCH", "inputStage": leaf}}}}
+
+def test_check_query_plans_reports_collscan():
+    db = _ExplainingDb(indexed={"users", "training_jobs"})
+    results = check_query_plans(db)
+
+    scans = {name for name, collection, stages in results if "COLLSCAN" in stages}
+    assert scans and all(collection == "history" for name, collection, stages in results if name in scans)
+    assert all("IXSCAN" in stages for name, collection, stages in results if collection != "history")
+    assert all(c["verbosity"] == "queryPlanner" for c in db.commands)
+
+def test_query_plans_on_a_real_server(mongo_db):
+    ensure_indexes(mongo_db)
+    scans = [name for name, collection, stages in check_query_plans(mongo_db) if "COLLSCAN" in stages]
+    assert scans == []
+
+    # Nothing else serves the compare_stats degree match
+    mongo_db.users.drop_index("degree")
+    scans = [name for name, collection, stages in check_query_plans(mongo_db) if "COLLSCAN" in stages]
+    assert scans == ["compare_stats degree match"]
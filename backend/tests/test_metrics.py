@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def metrics_client(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "METRICS_TOKEN", "scrape-token")
+    monkeypatch.setattr(app_module, "METRICS_PUBLIC", False)
+    return client
+
+def _scrape(client):
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+def test_metrics_need_the_token(metrics_client, app_module, monkeypatch):
+    assert metrics_client.get("/metrics").status_code == 403
+    assert metrics_client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert "edu2job_http_request_seconds" in _scrape(metrics_client)
+
+    # No token configured: closed unless opened explicitly
+    monkeypatch.setattr(app_module, "METRICS_TOKEN", None)
+    assert metrics_client.get("/metrics").status_code == 403
+    monkeypatch.setattr(app_module, "METRICS_PUBLIC", True)
+    assert metrics_client.get("/metrics").status_code == 200
+
+def _training_count(text, mode, status):
+    line = f'edu2job_training_job_seconds_count{{mode="{mode}",status="{status}"}} '
+    return next((int(l[len(line):]) for l in text.splitlines() if l.startswith(line)), 0)
+
+def test_training_jobs_are_observed_once(metrics_client, db):
+    before = _training_count(_scrape(metrics_client), "incremental", "succeeded")
+    now = datetime.now()
+    db.training_jobs.insert_many([
+        {"mode": "incremental", "status": "succeeded", "started_at": now - timedelta(seconds=90), "finished_at": now},
+        {"mode": "incremental", "status": "superseded", "finished_at": now + timedelta(milliseconds=1)},
+    ])
+    assert _training_count(_scrape(metrics_client), "incremental", "succeeded") == before + 1
+    assert _training_count(_scrape(metrics_client), "incremental", "succeeded") == before + 1
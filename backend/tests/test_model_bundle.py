@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import numpy as np
+
+import model_bundle
+import model_registry
+from model_registry import ModelRegistry
+
+
+class _FrozenClock:
+    @staticmethod
+    def now():
+        return datetime(2026, 1, 2, 3, 4, 5)
+
+def test_server_reads_with_the_trainers_reader():
+    assert model_registry.read_bundle is model_bundle.read_bundle
+    assert model_registry.BUNDLE_FILE == model_bundle.BUNDLE_FILE
+
+def test_publishes_in_the_same_second_get_distinct_versions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(model_bundle, "datetime", _FrozenClock)
+
+    published = []
+    for i in range(3):
+        published.append(model_bundle.publish_version({"run": i}, {"weights": np.arange(5, dtype=np.float32) * i}))
+
+    assert published == ["20260102_030405", "20260102_030405_2", "20260102_030405_3"]
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.versions() == published
+    assert registry.current_version() == published[-1]
+    for i, version in enumerate(published):
+        header, arrays = model_bundle.read_bundle(tmp_path / "versions" / version / model_bundle.BUNDLE_FILE)
+        assert header["run"] == i and header["version"] == version
+        assert arrays["weights"].tolist() == [float(x * i) for x in range(5)]
@@ -0,0 +1,84 @@
+import os
+import queue
+import signal
+import threading
+import time
+
+import pytest
+
+from password_pool import PasswordHasher, PoolSaturated
+
+
+@pytest.fixture(scope="module")
+def hasher():
+    hasher = PasswordHasher(rounds=4, workers=1, max_queue=0, timeout=10)
+    yield hasher
+    hasher.close()
+
+def test_hash_and_check(hasher):
+    pw_hash = hasher.hash("Passw0rd1")
+    assert hasher.check(pw_hash, "Passw0rd1")
+    assert not hasher.check(pw_hash, "wrong")
+    assert not hasher.check("", "Passw0rd1")  # Google accounts have no hash
+    assert not hasher.needs_rehash(pw_hash)
+
+def test_saturated_pool_rejects(hasher):
+    future = hasher._submit(time.sleep, 0.5)  # holds the only slot
+    with pytest.raises(PoolSaturated):
+        hasher.hash("Passw0rd1")
+    future.result()
+    assert hasher.stats()["rejected"] >= 1
+
+def _wait_for(pid, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        done, status = os.waitpid(pid, os.WNOHANG)
+        if done:
+            return os.waitstatus_to_exitcode(status)
+        time.sleep(0.05)
+    os.kill(pid, signal.SIGKILL)
+    os.waitpid(pid, 0)
+    pytest.fail(f"forked child did not exit within {timeout}s")
+
+def test_forked_child_gets_its_own_pool(hasher):
+    # What a gunicorn --preload worker does with the hasher app.py created
+    pw_hash = hasher.hash("Passw0rd1")
+    pid = os.fork()
+    if pid == 0:
+        code = 2
+        try:
+            code = 0 if hasher.check(pw_hash, "Passw0rd1") and hasher.check(hasher.hash("x"), "x") else 1
+        finally:
+            hasher.close(wait=True)
+            os._exit(code)
+    assert _wait_for(pid, timeout=30) == 0
+    assert hasher.check(pw_hash, "Passw0rd1")
+
+@pytest.mark.parametrize("password", [None, "", b"Passw0rd1"])
+def test_rejects_empty_and_non_string_passwords(hasher, password):
+    with pytest.raises(ValueError):
+        hasher.hash(password)
+    with pytest.raises(ValueError):
+        hasher.check(hasher.hash("Passw0rd1"), password)
+
+def test_rehash_stores_off_the_callback_thread():
+    logged = []
+    hasher = PasswordHasher(rounds=4, workers=1, max_queue=1, timeout=10, log=logged.append)
+    try:
+        stored = queue.Queue()
+        assert hasher.rehash_later("Passw0rd1", lambda new_hash: stored.put((new_hash, threading.current_thread().name)))
+        new_hash, thread_name = stored.get(timeout=10)
+        assert thread_name == "password-rehash"
+        assert hasher.check(new_hash, "Passw0rd1")
+
+        def fail(new_hash):
+            stored.put(None)
+            raise RuntimeError("mongo down")
+        assert hasher.rehash_later("Passw0rd1", fail)
+        stored.get(timeout=10)
+        deadline = time.monotonic() + 5
+        while not logged and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert logged == ["Password rehash failed: mongo down"]
+    finally:
+        hasher.close(wait=True)
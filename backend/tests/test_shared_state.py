@@ -0,0 +1,74 @@
+import time
+
+import pytest
+from limits import RateLimitItemPerMinute
+from limits.strategies import FixedWindowRateLimiter
+
+from fake_redis import FakeRedisServer
+from prediction_cache import PredictionCache
+from shared_state import RedisBackend, SharedLimiterStorage, MemoryBackend
+
+
+@pytest.fixture
+def redis_uri():
+    server = FakeRedisServer(("127.0.0.1", 0)).start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.shutdown()
+    server.server_close()
+
+# Two app processes: each has its own connection pool to the same server
+@pytest.fixture
+def two_clients(redis_uri):
+    return RedisBackend(redis_uri), RedisBackend(redis_uri)
+
+def _key(version, degree="B.Tech", skills=("Python", "SQL")):
+    return PredictionCache.make_key(version, {"degree": degree, "cgpa": 0.5}, skills)
+
+def test_prediction_cache_is_shared(two_clients):
+    first, second = (PredictionCache(ttl=60, backend=b) for b in two_clients)
+    results = [{"job_role": "Data Scientist", "confidence": 81.5}]
+    first.put(_key("v1"), results)
+
+    assert second.get(_key("v1", skills=("SQL", "Python"))) == results
+    # A new model version is a different key: the old entries just expire
+    assert second.get(_key("v2")) is None
+    assert second.stats()["hits"] == 1 and second.stats()["misses"] == 1
+
+def test_prediction_cache_entries_expire(two_clients):
+    first, second = (PredictionCache(ttl=0.2, backend=b) for b in two_clients)
+    first.put(_key("v1"), [])
+    assert second.get(_key("v1")) == []
+    time.sleep(0.3)
+    assert second.get(_key("v1")) is None
+
+def test_unreachable_backend_is_a_miss():
+    cache = PredictionCache(backend=RedisBackend("redis://127.0.0.1:1/0", timeout=0.2))
+    cache.put(_key("v1"), [])
+    assert cache.get(_key("v1")) is None
+    assert cache.stats()["errors"] == 2
+
+def test_rate_limits_are_shared_and_reset(two_clients):
+    limiters = [FixedWindowRateLimiter(SharedLimiterStorage("shared://", backend=b)) for b in two_clients]
+    limit = RateLimitItemPerMinute(3)
+
+    assert [limiters[i % 2].hit(limit, "login", "10.0.0.1") for i in range(4)] == [True, True, True, False]
+    assert limiters[1].hit(limit, "login", "10.0.0.2")  # another client has its own window
+    remaining = limiters[0].get_window_stats(limit, "login", "10.0.0.1")
+    assert remaining.remaining == 0 and remaining.reset_time > time.time()
+
+    two_clients[0].set("prediction:kept", "1")
+    assert limiters[0].storage.reset() == 2
+    assert limiters[1].hit(limit, "login", "10.0.0.1")
+    assert two_clients[1].get("prediction:kept") == b"1"
+
+def test_databases_are_separate(redis_uri):
+    zero, one = RedisBackend(redis_uri), RedisBackend(redis_uri[:-1] + "1")
+    zero.set("k", "v")
+    assert one.get("k") is None and zero.get("k") == b"v"
+
+def test_memory_backend_reset():
+    storage = SharedLimiterStorage("shared://", backend=MemoryBackend())
+    storage.incr("a", 60)
+    storage.backend.set("prediction:kept", "1")
+    assert storage.reset() == 1
+    assert storage.get("a") == 0 and storage.backend.get("prediction:kept") == "1"
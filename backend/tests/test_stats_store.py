@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+from bson.objectid import ObjectId
+
+import stats_store
+from history_backfill import backfill
+
+
+def _predict(db, role, degree="B.Tech", **extra):
+    record = {"_id": ObjectId(), "user_id": ObjectId(), "prediction": role, "degree": degree,
+              "date": datetime.now(), **extra}
+    db.history.insert_one(record)
+    return record
+
+def test_rebuild_repairs_drifted_counters(db):
+    for role in ("Data Scientist", "Data Scientist", "Web Developer"):
+        _predict(db, role, feedback=4)
+    stats_store.record_predictions(db, ["Data Scientist"], "B.Tech")  # only one got counted
+
+    assert stats_store.needs_rebuild(db)
+    stats_store.rebuild(db)
+    stats = stats_store.read_stats(db)
+    assert stats["total"] == 3
+    assert stats["roles"] == {"Data Scientist": 2, "Web Developer": 1}
+    assert stats["degrees"] == {"B.Tech": 3}
+    assert stats["average_rating"] == 4
+    assert not stats_store.needs_rebuild(db)
+    assert db.stats.find_one({"_id": stats_store.REBUILD_ID}) is None
+
+def test_rebuild_keeps_increments_made_during_the_scan(db, monkeypatch):
+    _predict(db, "Data Scientist")
+    # A prediction lands after the roles were grouped, before the scan ends
+    aggregate, calls = type(db.history).aggregate, []
+    def aggregate_while_predicting(self, *args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            stats_store.record_history(db, [_predict(db, "Web Developer")])
+        return aggregate(self, *args, **kwargs)
+    monkeypatch.setattr(type(db.history), "aggregate", aggregate_while_predicting)
+
+    stats_store.rebuild(db)
+    stats = stats_store.read_stats(db)
+    assert stats["total"] == 2
+    assert stats["roles"] == {"Data Scientist": 1, "Web Developer": 1}
+
+def test_one_rebuild_at_a_time(db):
+    db.stats.insert_one({"_id": stats_store.REBUILD_ID, "started_at": datetime.now()})
+    with pytest.raises(stats_store.RebuildRunning):
+        stats_store.rebuild(db)
+
+def test_backfill_moves_degrees_out_of_unknown(db):
+    user = db.users.insert_one({"name": "Ann", "degree": "B.Sc"}).inserted_id
+    db.history.insert_one({"user_id": user, "prediction": "Data Scientist", "date": datetime.now()})
+    stats_store.rebuild(db)
+    assert stats_store.read_stats(db)["degrees"] == {"Unknown": 1}
+
+    assert backfill(db, pause=0) == 1
+    assert stats_store.read_stats(db)["degrees"] == {"B.Sc": 1}
+    assert stats_store.read_stats(db)["total"] == 1
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import training_worker
+from training_worker import LeaseKeeper, acquire_lease, claim_next_job, enqueue_training_job, run_job
+
+# Prints nothing until it is done, like an XGBoost fit
+SILENT_TRAINER = """
+import time
+time.sleep(float(open("sleep_seconds").read()))
+print("Model version: v-test")
+"""
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "train_model.py").write_text(SILENT_TRAINER)
+    monkeypatch.setattr(training_worker, "MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(training_worker, "LEASE_SECONDS", 1)
+    return tmp_path
+
+def _queue_job(db, model_dir, sleep_seconds):
+    (model_dir / "sleep_seconds").write_text(str(sleep_seconds))
+    upload = model_dir / "uploads" / "upload.csv"
+    upload.write_text("a,b\n1,2\n")
+    enqueue_training_job(db, str(upload), "upload.csv", "admin@example.com")
+    return claim_next_job(db)
+
+def test_silent_job_outlives_the_lease(db, model_dir):
+    lease = LeaseKeeper(db, "worker-1", interval=0.2)
+    assert lease.start()
+    job = _queue_job(db, model_dir, sleep_seconds=3)
+
+    # A second worker started half-way through the fit must not get in
+    others = []
+    probe = threading.Timer(2, lambda: others.append(acquire_lease(db, "worker-2")))
+    probe.start()
+    try:
+        run_job(db, job, lease)
+    finally:
+        probe.join()
+        lease.stop()
+
+    assert others == [False]
+    assert not lease.lost.is_set()
+    assert db.training_jobs.find_one({"_id": job["_id"]})["status"] == "succeeded"
+    assert os.path.exists(model_dir / "career_dataset.csv")
+
+def test_lost_lease_kills_the_job(db, model_dir):
+    lease = LeaseKeeper(db, "worker-1", interval=0.2)
+    assert lease.start()
+    job = _queue_job(db, model_dir, sleep_seconds=30)
+
+    # What a worker started after our lease expired does
+    def take_over():
+        db.locks.update_one({"_id": training_worker.LEASE_ID},
+                            {"$set": {"owner": "worker-2", "expires_at": datetime.max}})
+    threading.Timer(0.5, take_over).start()
+    started = time.monotonic()
+    try:
+        run_job(db, job, lease)
+    finally:
+        lease.stop()
+
+    assert time.monotonic() - started < 10
+    assert lease.lost.is_set()
+    stored = db.training_jobs.find_one({"_id": job["_id"]})
+    assert stored["status"] == "failed"
+    assert stored["error"] == "Training worker lost its lease"
+    assert not acquire_lease(db, "worker-1")
@@ -0,0 +1,292 @@
+import os
+import sys
+import re
+import time
+import socket
+import threading
+import subprocess
+from collections import deque
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from dotenv import load_dotenv
+
+from model_registry import ModelRegistry, read_bundle, BUNDLE_FILE
+
+# Training job queue (Mongo `training_jobs`) and the single worker process
+# that drains it. The web app only enqueues; `python training_worker.py`
+# runs jobs one at a time with a lowered priority so serving keeps its CPU.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, '../ml-model')
+UPLOAD_DIR = os.path.join(MODEL_DIR, 'uploads')
+
+LEASE_ID = "training_worker"
+LEASE_SECONDS = 60
+LEASE_RENEW_SECONDS = LEASE_SECONDS / 3
+POLL_SECONDS = float(os.getenv("TRAINING_POLL_SECONDS", 2))
+IDLE_EXIT_SECONDS = float(os.getenv("TRAINING_WORKER_IDLE_EXIT", 300))
+LOG_TAIL_LINES = 200
+
+VERSION_RE = re.compile(r"Model version: (\S+)")
+
+
+#Queue API (used by app.py)
+def enqueue_training_job(db, dataset_path, filename, requested_by, mode="full", ingest=None):
+    # A newer upload makes any job that has not started yet pointless
+    for stale in db.training_jobs.find({"status": "queued"}, {"dataset": 1}):
+        result = db.training_jobs.update_one(
+            {"_id": stale["_id"], "status": "queued"},
+            {"$set": {"status": "superseded", "finished_at": datetime.now()}}
+        )
+        # Only drop the upload if the worker did not claim the job meanwhile
+        if result.modified_count:
+            for path in dataset_files(os.path.join(MODEL_DIR, stale["dataset"])):
+                try: os.remove(path)
+                except OSError: pass
+
+    return db.training_jobs.insert_one({
+        "status": "queued",
+        "dataset": os.path.relpath(dataset_path, MODEL_DIR),
+        "filename": filename,
+        "mode": mode,
+        "requested_by": requested_by,
+        "ingest": ingest,
+        "created_at": datetime.now(),
+        "log_tail": []
+    }).inserted_id
+
+# An upload is the cleaned CSV plus the Parquet copy the trainer reads
+def dataset_files(csv_path):
+    return csv_path, os.path.splitext(csv_path)[0] + ".parquet"
+
+def worker_alive(db):
+    lease = db.locks.find_one({"_id": LEASE_ID})
+    return bool(lease and lease.get("expires_at") and lease["expires_at"] > datetime.now())
+
+def ensure_worker(db, log_path):
+    if worker_alive(db): return False
+    with open(log_path, 'a') as log:
+        subprocess.Popen(
+            [sys.executable, os.path.join(BASE_DIR, 'training_worker.py')],
+            cwd=BASE_DIR, stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+        )
+    return True
+
+def serialize_job(job, with_log=False):
+    started, finished = job.get("started_at"), job.get("finished_at")
+    duration = None
+    if started:
+        duration = round(((finished or datetime.now()) - started).total_seconds(), 1)
+    fmt = lambda d: d.strftime("%Y-%m-%d %H:%M:%S") if d else None
+    data = {
+        "_id": str(job["_id"]),
+        "status": job.get("status"),
+        "mode": job.get("mode", "full"),
+        "filename": job.get("filename"),
+        "requested_by": job.get("requested_by"),
+        "created_at": fmt(job.get("created_at")),
+        "started_at": fmt(started),
+        "finished_at": fmt(finished),
+        "duration_seconds": duration,
+        "version": job.get("version"),
+        "metrics": job.get("metrics"),
+        "ingest": job.get("ingest"),
+        "error": job.get("error")
+    }
+    log_tail = job.get("log_tail", [])
+    data["log_tail"] = log_tail if with_log else log_tail[-10:]
+    return data
+
+
+#Worker
+def acquire_lease(db, owner):
+    now = datetime.now()
+    try:
+        db.locks.update_one(
+            {"_id": LEASE_ID, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=LEASE_SECONDS)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+def release_lease(db, owner):
+    db.locks.delete_one({"_id": LEASE_ID, "owner": owner})
+
+# Renews the lease from its own thread every `interval` seconds, so a fit
+# that prints nothing for minutes still holds it. The lease is lost when
+# another worker took it over or when no renewal got through for a whole
+# lease period (it may have expired, so a second worker may be starting);
+# the training process is then killed and the worker stops.
+class LeaseKeeper:
+    def __init__(self, db, owner, interval=None):
+        self.db = db
+        self.owner = owner
+        self.interval = LEASE_RENEW_SECONDS if interval is None else interval
+        self.lost = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._proc = None
+        self._thread = None
+
+    def start(self):
+        if not acquire_lease(self.db, self.owner):
+            return False
+        self._renewed = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="lease-keeper", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                if acquire_lease(self.db, self.owner):
+                    self._renewed = time.monotonic()
+                    continue
+                reason = "taken over by another worker"
+            except PyMongoError as e:
+                if time.monotonic() - self._renewed < LEASE_SECONDS:
+                    print(f"Lease renewal failed, retrying: {e}")
+                    continue
+                reason = f"not renewed for {LEASE_SECONDS}s ({e})"
+            print(f"Training worker {self.owner} lost its lease: {reason}.")
+            self._on_lost()
+            return
+
+    def _on_lost(self):
+        with self._lock:
+            self.lost.set()
+            if self._proc is not None and self._proc.poll() is None:
+                self._proc.kill()
+
+    # The process to kill if the lease is lost while it runs
+    def watch(self, proc):
+        with self._lock:
+            if self.lost.is_set():
+                proc.kill()
+            self._proc = proc
+
+    def unwatch(self):
+        with self._lock:
+            self._proc = None
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+
+def apply_process_limits():
+    nice = int(os.getenv("TRAINING_NICE", 10))
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+    cpus = os.getenv("TRAINING_CPU_AFFINITY", "").strip()
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {int(c) for c in cpus.split(",") if c.strip()})
+
+def claim_next_job(db):
+    return db.training_jobs.find_one_and_update(
+        {"status": "queued"},
+        {"$set": {"status": "running", "started_at": datetime.now()}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def run_job(db, job, lease):
+    job_id = job["_id"]
+    log_tail = deque(maxlen=LOG_TAIL_LINES)
+    update = {"status": "failed"}
+    try:
+        if lease.lost.is_set():
+            raise RuntimeError("Training worker lost its lease")
+        # Move the upload into place; nothing else writes these files while we train.
+        # The CSV goes first so a stale Parquet copy is never newer than it.
+        upload_csv, upload_parquet = dataset_files(os.path.join(MODEL_DIR, job["dataset"]))
+        dataset_csv, dataset_parquet = dataset_files(os.path.join(MODEL_DIR, 'career_dataset.csv'))
+        os.replace(upload_csv, dataset_csv)
+        if os.path.exists(upload_parquet):
+            os.replace(upload_parquet, dataset_parquet)
+        elif os.path.exists(dataset_parquet):
+            os.remove(dataset_parquet)
+
+        cmd = [sys.executable, os.path.join(MODEL_DIR, 'train_model.py')]
+        if job.get("mode") == "incremental": cmd.append("--incremental")
+        proc = subprocess.Popen(
+            cmd,
+            cwd=MODEL_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"}
+        )
+        lease.watch(proc)
+        try:
+            version, last_flush = None, 0.0
+            for line in proc.stdout:
+                line = line.rstrip()
+                log_tail.append(line)
+                match = VERSION_RE.search(line)
+                if match: version = match.group(1)
+                if time.time() - last_flush > 1:
+                    db.training_jobs.update_one({"_id": job_id}, {"$set": {"log_tail": list(log_tail)}})
+                    last_flush = time.time()
+            returncode = proc.wait()
+        finally:
+            lease.unwatch()
+
+        if lease.lost.is_set():
+            update["error"] = "Training worker lost its lease"
+        elif returncode == 0 and version:
+            update = {"status": "succeeded", "version": version, "metrics": read_metrics(version)}
+        else:
+            update["error"] = f"train_model.py exited with code {returncode}"
+    except Exception as e:
+        update["error"] = str(e)
+
+    update.update({"finished_at": datetime.now(), "log_tail": list(log_tail)})
+    # Still ours unless a worker that took the lease over failed it already
+    db.training_jobs.update_one({"_id": job_id, "status": "running"}, {"$set": update})
+    print(f"Training job {job_id} {update['status']}.")
+
+def read_metrics(version):
+    path = os.path.join(ModelRegistry(MODEL_DIR).version_path(version), BUNDLE_FILE)
+    try:
+        header, _ = read_bundle(path)
+        return header.get("metrics")
+    except Exception:
+        return None
+
+def main():
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_URI")).get_default_database()
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    lease = LeaseKeeper(db, owner)
+    if not lease.start():
+        print("Another training worker is already running.")
+        return
+
+    apply_process_limits()
+    # Jobs left running by a worker that died can never finish
+    db.training_jobs.update_many(
+        {"status": "running"},
+        {"$set": {"status": "failed", "error": "Training worker restarted", "finished_at": datetime.now()}}
+    )
+    print(f"Training worker {owner} started.")
+
+    idle_since = time.time()
+    try:
+        while not lease.lost.is_set():
+            job = claim_next_job(db)
+            if job is None:
+                if IDLE_EXIT_SECONDS and time.time() - idle_since > IDLE_EXIT_SECONDS: break
+                lease.lost.wait(POLL_SECONDS)
+                continue
+            run_job(db, job, lease)
+            idle_since = time.time()
+    finally:
+        lease.stop()
+        if not lease.lost.is_set():
+            release_lease(db, owner)
+        print(f"Training worker {owner} stopped.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+import os
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.preprocessing import StandardScaler
+
+from preprocessing import NUMERIC_COLS, CATEGORICAL_COLS, clean_internship, parse_skills, get_unique_certs, load_dataset
+from model_bundle import file_digest, dataset_fingerprint
+
+# Dataset layer for train_model.py. career_dataset.csv is mirrored into
+# Parquet partitions under dataset/, and the encoded feature matrix is
+# cached as CSR under feature_cache/, keyed by a hash of the partition
+# contents:
+#   dataset/manifest.json           source CSV fingerprint + partition list
+#   dataset/part-00000.parquet      raw rows, canonical dtypes
+#   feature_cache/parts/<hash>.*    one partition parsed against its own vocab
+#   feature_cache/<key>.*           the whole dataset encoded and fitted
+# Unchanged data loads the cached matrix without touching the rows; rows
+# appended to the CSV become a new partition and only that one is parsed.
+STORE_DIR = "dataset"
+CACHE_DIR = "feature_cache"
+MANIFEST_FILE = "manifest.json"
+PARTITION_ROWS = int(os.getenv("DATASET_PARTITION_ROWS", 50000))
+# Bump when the encoding below changes so old cache entries are ignored
+FEATURE_CACHE_VERSION = 1
+
+DATASET_COLUMNS = ["degree", "specialization", "skills", "certifications", "cgpa",
+                   "graduation_year", "internship_experience", "job_role"]
+CODED_COLS = CATEGORICAL_COLS + ["internship_experience", "job_role"]
+FEATURE_COLS = CATEGORICAL_COLS + NUMERIC_COLS + ["internship_experience"]
+
+
+def _write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f: json.dump(data, f)
+    os.replace(tmp, path)
+
+def _read_json(path):
+    try:
+        with open(path) as f: return json.load(f)
+    except FileNotFoundError:
+        return None
+
+# CSV and upload Parquet disagree on dtypes (1 vs "1", 2024 vs 2024.0);
+# partitions always use strings and floats so they concatenate cleanly
+def _normalize(df):
+    df = df.reindex(columns=DATASET_COLUMNS)
+    for col in DATASET_COLUMNS:
+        if col in NUMERIC_COLS:
+            df[col] = pd.to_numeric(df[col]).astype("float64")
+        else:
+            df[col] = df[col].astype(object).where(df[col].isna(), df[col].astype(str))
+    return df.reset_index(drop=True)
+
+def _content_hash(df):
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+# Everything train_model.py needs from the data, fitted on the full dataset
+class EncodedDataset:
+    def __init__(self, X, y, feature_names, vocab, fill_values, scaler, metadata):
+        self.X = X
+        self.y = y
+        self.feature_names = feature_names
+        self.vocab = vocab
+        self.fill_values = fill_values
+        self.scaler = scaler
+        self.metadata = metadata
+
+
+class DatasetStore:
+    def __init__(self, root=STORE_DIR, cache_dir=CACHE_DIR):
+        self.root = root
+        self.cache_dir = cache_dir
+        self.parts_dir = os.path.join(cache_dir, "parts")
+
+    def manifest(self):
+        return _read_json(os.path.join(self.root, MANIFEST_FILE)) or {"source": None, "partitions": []}
+
+    def sync(self, csv_path):
+        manifest = self.manifest()
+        source = dataset_fingerprint(csv_path)
+        previous = manifest["source"]
+        if previous and previous["sha256"] == source["sha256"]:
+            return manifest
+
+        partitions = manifest["partitions"]
+        if previous and source["bytes"] > previous["bytes"] and file_digest(csv_path, previous["bytes"]) == previous["sha256"]:
+            new_rows = self._appended_rows(csv_path, previous, sum(p["rows"] for p in partitions))
+            print(f"Dataset store: {len(new_rows)} appended rows -> new partition")
+        else:
+            new_rows, partitions = load_dataset(csv_path), []
+            print(f"Dataset store: rebuilding from {csv_path} ({len(new_rows)} rows)")
+
+        new_rows = new_rows.dropna(how='all')
+        os.makedirs(self.root, exist_ok=True)
+        for start in range(0, len(new_rows), PARTITION_ROWS):
+            part = _normalize(new_rows.iloc[start:start + PARTITION_ROWS])
+            name = f"part-{len(partitions):05d}.parquet"
+            part.to_parquet(os.path.join(self.root, name), index=False)
+            partitions.append({"file": name, "rows": len(part), "hash": _content_hash(part)})
+
+        columns = list(pd.read_csv(csv_path, nrows=0).columns)
+        manifest = {"source": {**source, "columns": columns}, "partitions": partitions}
+        _write_json(os.path.join(self.root, MANIFEST_FILE), manifest)
+        keep = {p["file"] for p in partitions} | {MANIFEST_FILE}
+        for name in os.listdir(self.root):
+            if name not in keep: os.remove(os.path.join(self.root, name))
+        return manifest
+
+    def _appended_rows(self, csv_path, previous, previous_rows):
+        # The upload's Parquet copy (when current) holds the same rows in
+        # the same order, so the new ones can be sliced off without parsing
+        parquet_path = os.path.splitext(csv_path)[0] + ".parquet"
+        if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+            return pd.read_parquet(parquet_path).iloc[previous_rows:]
+        with open(csv_path, "rb") as f:
+            f.seek(previous["bytes"])
+            return pd.read_csv(f, names=previous["columns"], header=None)
+
+    def load(self):
+        manifest = self.manifest()
+        frames = [pd.read_parquet(os.path.join(self.root, p["file"])) for p in manifest["partitions"]]
+        return pd.concat(frames, ignore_index=True) if frames else _normalize(pd.DataFrame())
+
+    def dataset_key(self, manifest=None):
+        manifest = manifest or self.manifest()
+        h = hashlib.sha256(f"v{FEATURE_CACHE_VERSION}".encode())
+        for p in manifest["partitions"]: h.update(p["hash"].encode())
+        return h.hexdigest()
+
+    def features(self):
+        manifest = self.manifest()
+        if not manifest["partitions"]:
+            raise ValueError("Dataset store is empty; call sync() first")
+        key = self.dataset_key(manifest)
+        cached = self._load_encoded(key)
+        if cached is not None:
+            print(f"Feature cache hit ({key[:12]})")
+            return cached
+
+        parts = [self._parsed_partition(p) for p in manifest["partitions"]]
+        encoded = self._encode(parts, manifest)
+        self._save_encoded(key, encoded)
+        self._prune(manifest, key)
+        return encoded
+
+    # Per-partition parse: the expensive, vocabulary-independent part.
+    # Codes index the partition's own sorted vocab (-1 = missing).
+    def _parsed_partition(self, partition):
+        base = os.path.join(self.parts_dir, partition["hash"])
+        meta = _read_json(base + ".json")
+        if meta is not None:
+            with np.load(base + ".npz") as z:
+                arrays = {k: z[k] for k in z.files}
+            skills = sp.csr_matrix((arrays.pop("skills_data"), arrays.pop("skills_indices"), arrays.pop("skills_indptr")),
+                                   shape=(partition["rows"], len(meta["vocab"]["skills"])))
+            return meta["vocab"], arrays, skills
+
+        df = pd.read_parquet(os.path.join(self.root, partition["file"]))
+        vocab, arrays = {}, {"numeric": df[NUMERIC_COLS].to_numpy(dtype=np.float64)}
+        for col in CODED_COLS:
+            codes, uniques = pd.factorize(df[col], sort=True)
+            vocab[col] = [str(u) for u in uniques]
+            arrays[col] = codes.astype(np.int32)
+
+        skills_lists = df["skills"].fillna("None").apply(parse_skills)
+        vocab["skills"] = sorted({sk for skills in skills_lists for sk in skills})
+        skill_index = {sk: i for i, sk in enumerate(vocab["skills"])}
+        indptr, indices = [0], []
+        for skills in skills_lists:
+            indices.extend(sorted({skill_index[sk] for sk in skills}))
+            indptr.append(len(indices))
+        skills = sp.csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr),
+                               shape=(len(df), len(vocab["skills"])))
+
+        os.makedirs(self.parts_dir, exist_ok=True)
+        np.savez(base + ".npz", skills_data=skills.data, skills_indices=skills.indices, skills_indptr=skills.indptr, **arrays)
+        _write_json(base + ".json", {"vocab": vocab})
+        return vocab, arrays, skills
+
+    # Combine partitions under the global vocab and fit fill values and the
+    # scaler; same result as preprocessing the concatenated rows at once
+    def _encode(self, parts, manifest):
+        n_rows = sum(p["rows"] for p in manifest["partitions"])
+        vocab, fill_values, columns = {}, {}, {}
+
+        numeric = np.vstack([arrays["numeric"] for _, arrays, _ in parts])
+        for j, col in enumerate(NUMERIC_COLS):
+            series = pd.Series(numeric[:, j])
+            fill_values[col] = float(series.mean())
+            numeric[:, j] = series.fillna(fill_values[col]).to_numpy()
+        scaler = StandardScaler()
+        numeric = scaler.fit_transform(numeric)
+
+        for col in CODED_COLS:
+            full_vocab = sorted({v for part_vocab, _, _ in parts for v in part_vocab[col]})
+            counts = np.zeros(len(full_vocab), dtype=np.int64)
+            codes = []
+            for part_vocab, arrays, _ in parts:
+                remap = np.append(np.searchsorted(full_vocab, part_vocab[col]), -1).astype(np.int64)
+                part_codes = remap[arrays[col]]
+                codes.append(part_codes)
+                counts += np.bincount(part_codes[part_codes >= 0], minlength=len(full_vocab))
+            codes = np.concatenate(codes)
+            if col == "job_role" and (codes < 0).any():
+                raise ValueError("Dataset has rows without a job_role")
+            # Same as fillna(mode()[0]): most frequent value, smallest on ties
+            mode = int(np.argmax(counts))
+            codes[codes < 0] = mode
+            if col != "job_role": fill_values[col] = full_vocab[mode]
+            vocab[col] = full_vocab
+            columns[col] = codes
+
+        internship = np.array([clean_internship(v) for v in vocab.pop("internship_experience")], dtype=np.float64)
+        columns["internship_experience"] = internship[columns["internship_experience"]]
+        y = columns.pop("job_role")
+
+        vocab["skills"] = sorted({sk for part_vocab, _, _ in parts for sk in part_vocab["skills"]})
+        skill_blocks = []
+        for part_vocab, _, skills in parts:
+            remap = np.searchsorted(vocab["skills"], part_vocab["skills"]).astype(np.int32)
+            skill_blocks.append(sp.csr_matrix((skills.data, remap[skills.indices], skills.indptr),
+                                              shape=(skills.shape[0], len(vocab["skills"]))))
+
+        base = np.column_stack([
+            columns["degree"], columns["specialization"], columns["certifications"],
+            numeric[:, 0], numeric[:, 1], columns["internship_experience"]
+        ])
+        # Zeros are never stored: to XGBoost an absent entry means missing
+        X = sp.hstack([sp.csr_matrix(base), sp.vstack(skill_blocks, format="csr")], format="csr")
+        X.eliminate_zeros()
+        assert X.shape[0] == n_rows
+
+        raw = self.load()
+        metadata = {
+            "degree_map": raw.groupby('degree')['specialization'].unique().apply(list).to_dict(),
+            "cert_map": raw.groupby('specialization')['certifications'].apply(get_unique_certs).to_dict(),
+            "skills": vocab["skills"],
+        }
+        return EncodedDataset(X, y, FEATURE_COLS + vocab["skills"], vocab, fill_values, scaler, metadata)
+
+    def _save_encoded(self, key, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        base = os.path.join(self.cache_dir, key)
+        sp.save_npz(base + ".npz", data.X)
+        np.savez(base + ".arrays.npz", y=data.y, scaler_mean=data.scaler.mean_,
+                 scaler_var=data.scaler.var_, scaler_scale=data.scaler.scale_)
+        _write_json(base + ".json", {
+            "feature_names": data.feature_names,
+            "vocab": data.vocab,
+            "fill_values": data.fill_values,
+            "n_samples_seen": int(data.scaler.n_samples_seen_),
+            "metadata": data.metadata,
+        })
+
+    def _load_encoded(self, key):
+        base = os.path.join(self.cache_dir, key)
+        state = _read_json(base + ".json")
+        if state is None: return None
+        X = sp.load_npz(base + ".npz").tocsr()
+        with np.load(base + ".arrays.npz") as z:
+            scaler = StandardScaler()
+            scaler.mean_, scaler.var_, scaler.scale_ = z["scaler_mean"], z["scaler_var"], z["scaler_scale"]
+            scaler.n_samples_seen_ = state["n_samples_seen"]
+            scaler.n_features_in_ = len(NUMERIC_COLS)
+            y = z["y"]
+        return EncodedDataset(X, y, state["feature_names"], state["vocab"], state["fill_values"], scaler, state["metadata"])
+
+    # Keep only the cache entries the current dataset can use
+    def _prune(self, manifest, key):
+        live = {p["hash"] for p in manifest["partitions"]}
+        for name in os.listdir(self.parts_dir):
+            if name.split(".")[0] not in live: os.remove(os.path.join(self.parts_dir, name))
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if os.path.isfile(path) and name.split(".")[0] != key: os.remove(path)
@@ -0,0 +1,179 @@
+import os
+import json
+import tempfile
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler
+
+from preprocessing import NUMERIC_COLS, CATEGORICAL_COLS, clean_internship, parse_skills, get_unique_certs
+from model_bundle import read_bundle, current_bundle_path, file_digest, dataset_fingerprint, publish_version
+from tree_compiler import compile_model, TREE_LIBRARY
+
+# Warm-start retraining (`train_model.py --incremental`): when the new CSV
+# is the previous one with rows appended and those rows only use known
+# labels, categories and skills, keep boosting the live booster on just the
+# new rows instead of rebuilding 300 trees from scratch.
+MIN_ROUNDS, MAX_ROUNDS = 10, 100
+
+
+def _fallback(reason):
+    print(f"Incremental training not possible: {reason}")
+    return None
+
+# The scaler moves when partial_fit sees new rows; shift the thresholds of
+# existing splits on scaled features so the old trees see identical inputs.
+def rescale_split_thresholds(booster, shifts):
+    model = json.loads(booster.save_raw("json"))
+    for tree in model["learner"]["gradient_booster"]["model"]["trees"]:
+        conditions = tree["split_conditions"]
+        for i, (feature, left) in enumerate(zip(tree["split_indices"], tree["left_children"])):
+            if left != -1 and feature in shifts:
+                old_mean, old_scale, new_mean, new_scale = shifts[feature]
+                raw = conditions[i] * old_scale + old_mean
+                # Hist cut points sit exactly on data values (whole years, 2dp CGPA);
+                # snap back to that value so inputs equal to it still go right
+                if abs(raw - round(raw, 4)) < 1e-6: raw = round(raw, 4)
+                conditions[i] = float(np.float32((raw - new_mean) / new_scale))
+    booster.load_model(bytearray(json.dumps(model).encode("utf-8")))
+
+def _merge_metadata(metadata, raw_new):
+    def contains(values, value):
+        if pd.isna(value): return any(pd.isna(v) for v in values)
+        return value in values
+
+    for degree, specs in raw_new.groupby('degree')['specialization'].unique().items():
+        existing = metadata["degree_map"].setdefault(degree, [])
+        for spec in specs:
+            if not contains(existing, spec): existing.append(spec)
+    for spec, certs in raw_new.groupby('specialization')['certifications'].apply(get_unique_certs).items():
+        metadata["cert_map"][spec] = sorted(set(metadata["cert_map"].get(spec, [])) | set(certs))
+    return metadata
+
+def train_incremental(dataset_path):
+    bundle_path = current_bundle_path()
+    if not bundle_path: return _fallback("no current model bundle")
+    header, arrays = read_bundle(bundle_path)
+    previous = header.get("dataset")
+    if not previous or "fill_values" not in header or "params" not in header:
+        return _fallback("current model was not trained with incremental support")
+
+    if os.path.getsize(dataset_path) <= previous["bytes"] or file_digest(dataset_path, previous["bytes"]) != previous["sha256"]:
+        return _fallback("dataset is not the previous dataset with rows appended")
+
+    # Parse only the appended bytes
+    with open(dataset_path, "rb") as f:
+        f.seek(previous["bytes"])
+        new_df = pd.read_csv(f, names=previous["columns"], header=None)
+    new_df.dropna(how='all', inplace=True)
+    if new_df.empty: return _fallback("no new rows")
+    raw_new = new_df.copy()
+    print(f"Loaded {len(new_df)} appended records.")
+
+    vocab, fill_values = header["vocab"], header["fill_values"]
+    try:
+        for col in NUMERIC_COLS:
+            new_df[col] = pd.to_numeric(new_df[col]).fillna(fill_values[col])
+    except (ValueError, TypeError) as e:
+        return _fallback(f"invalid numeric values ({e})")
+    for col in CATEGORICAL_COLS + ["internship_experience"]:
+        new_df[col] = new_df[col].fillna(fill_values[col])
+    skills_lists = new_df["skills"].fillna("None").apply(parse_skills)
+
+    # Anything outside the current vocabulary needs new columns/classes -> full retrain
+    unknown = set(new_df["job_role"].astype(str)) - set(vocab["job_role"])
+    if unknown: return _fallback(f"new job roles {sorted(unknown)[:5]}")
+    for col in CATEGORICAL_COLS:
+        unknown = set(new_df[col].astype(str)) - set(vocab[col])
+        if unknown: return _fallback(f"new {col} values {sorted(unknown)[:5]}")
+    unknown = {sk for skills in skills_lists for sk in skills} - set(vocab["skills"])
+    if unknown: return _fallback(f"new skills {sorted(unknown)[:5]}")
+
+    # Update scaler statistics with the new rows only
+    scaler = StandardScaler()
+    scaler.mean_ = np.array(arrays["scaler_mean"])
+    scaler.var_ = np.array(arrays["scaler_var"])
+    scaler.scale_ = np.array(arrays["scaler_scale"])
+    scaler.n_samples_seen_ = header["scaler"]["n_samples_seen"]
+    scaler.n_features_in_ = len(NUMERIC_COLS)
+    old_mean, old_scale = scaler.mean_.copy(), scaler.scale_.copy()
+    numeric = new_df[NUMERIC_COLS].to_numpy(dtype=float)
+    scaler.partial_fit(numeric)
+
+    # Encode the new rows straight into the model's feature layout
+    feature_names = header["feature_names"]
+    col_index = {name: i for i, name in enumerate(feature_names)}
+    X = np.zeros((len(new_df), len(feature_names)), dtype=np.float32)
+    scaled = scaler.transform(numeric)
+    for j, col in enumerate(NUMERIC_COLS):
+        X[:, col_index[col]] = scaled[:, j]
+    X[:, col_index["internship_experience"]] = new_df["internship_experience"].apply(clean_internship)
+    for col in CATEGORICAL_COLS:
+        index = {c: i for i, c in enumerate(vocab[col])}
+        X[:, col_index[col]] = new_df[col].astype(str).map(index)
+    for row, skills in enumerate(skills_lists):
+        for skill in skills:
+            X[row, col_index[skill]] = 1
+    label_index = {c: i for i, c in enumerate(vocab["job_role"])}
+    y = new_df["job_role"].astype(str).map(label_index).to_numpy()
+
+    booster = xgb.Booster()
+    booster.load_model(bytearray(arrays["booster"]))
+    rescale_split_thresholds(booster, {
+        col_index[col]: (old_mean[j], old_scale[j], scaler.mean_[j], scaler.scale_[j])
+        for j, col in enumerate(NUMERIC_COLS)
+    })
+
+    if header.get("sparse_input"):
+        X = sp.csr_matrix(X)
+    dnew = xgb.DMatrix(X, label=y, feature_names=feature_names)
+    acc_before = float((booster.predict(dnew).argmax(axis=1) == y).mean())
+
+    params = header["params"]
+    n_total = int(scaler.n_samples_seen_)
+    rounds = int(np.clip(round(params["n_estimators"] * len(new_df) / n_total), MIN_ROUNDS, MAX_ROUNDS))
+    print(f"⏳ Continuing boosting for {rounds} rounds on {len(new_df)} new rows...")
+    booster = xgb.train({
+        "objective": params["objective"],
+        "num_class": len(vocab["job_role"]),
+        "learning_rate": params["learning_rate"],
+        "max_depth": params["max_depth"],
+        "subsample": params["subsample"],
+        "colsample_bytree": params.get("colsample_bytree", 1.0),
+        "min_child_weight": params.get("min_child_weight", 1),
+        "seed": params["random_state"],
+    }, dnew, num_boost_round=rounds, xgb_model=booster)
+
+    acc_after = float((booster.predict(dnew).argmax(axis=1) == y).mean())
+    print(f"📊 Accuracy on new rows: {acc_before:.4f} -> {acc_after:.4f}")
+
+    parent_version = header.pop("version", None)
+    # The parent's pruned serving variant does not include the new trees
+    header.pop("serving", None)
+    header.update({
+        "scaler": {"features": NUMERIC_COLS, "n_samples_seen": n_total},
+        "metrics": {
+            "mode": "incremental",
+            "parent_version": parent_version,
+            "new_rows": len(new_df),
+            "boost_rounds": rounds,
+            "new_rows_accuracy_before": acc_before,
+            "new_rows_accuracy_after": acc_after,
+        },
+        "metadata": _merge_metadata(header["metadata"], raw_new),
+        "dataset": {**dataset_fingerprint(dataset_path), "columns": previous["columns"]},
+    })
+    arrays = {
+        "booster": np.frombuffer(bytes(booster.save_raw("ubj")), dtype=np.uint8),
+        "scaler_mean": scaler.mean_,
+        "scaler_scale": scaler.scale_,
+        "scaler_var": scaler.var_,
+    }
+    with tempfile.TemporaryDirectory() as build_dir:
+        tree_arrays, library = compile_model(booster, X, booster.predict(dnew), bool(header.get("sparse_input")), build_dir)
+        arrays.update(tree_arrays)
+        version = publish_version(header, arrays, {TREE_LIBRARY: library} if library else None)
+    print(f"All artifacts saved successfully! Model version: {version}")
+    return version
@@ -0,0 +1,120 @@
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+
+import numpy as np
+
+# Single-file model bundle, also read by backend/model_registry.py (which
+# imports this module, so the format is only defined here):
+#   MAGIC | u64 header length | JSON header | arrays, each 64-byte aligned
+# The header holds vocabularies, metadata and an index of the arrays
+# (booster bytes, scaler stats) so the server can memory-map the file
+# instead of unpickling anything.
+BUNDLE_FILE = "model.bundle"
+BUNDLE_MAGIC = b"E2JBNDL1"
+BUNDLE_ALIGN = 64
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+
+
+def _aligned(n):
+    return (n + BUNDLE_ALIGN - 1) // BUNDLE_ALIGN * BUNDLE_ALIGN
+
+def write_bundle(path, header, arrays):
+    index, offset = {}, 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        arrays[name] = arr
+        index[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset, "nbytes": arr.nbytes}
+        offset = _aligned(offset + arr.nbytes)
+    header_bytes = json.dumps({**header, "arrays": index}).encode("utf-8")
+    data_start = _aligned(len(BUNDLE_MAGIC) + 8 + len(header_bytes))
+
+    with open(path, "wb") as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for name, arr in arrays.items():
+            f.seek(data_start + index[name]["offset"])
+            f.write(arr.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+# Arrays come back as read-only views on one np.memmap, so every server
+# worker maps the same page-cache pages instead of holding private copies
+def read_bundle(path):
+    buf = np.memmap(path, dtype=np.uint8, mode="r")
+    if bytes(buf[:len(BUNDLE_MAGIC)]) != BUNDLE_MAGIC:
+        raise ValueError(f"{path} is not a model bundle")
+    header_len = int.from_bytes(bytes(buf[8:16]), "little")
+    header = json.loads(bytes(buf[16:16 + header_len]))
+    data_start = _aligned(16 + header_len)
+
+    arrays = {}
+    for name, spec in header.pop("arrays").items():
+        start = data_start + spec["offset"]
+        arrays[name] = buf[start:start + spec["nbytes"]].view(np.dtype(spec["dtype"])).reshape(spec["shape"])
+    return header, arrays
+
+
+# Dataset fingerprint: lets the next run tell whether a new CSV only appends rows
+def file_digest(path, limit=None):
+    h, remaining = hashlib.sha256(), limit
+    with open(path, "rb") as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not chunk: break
+            h.update(chunk)
+            if remaining is not None: remaining -= len(chunk)
+    return h.hexdigest()
+
+def dataset_fingerprint(path):
+    return {"bytes": os.path.getsize(path), "sha256": file_digest(path)}
+
+
+def current_bundle_path():
+    try:
+        with open(CURRENT_FILE) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(VERSIONS_DIR, version, BUNDLE_FILE)
+    return path if os.path.exists(path) else None
+
+# Claims a version name: the timestamp, with _2, _3, ... appended when an
+# earlier publish in the same second has it. Creating the staging directory
+# is the claim, so two publishers never share one; the suffix keeps names
+# in publish order (the registry sorts them).
+def _reserve_version():
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    for n in range(1, 1000):
+        version = stamp if n == 1 else f"{stamp}_{n}"
+        staging_dir = os.path.join(VERSIONS_DIR, f".staging_{version}")
+        try:
+            os.mkdir(staging_dir)
+        except FileExistsError:
+            continue
+        if not os.path.exists(os.path.join(VERSIONS_DIR, version)):
+            return version, staging_dir
+        os.rmdir(staging_dir)
+    raise RuntimeError(f"No free version name for {stamp}")
+
+# Each run writes a new immutable version directory; the server only
+# sees it once the directory is complete and CURRENT points at it.
+def publish_version(header, arrays, extra_files=None):
+    version, staging_dir = _reserve_version()
+    version_dir = os.path.join(VERSIONS_DIR, version)
+    try:
+        write_bundle(os.path.join(staging_dir, BUNDLE_FILE), {**header, "version": version}, arrays)
+        for name, path in (extra_files or {}).items():
+            shutil.copy2(path, os.path.join(staging_dir, name))
+        os.rename(staging_dir, version_dir)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    with open(".CURRENT.tmp", "w") as f: f.write(version)
+    os.replace(".CURRENT.tmp", CURRENT_FILE)
+    return version
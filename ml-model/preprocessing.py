@@ -0,0 +1,33 @@
+import os
+
+import pandas as pd
+
+# Cleaning helpers shared by the full (train_model.py) and incremental trainers
+STOP_WORDS = {"communication", "problem solving", "critical thinking", "teamwork", "leadership"}
+NUMERIC_COLS = ["cgpa", "graduation_year"]
+CATEGORICAL_COLS = ["degree", "specialization", "certifications"]
+
+# Standardize Internship (Yes/No -> 1/0)
+def clean_internship(val):
+    return 1 if str(val).lower() in ['true', '1', 'yes'] else 0
+
+def parse_skills(s):
+    if pd.isna(s) or s == "None" or s == "":
+        return []
+    skills = [skill.strip() for skill in str(s).split(",")]
+    valid_skills = [sk for sk in skills if sk.lower() not in STOP_WORDS]
+    return valid_skills
+
+def get_unique_certs(series):
+    certs = set(str(x).strip() for x in series.unique())
+    for bad_val in ["None", "nan", "NaN", "[object Object]"]:
+        if bad_val in certs: certs.remove(bad_val)
+    return sorted(list(certs))
+
+# Uploads are also written as Parquet (backend/dataset_ingest.py) so training
+# skips CSV parsing; the copy is only trusted if it is not older than the CSV
+def load_dataset(csv_path):
+    parquet_path = os.path.splitext(csv_path)[0] + ".parquet"
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+        return pd.read_parquet(parquet_path)
+    return pd.read_csv(csv_path)
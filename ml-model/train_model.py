@@ -1,104 +1,89 @@
-import pandas as pd
-import pickle
+import numpy as np
+import argparse
+import tempfile
 import warnings
-import os
-import shutil
-from datetime import datetime
-from sklearn.preprocessing import LabelEncoder, StandardScaler, MultiLabelBinarizer
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, f1_score
 from xgboost import XGBClassifier 
+from preprocessing import NUMERIC_COLS
+from model_bundle import publish_version, dataset_fingerprint
+from dataset_store import DatasetStore
+from tuning import load_best_params
+from tree_compiler import compile_model, build_serving_variant, TREE_LIBRARY, SERVING_SAMPLE_ROWS
 
 warnings.filterwarnings("ignore")
 
-# 1. Load Raw Dataset
+parser = argparse.ArgumentParser(description="Train the Edu2Job career model")
+parser.add_argument("--incremental", action="store_true",
+                    help="Continue boosting the current model on appended rows; falls back to a full retrain when that is not possible")
+parser.add_argument("--tune", action="store_true",
+                    help="Run the cross-validated hyperparameter search (tuning.py) instead of training")
+parser.add_argument("--folds", type=int, default=5, help="CV folds for --tune")
+parser.add_argument("--max-candidates", type=int, default=24, help="Parameter combinations sampled for --tune")
+parser.add_argument("--workers", type=int, default=None, help="Worker processes for --tune (default: one per CPU)")
+parser.add_argument("--threads-per-worker", type=int, default=1, help="XGBoost threads in each --tune worker")
+parser.add_argument("--serving", choices=["int8", "float16"], default=None,
+                    help="Also ship a pruned model with quantized leaves for single-row serving")
+args = parser.parse_args()
+
+XGB_PARAMS = {
+    "objective": "multi:softprob",
+    "n_estimators": 300,
+    "learning_rate": 0.05,
+    "max_depth": 6,
+    "subsample": 0.8,
+    "random_state": 42,
+}
+
+if args.incremental:
+    from incremental import train_incremental
+    if train_incremental("career_dataset.csv"):
+        exit(0)
+    print("Falling back to a full retrain.")
+
+# 1. Load Dataset (Parquet partitions + cached CSR features, see dataset_store.py)
 try:
-    df = pd.read_csv("career_dataset.csv")
-    print(f"Loaded dataset with {len(df)} records.")
+    dataset_info = dataset_fingerprint("career_dataset.csv")
+    store = DatasetStore()
+    manifest = store.sync("career_dataset.csv")
+    print(f"Loaded dataset with {sum(p['rows'] for p in manifest['partitions'])} records.")
 except FileNotFoundError:
     print("Error: career_dataset.csv not found!")
     exit(1)
 
-df.dropna(how='all', inplace=True) 
+# 2. Preprocessing (encoding, scaling, skills parsing) - skipped when cached
+data = store.features()
+X, y_encoded = data.X, data.y
+target_names = data.vocab["job_role"]
 
-# 2. Preprocessing & Cleaning
-X = df.drop("job_role", axis=1)
-y = df["job_role"]
+if args.tune:
+    from tuning import tune
+    tune(data, folds=args.folds, max_candidates=args.max_candidates, workers=args.workers,
+         threads_per_worker=args.threads_per_worker, dataset_key=store.dataset_key(manifest))
+    exit(0)
 
-# Fill missing numericals
-for col in ["cgpa", "graduation_year"]:
-    mean_val = X[col].mean()
-    X[col] = X[col].fillna(mean_val)
+# Use the configuration picked by the last `--tune` run on this dataset, if any
+tuned = load_best_params(store.dataset_key(manifest))
+if tuned:
+    XGB_PARAMS.update(tuned["params"])
+    print(f"Using tuned parameters from {tuned['created_at']}: {tuned['params']}")
 
-# Fill missing categoricals
-for col in ["degree", "specialization", "certifications", "internship_experience"]:
-    mode_val = X[col].mode()[0]
-    X[col] = X[col].fillna(mode_val)
-
-# Standardize Internship (Yes/No -> 1/0)
-def clean_internship(val):
-    return 1 if str(val).lower() in ['true', '1', 'yes'] else 0
-
-X["internship_experience"] = X["internship_experience"].apply(clean_internship)
-
-# Scale Numericals
-scaler = StandardScaler()
-X[["cgpa", "graduation_year"]] = scaler.fit_transform(X[["cgpa", "graduation_year"]])
-
-# 3. Intelligent Skills Parsing (Noise Reduction)
-X["skills"] = X["skills"].fillna("None")
-STOP_WORDS = {"communication", "problem solving", "critical thinking", "teamwork", "leadership"}
-
-def parse_skills(s):
-    if pd.isna(s) or s == "None" or s == "":
-        return []
-    skills = [skill.strip() for skill in str(s).split(",")]
-    valid_skills = [sk for sk in skills if sk.lower() not in STOP_WORDS]
-    return valid_skills
-
-# Apply parsing
-cleaned_skills = X["skills"].apply(parse_skills)
-
-# Create MultiLabelBinarizer
-mlb = MultiLabelBinarizer()
-skills_encoded = pd.DataFrame(mlb.fit_transform(cleaned_skills), columns=mlb.classes_, index=X.index)
-
-# Drop raw skills and join encoded ones
-X = pd.concat([X.drop("skills", axis=1), skills_encoded], axis=1)
-
-# 4. Encode Categorical Features
-label_encoders = {}
-target_encoder = LabelEncoder()
-y_encoded = target_encoder.fit_transform(y)
-label_encoders["job_role"] = target_encoder
-
-# Categorical columns to encode
-cat_cols = ["degree", "specialization", "certifications"]
-for col in cat_cols:
-    le = LabelEncoder()
-    X[col] = le.fit_transform(X[col].astype(str))
-    label_encoders[col] = le
-
-# 5. Split Data
+# 3. Split Data
 X_train, X_test, y_train, y_test = train_test_split(
     X, y_encoded, test_size=0.2, stratify=y_encoded, random_state=42
 )
+# The CSR goes straight to XGBoost. Absent entries (unset skills, zero
+# codes) are read as missing, so the bundle is flagged `sparse_input` and
+# the server sends CSR rows built the same way.
 
-# 6. Train XGBoost Model 
+# 4. Train XGBoost Model 
 print("⏳ Training XGBoost Model...")
-model = XGBClassifier(
-    objective='multi:softprob',  
-    n_estimators=300,            
-    learning_rate=0.05,          
-    max_depth=6,               
-    subsample=0.8,               
-    random_state=42,
-    n_jobs=-1                    
-)
+model = XGBClassifier(**XGB_PARAMS, n_jobs=-1)
 
 model.fit(X_train, y_train)
+model.get_booster().feature_names = data.feature_names
 
-# 7. Evaluation
+# 5. Evaluation
 train_preds = model.predict(X_train)
 test_preds = model.predict(X_test)
 
@@ -109,65 +94,57 @@ print(f"\n📊 Training Accuracy: {train_acc:.4f}")
 print(f"🚀 Test Accuracy:     {test_acc:.4f}")
 print(f"⚖️ Weighted F1 Score: {weighted_f1:.4f}")
 print("\n🔍 Classification Report:")
-all_labels = range(len(target_encoder.classes_))
+all_labels = range(len(target_names))
 report = classification_report(
     y_test, 
     test_preds,
     labels=all_labels, 
-    target_names=target_encoder.classes_,
+    target_names=target_names,
     zero_division=0 
 )
 print(report)
 
 
 try:
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_dir = os.path.join("backups", timestamp) 
-    # Create backup directory if it doesn't exist
-    if not os.path.exists("backups"):
-        os.makedirs("backups")      
-    # Check if artifacts already exist and move them to backup folder
-    artifacts_to_backup = [
-        "career_model.pkl", "label_encoders.pkl", "scaler.pkl", 
-        "skills_mlb.pkl", "feature_names.pkl", "metadata.pkl"
-    ]
-    
-    # Only create a specific timestamp folder if we actually find files to backup
-    files_found = [f for f in artifacts_to_backup if os.path.exists(f)]
-    
-    if files_found:
-        os.makedirs(backup_dir, exist_ok=True)
-        print(f"📂 Backing up existing models to: {backup_dir}")
-        for filename in files_found:
-            shutil.copy(filename, os.path.join(backup_dir, filename))
-
-    # Save new artifacts
-    with open("career_model.pkl", "wb") as f: pickle.dump(model, f)
-    with open("label_encoders.pkl", "wb") as f: pickle.dump(label_encoders, f)
-    with open("scaler.pkl", "wb") as f: pickle.dump(scaler, f)
-    with open("skills_mlb.pkl", "wb") as f: pickle.dump(mlb, f)
-    with open("feature_names.pkl", "wb") as f: pickle.dump(list(X.columns), f)
-    with open("feature_selector.pkl", "wb") as f: pickle.dump(None, f)
-    
-    # Metadata Generation
-    raw_df = pd.read_csv("career_dataset.csv")
-    degree_map = raw_df.groupby('degree')['specialization'].unique().apply(list).to_dict()
-    
-    def get_unique_certs(series):
-        certs = set(str(x).strip() for x in series.unique())
-        for bad_val in ["None", "nan", "NaN", "[object Object]"]:
-            if bad_val in certs: certs.remove(bad_val)
-        return sorted(list(certs))
-        
-    cert_map = raw_df.groupby('specialization')['certifications'].apply(get_unique_certs).to_dict()
-    metadata = {
-        "degree_map": degree_map,
-        "cert_map": cert_map,
-        "skills": list(mlb.classes_)
+    # Save new artifacts as one bundle file
+    header = {
+        "format": 1,
+        "feature_names": data.feature_names,
+        "sparse_input": True,
+        "vocab": data.vocab,
+        "scaler": {"features": NUMERIC_COLS, "n_samples_seen": int(data.scaler.n_samples_seen_)},
+        "metrics": {
+            "mode": "full", "train_accuracy": train_acc, "test_accuracy": test_acc, "weighted_f1": weighted_f1,
+            "cv": tuned["cv"] if tuned else None,
+        },
+        "metadata": data.metadata,
+        # Needed by `--incremental` to continue from this version
+        "dataset": {**dataset_info, "columns": manifest["source"]["columns"]},
+        "fill_values": data.fill_values,
+        "params": XGB_PARAMS,
     }
-    
-    with open("metadata.pkl", "wb") as f: pickle.dump(metadata, f)     
-    print("All artifacts saved successfully!")
+    arrays = {
+        "booster": np.frombuffer(bytes(model.get_booster().save_raw("ubj")), dtype=np.uint8),
+        "scaler_mean": data.scaler.mean_,
+        "scaler_scale": data.scaler.scale_,
+        "scaler_var": data.scaler.var_,
+    }
+    with tempfile.TemporaryDirectory() as build_dir:
+        # Flat trees + native evaluator for single-row serving (tree_compiler.py)
+        test_proba = model.predict_proba(X_test)
+        tree_arrays, library = compile_model(model.get_booster(), X_test, test_proba, True, build_dir)
+        arrays.update(tree_arrays)
+        if args.serving and library:
+            serving_arrays, header["serving"] = build_serving_variant(
+                model.get_booster(), library, tree_arrays, args.serving,
+                np.bincount(y_train, minlength=len(target_names)), X_train[:SERVING_SAMPLE_ROWS],
+                X_test, np.asarray(y_test), test_proba, target_names, True
+            )
+            arrays.update(serving_arrays)
+            header["metrics"]["serving"] = header["serving"]
+        version = publish_version(header, arrays, {TREE_LIBRARY: library} if library else None)
+    print(f"All artifacts saved successfully! Model version: {version}")
     
 except Exception as e:
-    print(f"Error saving artifacts: {e}")
\ No newline at end of file
+    print(f"Error saving artifacts: {e}")
+    exit(1)
\ No newline at end of file
@@ -0,0 +1,268 @@
+import os
+import json
+import ctypes
+import subprocess
+
+import numpy as np
+import scipy.sparse as sp
+
+# Compiled serving backend: flattens the booster's trees into node arrays
+# (stored in the model bundle) and builds tree_eval.c into a shared
+# library that ships in the version directory. backend/compiled_model.py
+# uses it in place of XGBoost when it is present. A library is only
+# shipped if it reproduces XGBoost's probabilities on the given rows.
+TREE_LIBRARY = "tree_eval.so"
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tree_eval.c")
+PARITY_TOLERANCE = 1e-5
+DEFAULT_LEFT = np.uint32(0x80000000)
+
+
+def _load_trees(booster):
+    return json.loads(booster.save_raw("json"))["learner"]["gradient_booster"]["model"]
+
+# Nodes are rows of int32 [left, right, feature | DEFAULT_LEFT, value bits],
+# matching node_t in tree_eval.c; leaves point at themselves
+def flatten_booster(booster):
+    model = _load_trees(booster)
+    roots, depths, nodes, offset = [], [], [], 0
+    for tree in model["trees"]:
+        left = np.array(tree["left_children"], dtype=np.int64)
+        right = np.array(tree["right_children"], dtype=np.int64)
+        leaf = left == -1
+        own = np.arange(len(left)) + offset
+        block = np.empty((len(left), 4), dtype=np.int32)
+        block[:, 0] = np.where(leaf, own, left + offset)
+        block[:, 1] = np.where(leaf, own, right + offset)
+        feature = np.array(tree["split_indices"], dtype=np.uint32)
+        feature[np.array(tree["default_left"], dtype=bool)] |= DEFAULT_LEFT
+        block[:, 2] = np.where(leaf, 0, feature.view(np.int32))
+        # Split threshold, or for a leaf its weight (both kept in split_conditions)
+        block[:, 3] = np.array(tree["split_conditions"], dtype=np.float32).view(np.int32)
+
+        # Children always come after their parent
+        depth = np.zeros(len(left), dtype=np.int64)
+        for k in np.flatnonzero(~leaf):
+            depth[left[k]] = depth[right[k]] = depth[k] + 1
+        roots.append(offset)
+        depths.append(depth.max())
+        nodes.append(block)
+        offset += len(left)
+
+    return {
+        "tree_root": np.array(roots, dtype=np.int32),
+        "tree_class": np.array(model["tree_info"], dtype=np.int32),
+        "tree_depth": np.array(depths, dtype=np.uint8),
+        "tree_nodes": np.concatenate(nodes),
+    }
+
+# The library ships with the model and may be loaded on a different CPU
+# than the training host's, so it is built for the compiler's baseline
+# target; an instruction the serving CPU lacks would kill the worker
+# (SIGILL) where warm_up cannot catch it. TREE_EVAL_CFLAGS adds flags
+# (e.g. -march=x86-64-v3) when every serving host is known to support them.
+TREE_EVAL_CFLAGS = os.getenv("TREE_EVAL_CFLAGS", "").split()
+
+def build_library(out_dir):
+    cc = os.getenv("CC", "cc")
+    path = os.path.join(out_dir, TREE_LIBRARY)
+    try:
+        subprocess.run([cc, "-O3", *TREE_EVAL_CFLAGS, "-shared", "-fPIC", "-o", path, SOURCE, "-lm"],
+                       check=True, capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Compiled tree evaluator not built: {getattr(e, 'stderr', None) or e}")
+        return None
+    return path
+
+def evaluate(library_path, arrays, X, n_classes, sparse_input):
+    if sp.issparse(X):
+        X = X.tocsr()
+        dense = np.full(X.shape, np.nan if sparse_input else 0.0, dtype=np.float32)
+        dense[np.repeat(np.arange(X.shape[0]), np.diff(X.indptr)), X.indices] = X.data
+    else:
+        dense = np.ascontiguousarray(X, dtype=np.float32)
+    lib = ctypes.CDLL(library_path)
+    lib.predict_proba.restype = None
+    out = np.empty((dense.shape[0], n_classes), dtype=np.float32)
+    a = {k: np.ascontiguousarray(v) for k, v in arrays.items()}
+    lib.predict_proba(
+        ctypes.c_void_p(dense.ctypes.data), ctypes.c_int64(dense.shape[0]), ctypes.c_int64(dense.shape[1]),
+        ctypes.c_void_p(a["tree_root"].ctypes.data), ctypes.c_void_p(a["tree_class"].ctypes.data),
+        ctypes.c_void_p(a["tree_depth"].ctypes.data), ctypes.c_int64(len(a["tree_root"])), ctypes.c_int64(n_classes),
+        ctypes.c_void_p(a["tree_nodes"].ctypes.data), ctypes.c_void_p(out.ctypes.data)
+    )
+    return out
+
+# Returns the node arrays for the bundle and the library to ship (or None)
+def compile_model(booster, X_check, expected, sparse_input, build_dir):
+    arrays = flatten_booster(booster)
+    library = build_library(build_dir)
+    if library is None:
+        return arrays, None
+
+    got = evaluate(library, arrays, X_check, expected.shape[1], sparse_input)
+    diff = float(np.abs(got - expected).max())
+    agree = float((got.argmax(axis=1) == expected.argmax(axis=1)).mean())
+    print(f"🔧 Compiled tree evaluator: {len(arrays['tree_root'])} trees, parity on {len(expected)} rows: "
+          f"max |p - p_xgb| = {diff:.2e}, top-1 agreement {agree:.4f}")
+    if diff > PARITY_TOLERANCE:
+        print("Compiled evaluator does not match XGBoost; serving will use XGBoost.")
+        return arrays, None
+    return arrays, library
+
+
+# Serving variant (`train_model.py --serving int8|float16`): a smaller,
+# approximate copy of the trees stored next to the exact ones. Classes
+# with too little training support are dropped along with their trees,
+# the least important trees are pruned for as long as top-1 and top-3
+# predictions on a training sample still agree with the full model, and
+# leaf weights are quantized. The accuracy report goes into the header.
+SERVING_MIN_SUPPORT = int(os.getenv("SERVING_MIN_SUPPORT", 1))
+SERVING_MIN_AGREEMENT = float(os.getenv("SERVING_MIN_AGREEMENT", 0.99))
+SERVING_SAMPLE_ROWS = 1000
+SERVING_ARRAYS = ("serving_root", "serving_class", "serving_nodes", "serving_leaves",
+                  "serving_scale", "serving_class_mask")
+LEAF_BITS = {"int8": 8, "float16": 16}
+
+
+def _top3(scores):
+    top = np.argpartition(-scores, 3, axis=1)[:, :3]
+    return np.sort(top, axis=1)
+
+def _agreement(scores, ref_top1, ref_top3):
+    top1 = float((scores.argmax(axis=1) == ref_top1).mean())
+    top3 = float((_top3(scores) == ref_top3).all(axis=1).mean())
+    return top1, top3
+
+# Leaf weight each tree contributes to each sample row, shape (rows, trees)
+def _contributions(booster, trees, X):
+    import xgboost as xgb
+    leaf = booster.predict(xgb.DMatrix(X, feature_names=booster.feature_names), pred_leaf=True).astype(np.int64)
+    sizes = np.array([len(t["left_children"]) for t in trees])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    weights = np.concatenate([np.array(t["split_conditions"], dtype=np.float64) for t in trees])
+    return weights[offsets[None, :] + leaf]
+
+def select_trees(booster, trees, tree_class, class_mask, X_sample):
+    contrib = _contributions(booster, trees, X_sample)
+    onehot = (tree_class[:, None] == np.arange(len(class_mask))[None, :]).astype(np.float64)
+    full = contrib @ onehot
+    ref_top1, ref_top3 = full.argmax(axis=1), _top3(full)
+
+    # Trees of dropped classes only move those classes' margins
+    full[:, ~class_mask] = -np.inf
+    candidates = np.flatnonzero(class_mask[tree_class])
+    candidates = candidates[np.argsort(np.abs(contrib[:, candidates]).mean(axis=0), kind="stable")]
+
+    def agreement(k):
+        removed = candidates[:k]
+        return min(_agreement(full - contrib[:, removed] @ onehot[removed], ref_top1, ref_top3))
+
+    # Largest k least-important trees that can go; agreement falls
+    # (close to) monotonically with k
+    lo, hi = 0, len(candidates)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if agreement(mid) >= SERVING_MIN_AGREEMENT:
+            lo = mid
+        else:
+            hi = mid - 1
+    return np.sort(candidates[lo:])
+
+# Split nodes only, as rows like tree_nodes; a child < 0 is leaf ~i
+def compact_trees(trees, keep, leaf_dtype):
+    roots, nodes, leaves, scales, n_nodes, n_leaves = [], [], [], [], 0, 0
+    for t in keep:
+        tree = trees[t]
+        left = np.array(tree["left_children"], dtype=np.int64)
+        right = np.array(tree["right_children"], dtype=np.int64)
+        is_leaf = left == -1
+        weights = np.array(tree["split_conditions"], dtype=np.float32)
+        # Position of each node in the split or leaf arrays of this version
+        ref = np.empty(len(left), dtype=np.int64)
+        ref[~is_leaf] = n_nodes + np.arange((~is_leaf).sum())
+        ref[is_leaf] = ~(n_leaves + np.arange(is_leaf.sum()))
+
+        split = np.flatnonzero(~is_leaf)
+        block = np.empty((len(split), 4), dtype=np.int32)
+        block[:, 0] = ref[left[split]]
+        block[:, 1] = ref[right[split]]
+        feature = np.array(tree["split_indices"], dtype=np.uint32)[split]
+        feature[np.array(tree["default_left"], dtype=bool)[split]] |= DEFAULT_LEFT
+        block[:, 2] = feature.view(np.int32)
+        block[:, 3] = weights[split].view(np.int32)
+
+        w = weights[is_leaf]
+        if leaf_dtype == "int8":
+            scale = float(np.abs(w).max()) / 127 or 1.0
+            leaves.append(np.round(w / scale).astype(np.int8))
+        else:
+            scale = 1.0
+            leaves.append(w.astype(np.float16))
+        roots.append(ref[0])
+        nodes.append(block)
+        scales.append(scale)
+        n_nodes += len(split)
+        n_leaves += len(w)
+
+    return {
+        "serving_root": np.array(roots, dtype=np.int32),
+        "serving_nodes": np.concatenate(nodes) if n_nodes else np.zeros((0, 4), dtype=np.int32),
+        "serving_leaves": np.concatenate(leaves),
+        "serving_scale": np.array(scales, dtype=np.float32),
+    }
+
+def evaluate_compact(library_path, arrays, X, leaf_bits, sparse_input):
+    if sp.issparse(X):
+        X = X.tocsr()
+        dense = np.full(X.shape, np.nan if sparse_input else 0.0, dtype=np.float32)
+        dense[np.repeat(np.arange(X.shape[0]), np.diff(X.indptr)), X.indices] = X.data
+    else:
+        dense = np.ascontiguousarray(X, dtype=np.float32)
+    lib = ctypes.CDLL(library_path)
+    lib.predict_proba_compact.restype = None
+    a = {k: np.ascontiguousarray(v) for k, v in arrays.items()}
+    n_classes = len(a["serving_class_mask"])
+    out = np.empty((dense.shape[0], n_classes), dtype=np.float32)
+    lib.predict_proba_compact(
+        ctypes.c_void_p(dense.ctypes.data), ctypes.c_int64(dense.shape[0]), ctypes.c_int64(dense.shape[1]),
+        ctypes.c_void_p(a["serving_root"].ctypes.data), ctypes.c_void_p(a["serving_class"].ctypes.data),
+        ctypes.c_int64(len(a["serving_root"])), ctypes.c_int64(n_classes),
+        ctypes.c_void_p(a["serving_class_mask"].ctypes.data), ctypes.c_void_p(a["serving_nodes"].ctypes.data),
+        ctypes.c_void_p(a["serving_leaves"].ctypes.data), ctypes.c_int64(leaf_bits),
+        ctypes.c_void_p(a["serving_scale"].ctypes.data), ctypes.c_void_p(out.ctypes.data)
+    )
+    return out
+
+# Returns the serving arrays for the bundle and the report for its header
+def build_serving_variant(booster, library, full_arrays, leaf_dtype, class_support,
+                          X_sample, X_test, y_test, expected, classes, sparse_input):
+    trees = _load_trees(booster)["trees"]
+    tree_class = full_arrays["tree_class"].astype(np.int64)
+    class_mask = np.asarray(class_support) >= SERVING_MIN_SUPPORT
+
+    keep = select_trees(booster, trees, tree_class, class_mask, X_sample)
+    arrays = compact_trees(trees, keep, leaf_dtype)
+    arrays["serving_class"] = tree_class[keep].astype(np.int32)
+    arrays["serving_class_mask"] = class_mask.astype(np.uint8)
+
+    got = evaluate_compact(library, arrays, X_test, LEAF_BITS[leaf_dtype], sparse_input)
+    top1, top3 = _agreement(got, expected.argmax(axis=1), _top3(expected))
+    report = {
+        "leaf_dtype": leaf_dtype,
+        "trees": int(len(keep)),
+        "trees_full": int(len(tree_class)),
+        "classes_dropped": [classes[c] for c in np.flatnonzero(~class_mask)],
+        "accuracy": float((got.argmax(axis=1) == y_test).mean()),
+        "accuracy_full": float((expected.argmax(axis=1) == y_test).mean()),
+        "top1_agreement": top1,
+        "top3_agreement": top3,
+        "max_abs_diff": float(np.abs(got - expected).max()),
+        "bytes": int(sum(arrays[name].nbytes for name in SERVING_ARRAYS)),
+        "bytes_full": int(sum(full_arrays[name].nbytes for name in full_arrays)),
+    }
+    print(f"📉 Serving variant ({leaf_dtype}): {report['trees']}/{report['trees_full']} trees, "
+          f"{len(report['classes_dropped'])} classes dropped, {report['bytes'] / 1e6:.2f} MB vs "
+          f"{report['bytes_full'] / 1e6:.2f} MB")
+    print(f"   accuracy {report['accuracy']:.4f} (full {report['accuracy_full']:.4f}), "
+          f"top-1 agreement {top1:.4f}, top-3 agreement {top3:.4f} on {len(y_test)} test rows")
+    return arrays, report
@@ -0,0 +1,100 @@
+/*
+ * Flat-array evaluator for multi:softprob boosters, built into each model
+ * version by tree_compiler.py and loaded by backend/compiled_model.py.
+ *
+ * Nodes of all trees are laid out back to back as 16-byte records. Leaves
+ * point back at themselves and hold their weight in value, so a tree is
+ * walked for exactly tree_depth[t] steps with no leaf test in the loop.
+ * A split sends x < value left; rows are dense float32 with NaN for
+ * missing, which follows the node's default direction like XGBoost.
+ */
+#include <math.h>
+#include <stdint.h>
+
+#define DEFAULT_LEFT 0x80000000u
+
+typedef struct {
+    int32_t left;
+    int32_t right;
+    uint32_t feature;   /* split feature, DEFAULT_LEFT bit = missing goes left */
+    float value;        /* split threshold, or leaf weight */
+} node_t;
+
+void predict_proba(
+    const float *X, int64_t n_rows, int64_t n_features,
+    const int32_t *tree_root, const int32_t *tree_class, const uint8_t *tree_depth,
+    int64_t n_trees, int64_t n_classes, const node_t *nodes, float *out)
+{
+    double margin[n_classes];
+    for (int64_t r = 0; r < n_rows; r++) {
+        const float *x = X + r * n_features;
+        for (int64_t c = 0; c < n_classes; c++) margin[c] = 0.0;
+
+        for (int64_t t = 0; t < n_trees; t++) {
+            int32_t i = tree_root[t];
+            for (int d = tree_depth[t]; d > 0; d--) {
+                const node_t *n = nodes + i;
+                float v = x[n->feature & ~DEFAULT_LEFT];
+                int go_left = (v < n->value) | (isnan(v) & ((n->feature & DEFAULT_LEFT) != 0));
+                i = go_left ? n->left : n->right;
+            }
+            margin[tree_class[t]] += nodes[i].value;
+        }
+
+        double max = margin[0], sum = 0.0;
+        for (int64_t c = 1; c < n_classes; c++) if (margin[c] > max) max = margin[c];
+        for (int64_t c = 0; c < n_classes; c++) sum += (margin[c] = exp(margin[c] - max));
+        for (int64_t c = 0; c < n_classes; c++) out[r * n_classes + c] = (float)(margin[c] / sum);
+    }
+}
+
+/*
+ * Compact layout for the quantized serving variant (tree_compiler.py
+ * build_serving_variant): only split nodes are stored, a child index < 0
+ * is leaf ~i, and leaf weights are int8 (times a per-tree scale) or
+ * float16. Classes with class_mask[c] == 0 were dropped and get 0.
+ */
+static inline float half_to_float(uint16_t h)
+{
+    uint32_t sign = (uint32_t)(h & 0x8000) << 16, exp = (h >> 10) & 0x1f, mant = h & 0x3ff;
+    union { uint32_t u; float f; } v;
+    if (exp == 0) {
+        v.f = ldexpf((float)mant, -24);
+        v.u |= sign;
+        return v.f;
+    }
+    if (exp == 31) v.u = sign | 0x7f800000u | (mant << 13);
+    else v.u = sign | ((exp + 112) << 23) | (mant << 13);
+    return v.f;
+}
+
+void predict_proba_compact(
+    const float *X, int64_t n_rows, int64_t n_features,
+    const int32_t *tree_root, const int32_t *tree_class, int64_t n_trees, int64_t n_classes,
+    const uint8_t *class_mask, const node_t *nodes,
+    const void *leaves, int64_t leaf_bits, const float *tree_scale, float *out)
+{
+    double margin[n_classes];
+    for (int64_t r = 0; r < n_rows; r++) {
+        const float *x = X + r * n_features;
+        for (int64_t c = 0; c < n_classes; c++) margin[c] = 0.0;
+
+        for (int64_t t = 0; t < n_trees; t++) {
+            int32_t i = tree_root[t];
+            while (i >= 0) {
+                const node_t *n = nodes + i;
+                float v = x[n->feature & ~DEFAULT_LEFT];
+                int go_left = (v < n->value) | (isnan(v) & ((n->feature & DEFAULT_LEFT) != 0));
+                i = go_left ? n->left : n->right;
+            }
+            float w = leaf_bits == 8 ? ((const int8_t *)leaves)[~i] * tree_scale[t]
+                                     : half_to_float(((const uint16_t *)leaves)[~i]);
+            margin[tree_class[t]] += w;
+        }
+
+        double max = -INFINITY, sum = 0.0;
+        for (int64_t c = 0; c < n_classes; c++) if (class_mask[c] && margin[c] > max) max = margin[c];
+        for (int64_t c = 0; c < n_classes; c++) sum += (margin[c] = class_mask[c] ? exp(margin[c] - max) : 0.0);
+        for (int64_t c = 0; c < n_classes; c++) out[r * n_classes + c] = (float)(margin[c] / sum);
+    }
+}
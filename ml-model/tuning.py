@@ -0,0 +1,216 @@
+import os
+import csv
+import json
+import math
+import time
+import random
+import itertools
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import scipy.sparse as sp
+import xgboost as xgb
+from sklearn.model_selection import StratifiedKFold
+
+# Hyperparameter search (`train_model.py --tune`): stratified k-fold CV of
+# a sampled parameter grid over a process pool. The fold matrices are
+# built once and placed in a single shared-memory segment that every
+# worker maps, so tasks only carry (candidate, fold) over the pipe.
+# Each fit stops early on the fold's validation loss, and after the first
+# fold only the best TUNE_KEEP share of candidates runs the rest.
+TUNING_DIR = "tuning"
+BEST_PARAMS_FILE = os.path.join(TUNING_DIR, "best_params.json")
+
+PARAM_GRID = {
+    "max_depth": [4, 6, 8],
+    "learning_rate": [0.05, 0.1, 0.2],
+    "subsample": [0.8, 1.0],
+    "colsample_bytree": [0.6, 0.8, 1.0],
+    "min_child_weight": [1, 3],
+}
+MAX_ROUNDS = 1000
+EARLY_STOPPING_ROUNDS = 25
+TUNE_KEEP = float(os.getenv("TUNE_KEEP", 0.5))
+SEED = 42
+
+
+def sample_candidates(max_candidates):
+    keys = list(PARAM_GRID)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*PARAM_GRID.values())]
+    if max_candidates and len(grid) > max_candidates:
+        grid = random.Random(SEED).sample(grid, max_candidates)
+    return grid
+
+
+# One shared-memory segment holding named arrays, 64-byte aligned like
+# the model bundle; only the small index is pickled to the workers
+def share_arrays(arrays):
+    index, offset = {}, 0
+    for name, arr in arrays.items():
+        index[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset = (offset + arr.nbytes + 63) // 64 * 64
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, arr in arrays.items():
+        view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf, offset=index[name]["offset"])
+        view[...] = arr
+    return shm, index
+
+def attach_arrays(name, index):
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = {
+        key: np.ndarray(spec["shape"], dtype=np.dtype(spec["dtype"]), buffer=shm.buf, offset=spec["offset"])
+        for key, spec in index.items()
+    }
+    return shm, arrays
+
+
+_worker = {}
+
+def _init_worker(shm_name, index, n_features, num_class, nthread):
+    _worker["shm"], _worker["arrays"] = attach_arrays(shm_name, index)
+    _worker.update({"n_features": n_features, "num_class": num_class, "nthread": nthread, "dmatrix": {}})
+
+def _fold_dmatrix(fold, part):
+    key = (fold, part)
+    if key not in _worker["dmatrix"]:
+        a = _worker["arrays"]
+        prefix = f"{fold}_{part}_"
+        X = sp.csr_matrix(
+            (a[prefix + "data"], a[prefix + "indices"], a[prefix + "indptr"]),
+            shape=(len(a[prefix + "indptr"]) - 1, _worker["n_features"]), copy=False
+        )
+        _worker["dmatrix"][key] = xgb.DMatrix(X, label=a[prefix + "y"], nthread=_worker["nthread"])
+    return _worker["dmatrix"][key]
+
+def _evaluate(candidate_id, params, fold):
+    started = time.perf_counter()
+    dtrain, dvalid = _fold_dmatrix(fold, "train"), _fold_dmatrix(fold, "valid")
+    booster = xgb.train({
+        "objective": "multi:softprob",
+        "num_class": _worker["num_class"],
+        "eval_metric": "mlogloss",
+        "seed": SEED,
+        "nthread": _worker["nthread"],
+        **params,
+    }, dtrain, num_boost_round=MAX_ROUNDS, evals=[(dvalid, "valid")],
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS, verbose_eval=False)
+
+    best = booster.best_iteration
+    probs = booster.predict(dvalid, iteration_range=(0, best + 1))
+    accuracy = float((probs.argmax(axis=1) == dvalid.get_label()).mean())
+    return {
+        "candidate": candidate_id, "fold": fold, "best_iteration": int(best),
+        "logloss": float(booster.best_score), "accuracy": accuracy,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def _fold_arrays(X, y, folds):
+    skf = StratifiedKFold(n_splits=folds, shuffle=True, random_state=SEED)
+    arrays = {}
+    for fold, (train_idx, valid_idx) in enumerate(skf.split(np.zeros(len(y)), y)):
+        for part, idx in (("train", train_idx), ("valid", valid_idx)):
+            Xp = X[idx]
+            prefix = f"{fold}_{part}_"
+            arrays[prefix + "data"] = Xp.data.astype(np.float32)
+            arrays[prefix + "indices"] = Xp.indices.astype(np.int32)
+            arrays[prefix + "indptr"] = Xp.indptr.astype(np.int64)
+            arrays[prefix + "y"] = y[idx].astype(np.float32)
+    return arrays
+
+def _run_stage(pool, tasks, candidates, results):
+    futures = [pool.submit(_evaluate, c, candidates[c], f) for c, f in tasks]
+    for future in futures:
+        r = future.result()
+        results.append(r)
+        print(f"  candidate {r['candidate']:>3} fold {r['fold']}: logloss {r['logloss']:.4f}, "
+              f"acc {r['accuracy']:.4f}, {r['best_iteration'] + 1} rounds, {r['seconds']}s")
+
+def tune(data, folds=5, max_candidates=24, workers=None, threads_per_worker=1, dataset_key=None):
+    X, y = data.X.tocsr(), np.asarray(data.y)
+    num_class = len(data.vocab["job_role"])
+    candidates = sample_candidates(max_candidates)
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    print(f"⏳ Tuning {len(candidates)} candidates with {folds}-fold CV on {workers} worker(s)...")
+
+    shm, index = share_arrays(_fold_arrays(X, y, folds))
+    results = []
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=mp.get_context("fork"), initializer=_init_worker,
+            initargs=(shm.name, index, X.shape[1], num_class, threads_per_worker)
+        ) as pool:
+            _run_stage(pool, [(c, 0) for c in range(len(candidates))], candidates, results)
+            ranked = sorted(range(len(candidates)), key=lambda c: results[c]["logloss"])
+            survivors = ranked[:max(1, math.ceil(len(candidates) * TUNE_KEEP))]
+            print(f"Pruned {len(candidates) - len(survivors)} candidates after fold 0")
+            _run_stage(pool, [(c, f) for c in survivors for f in range(1, folds)], candidates, results)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    table = _summarize(candidates, results, folds)
+    best = min((row for row in table if row["status"] == "complete"), key=lambda row: row["mean_logloss"])
+    best_params = {**candidates[best["candidate"]], "n_estimators": best["n_estimators"]}
+    print(f"🏆 Best candidate {best['candidate']}: logloss {best['mean_logloss']:.4f}, "
+          f"accuracy {best['mean_accuracy']:.4f}, params {best_params}")
+    _write_results(table, best, best_params, folds, dataset_key)
+    return best_params
+
+def _summarize(candidates, results, folds):
+    table = []
+    for c, params in enumerate(candidates):
+        runs = [r for r in results if r["candidate"] == c]
+        logloss = np.array([r["logloss"] for r in runs])
+        table.append({
+            "candidate": c,
+            **params,
+            "status": "complete" if len(runs) == folds else "pruned",
+            "folds": len(runs),
+            "mean_logloss": float(logloss.mean()),
+            "std_logloss": float(logloss.std()),
+            "mean_accuracy": float(np.mean([r["accuracy"] for r in runs])),
+            # Rounds for a full fit: the average early-stopping point
+            "n_estimators": int(round(np.mean([r["best_iteration"] + 1 for r in runs]))),
+            "seconds": round(sum(r["seconds"] for r in runs), 2),
+        })
+    return sorted(table, key=lambda row: (row["status"] != "complete", row["mean_logloss"]))
+
+def _write_results(table, best, best_params, folds, dataset_key):
+    os.makedirs(TUNING_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    results_path = os.path.join(TUNING_DIR, f"results_{stamp}.csv")
+    with open(results_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(table[0]))
+        writer.writeheader()
+        writer.writerows(table)
+
+    tmp = BEST_PARAMS_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({
+            "params": best_params,
+            "cv": {"folds": folds, "mean_logloss": best["mean_logloss"], "std_logloss": best["std_logloss"],
+                   "mean_accuracy": best["mean_accuracy"]},
+            "results": results_path,
+            "dataset_key": dataset_key,
+            "created_at": stamp,
+        }, f, indent=2)
+    os.replace(tmp, BEST_PARAMS_FILE)
+    print(f"Results written to {results_path}; best configuration to {BEST_PARAMS_FILE}")
+
+# Only a search over the same dataset applies (n_estimators in particular
+# was picked by early stopping on it); a stale one is reported and ignored
+def load_best_params(dataset_key=None):
+    try:
+        with open(BEST_PARAMS_FILE) as f:
+            tuned = json.load(f)
+    except FileNotFoundError:
+        return None
+    if dataset_key is not None and tuned.get("dataset_key") != dataset_key:
+        print(f"⚠️ Ignoring {BEST_PARAMS_FILE}: tuned on a different dataset ({tuned['created_at']}); "
+              f"run `python train_model.py --tune` again to use tuned parameters.")
+        return None
+    return tuned